@@ -0,0 +1,96 @@
+# -*- encoding: UTF-8 -*-
+import sys
+
+import numpy as np
+import pandas as pd
+
+import data_fetcher
+import indicators
+import market
+import settings
+from strategy import backtrace_ma250, breakthrough_platform, climax_limitdown, enter, high_tight_flag, \
+    keep_increasing, low_backtrace_increase, parking_apron, turtle_trade
+
+# ==========================================
+# 回测：每只股票每个策略只计算一次整段历史的逐日信号
+# ==========================================
+
+# 策略名 -> 逐日信号函数
+STRATEGIES = {
+    '放量上涨': enter.check_volume_signals,
+    '均线多头': keep_increasing.check_signals,
+    '停机坪': parking_apron.check_signals,
+    '回踩年线': backtrace_ma250.check_signals,
+    '突破平台': breakthrough_platform.check_signals,
+    '无大幅回撤': low_backtrace_increase.check_signals,
+    '海龟交易法则': turtle_trade.check_enter_signals,
+    '高而窄的旗形': high_tight_flag.check_signals,
+    '放量跌停': climax_limitdown.check_signals,
+}
+
+# 信号日之后的持有天数 (交易日)
+HOLDING_DAYS = (1, 5, 20)
+
+
+def run(stocks_data, strategies=None, start_date=None, end_date=None, holding_days=HOLDING_DAYS):
+    """
+    stocks_data: {(代码, 名称): 日线 DataFrame}，即 data_fetcher.run 的返回值
+    返回每次信号一行：策略、代码、名称、日期、收盘价，以及之后 N 个交易日的收益率 (数据不足为 NaN)
+    """
+    strategies = strategies or STRATEGIES
+    columns = ['策略', '代码', '名称', '日期', '收盘'] + ['{}日收益率'.format(n) for n in holding_days]
+    trades = []
+    for code_name, data in stocks_data.items():
+        dates = pd.to_datetime(data['date']).values
+        in_range = np.ones(len(data), dtype=bool)
+        if start_date is not None:
+            in_range &= dates >= np.datetime64(pd.Timestamp(start_date))
+        if end_date is not None:
+            in_range &= dates <= np.datetime64(pd.Timestamp(end_date))
+        close = indicators.column(data, 'close')
+
+        for name, check_signals in strategies.items():
+            hits = np.flatnonzero(check_signals(code_name, data) & in_range)
+            if len(hits) == 0:
+                continue
+            trade = pd.DataFrame({'策略': name, '代码': code_name[0], '名称': code_name[1],
+                                  '日期': dates[hits], '收盘': close[hits]})
+            for n in holding_days:
+                exit_close = np.full(len(hits), np.nan)
+                held = hits + n < len(close)
+                exit_close[held] = close[hits[held] + n]
+                trade['{}日收益率'.format(n)] = exit_close / close[hits] - 1
+            trades.append(trade)
+
+    if not trades:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(trades, ignore_index=True)[columns]
+
+
+def summary(trades, holding_days=HOLDING_DAYS):
+    """按策略汇总：信号次数、平均收益率、胜率"""
+    result = trades.groupby('策略').size().to_frame('信号次数')
+    for n in holding_days:
+        returns = trades.groupby('策略')['{}日收益率'.format(n)]
+        result['{}日平均收益率'.format(n)] = returns.mean()
+        result['{}日胜率'.format(n)] = returns.apply(lambda r: (r.dropna() > 0).mean())
+    return result
+
+
+def local(codes):
+    """只用本地行情 (内存映射行情，过期的股票读行情库)，不联网；返回值同 data_fetcher.run"""
+    return {(code[:6], code): data for code, data in market.frames(codes) if data is not None and not data.empty}
+
+
+# 用法：python backtest.py 2023-01-01 2023-12-31
+#       python backtest.py --local 2023-01-01 2023-12-31    (不联网，先运行 python market.py 打包本地行情库)
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    offline = '--local' in args
+    args = [arg for arg in args if arg != '--local']
+    settings.init(offline=offline)
+    start, end = (args[:2] + [None, None])[:2]
+    with open('stock_codes.txt') as f:
+        stocks = [(line.strip()[:6], line.strip()) for line in f if line.strip()]
+    stocks_data = local([code for _, code in stocks]) if offline else data_fetcher.run(stocks)
+    print(summary(run(stocks_data, start_date=start, end_date=end)))
@@ -0,0 +1,54 @@
+# -*- encoding: UTF-8 -*-
+import pandas as pd
+
+# ==========================================
+# 统一的日线格式：各数据源只在这里转换一次
+# ==========================================
+# 列固定为 date/open/high/low/close/volume，按日期升序，索引从 0 开始。
+# 价格用 float32 (A 股价格两位小数，精度足够)，成交量为 int64 (单位：手)，
+# 多余字段 (成交额、振幅、换手率等) 一律丢弃。策略计算时经 indicators.column 转成 float64。
+
+COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+DTYPES = {
+    'date': 'datetime64[ns]',
+    'open': 'float32',
+    'high': 'float32',
+    'low': 'float32',
+    'close': 'float32',
+    'volume': 'int64',
+}
+
+
+def normalize(data):
+    """已是英文列名的日线 -> 统一格式"""
+    data = data[COLUMNS]
+    return pd.DataFrame({
+        'date': pd.to_datetime(data['date'].values).astype(DTYPES['date']),
+        'open': data['open'].values.astype(DTYPES['open']),
+        'high': data['high'].values.astype(DTYPES['high']),
+        'low': data['low'].values.astype(DTYPES['low']),
+        'close': data['close'].values.astype(DTYPES['close']),
+        'volume': pd.Series(data['volume'].values, dtype='float64').fillna(0).round().values.astype(DTYPES['volume']),
+    }).sort_values('date', kind='stable').reset_index(drop=True)
+
+
+def is_canonical(data):
+    return list(data.columns) == COLUMNS and all(data[c].dtype == DTYPES[c] for c in COLUMNS)
+
+
+def from_akshare(data):
+    """ak.stock_zh_a_hist 返回的日线"""
+    return normalize(data.rename(columns={'日期': 'date', '开盘': 'open', '收盘': 'close', '最高': 'high',
+                                          '最低': 'low', '成交量': 'volume'}))
+
+
+def from_tushare(data):
+    """pro.daily 返回的日线 (trade_date 为 YYYYMMDD，按日期倒序)"""
+    data = data.rename(columns={'trade_date': 'date', 'vol': 'volume'})
+    data['date'] = pd.to_datetime(data['date'], format='%Y%m%d')
+    return normalize(data)
+
+
+def from_sina(quotes):
+    """snapshot.parse 返回的行情快照 (成交量已换算为手)，每只股票一行"""
+    return normalize(quotes)
@@ -0,0 +1,108 @@
+# -*- encoding: UTF-8 -*-
+import datetime
+import logging
+
+import pandas as pd
+
+import bars
+import metrics
+import store
+
+# ==========================================
+# 按交易日批量更新本地行情库 (Tushare)
+# ==========================================
+# pro.daily(trade_date=...) 一次返回全市场一个交易日的日线，按代码拆开追加到各自的分区。
+# 每天的增量更新从每只股票一次请求变为每个交易日一次请求。
+#
+# Tushare 日线是不复权价格，库中是前复权价格：没有除权除息时最新 K 线两者相同，可以直接追加；
+# 除权当天 pre_close 与库中上一日收盘价不一致，此时不追加，留给逐只更新重建该股票。
+
+DATE_FORMAT = '%Y%m%d'
+# 价格两位小数，允许的误差
+TOLERANCE = 0.005
+# 最多回看多少天 (自然日)；库中最后日期更早的股票留给逐只更新
+LOOKBACK_DAYS = 28
+
+
+def trade_dates(pro, start, end):
+    """(start, end] 之间的交易日，YYYYMMDD 字符串升序"""
+    cal = pro.trade_cal(exchange='', start_date=start.strftime(DATE_FORMAT), end_date=end.strftime(DATE_FORMAT),
+                        is_open='1')
+    dates = sorted(str(d) for d in cal['cal_date'])
+    return [d for d in dates if d > start.strftime(DATE_FORMAT)]
+
+
+def fetch_days(pro, dates):
+    """逐个交易日拉取全市场日线；遇到尚未发布的交易日即停止，返回 (日线, 已覆盖到的最后交易日)"""
+    frames = []
+    covered = None
+    for date in dates:
+        with metrics.timer(metrics.FETCH_SECONDS, source='tushare_bulk'):
+            daily = pro.daily(trade_date=date)
+        if daily is None or daily.empty:
+            break
+        frames.append(daily)
+        covered = date
+    if not frames:
+        return pd.DataFrame(), covered
+    return pd.concat(frames, ignore_index=True), covered
+
+
+def _continuous(last_close, rows):
+    # 每根 K 线的 pre_close 都应等于前一根的收盘价，否则其间发生了除权除息
+    previous = [last_close] + list(rows['close'].values[:-1])
+    return all(abs(float(p) - float(q)) < TOLERANCE for p, q in zip(rows['pre_close'].values, previous))
+
+
+def update(codes, pro, root=None, end_date=None):
+    """
+    把库中已有股票更新到最近一个已发布的交易日，返回已是最新的代码集合。
+    只有 (start, end] 内的交易日全部已发布、且股票已更新到最后一个交易日 (或期间停牌) 时才算最新；
+    库中没有的股票、发生除权的股票、最后日期早于回看上限的股票不在返回值中，需要逐只拉取
+    """
+    cached = {code: store.load(code, root) for code in codes}
+    cached = {code: data for code, data in cached.items() if data is not None and not data.empty}
+    if not cached:
+        return set()
+
+    end = pd.Timestamp(end_date or datetime.date.today())
+    # 长期停牌、退市的股票不把起点拉得太早：每个交易日一次请求，受 Tushare 每分钟调用次数限制
+    horizon = end - pd.Timedelta(days=LOOKBACK_DAYS)
+    cached = {code: data for code, data in cached.items() if data['date'].iloc[-1] >= horizon}
+    if not cached:
+        return set()
+    start = min(data['date'].iloc[-1] for data in cached.values())
+    dates = trade_dates(pro, start, end)
+    # 最后一个开市日：当天收盘数据尚未发布 (例如 15:40 运行) 时，批量更新不能代替逐只拉取
+    latest = dates[-1] if dates else start.strftime(DATE_FORMAT)
+    daily, covered = fetch_days(pro, dates)
+    complete = not dates or covered == latest
+    if daily.empty:
+        if dates:
+            logging.info("交易日 {} 的日线尚未发布，全部逐只更新".format(dates[0]))
+            return set()
+        # 起点之后没有开市日，回看范围内的股票都已是最新
+        return set(cached)
+
+    daily = daily.astype({'trade_date': str}).sort_values('trade_date')
+    groups = dict(tuple(daily.groupby('ts_code')))
+    fresh = set()
+    for code, data in cached.items():
+        last = data['date'].iloc[-1].strftime(DATE_FORMAT)
+        rows = groups.get(code)
+        if rows is not None:
+            rows = rows.loc[rows['trade_date'] > last]
+        if rows is None or rows.empty:
+            # 期间停牌，或库中已是最新
+            if complete:
+                fresh.add(code)
+            continue
+        if not _continuous(data['close'].iloc[-1], rows):
+            logging.info("{} 期间发生除权除息，改为逐只更新".format(code))
+            continue
+        store.append(code, bars.from_tushare(rows), root)
+        # 已发布的部分照样追加，逐只更新时只需补拉尚未发布的尾部
+        if complete:
+            fresh.add(code)
+    logging.info("按交易日批量更新至 {} (最后交易日 {}): {} 只已是最新".format(covered, latest, len(fresh)))
+    return fresh
@@ -1,22 +1,36 @@
 # -*- encoding: UTF-8 -*-
 
-import akshare as ak
 import logging
-import talib as tl
 
 import concurrent.futures
 
+import bars
+import store
+
+
+def _store_code(stock):
+    # 本地行情库按带后缀的代码分区，与 work_flow 共用
+    return stock + ('.SH' if stock.startswith('6') else '.SZ')
+
+
+def _fetch_hist(stock, start_date=None):
+    import akshare as ak  # 按需导入，只用本地数据时不必加载
+    start = start_date.strftime('%Y%m%d') if start_date is not None else "20220101"
+    data = ak.stock_zh_a_hist(symbol=stock, period="daily", start_date=start, adjust="qfq")
+    if data is None or data.empty:
+        return data
+    return bars.from_akshare(data)
+
 
 def fetch(code_name):
     stock = code_name[0]
-    data = ak.stock_zh_a_hist(symbol=stock, period="daily", start_date="20220101", adjust="qfq")
+    data = store.update(_store_code(stock), lambda start_date: _fetch_hist(stock, start_date))
 
     if data is None or data.empty:
         logging.debug("股票："+stock+" 没有数据，略过...")
         return
 
-    data['p_change'] = tl.ROC(data['收盘'], 1)
-
+    # 本地行情库已是 bars 的统一格式，策略直接使用
     return data
 
 
@@ -29,7 +43,6 @@ def run(stocks):
             try:
                 data = future.result()
                 if data is not None:
-                    data = data.astype({'成交量': 'double'})
                     stocks_data[stock] = data
             except Exception as exc:
                 print('%s(%r) generated an exception: %s' % (stock[1], stock[0], exc))
@@ -0,0 +1,118 @@
+# -*- encoding: UTF-8 -*-
+import logging
+import threading
+import time
+
+import settings
+
+# ==========================================
+# 数据源健康状态与熔断
+# ==========================================
+# 每个数据源一个熔断器：
+#   closed    正常调用，连续失败 failures 次后熔断
+#   open      熔断中，直接跳过该数据源；冷却 cooldown 秒后进入 half_open
+#   half_open 只放行一个探测请求，成功则恢复 closed，失败则重新熔断
+# 数据源停服时只有最初几个请求会等到超时，其余股票直接走下一级数据源。
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# 可在 config.yaml 的 breaker 中覆盖
+DEFAULT_BREAKER = {'failures': 3, 'cooldown': 60}
+
+
+def breaker_config():
+    config = getattr(settings, 'config', None)
+    config = config if isinstance(config, dict) else {}
+    return {**DEFAULT_BREAKER, **(config.get('breaker') or {})}
+
+
+class Breaker:
+
+    def __init__(self, source, failures=3, cooldown=60, clock=time.monotonic):
+        self.source = source
+        self.threshold = failures
+        self.cooldown = cooldown
+        self.clock = clock
+        self.consecutive = 0
+        self.successes = 0
+        self.failures = 0
+        self._state = CLOSED
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current()
+
+    def _current(self):
+        if self._state == OPEN and self.clock() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow(self):
+        """是否可以向该数据源发请求；half_open 时同一时刻只放行一个探测请求"""
+        with self._lock:
+            state = self._current()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.successes += 1
+            self.consecutive = 0
+            if self._state != CLOSED:
+                logging.warning("数据源 {} 已恢复".format(self.source))
+            self._state = CLOSED
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self.consecutive += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self.consecutive >= self.threshold):
+                logging.warning("数据源 {} 连续失败 {} 次，熔断 {} 秒".format(
+                    self.source, self.consecutive, self.cooldown))
+                self._state = OPEN
+                self._opened_at = self.clock()
+            self._probing = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(source):
+    with _breakers_lock:
+        if source not in _breakers:
+            _breakers[source] = Breaker(source, **breaker_config())
+        return _breakers[source]
+
+
+def reset():
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def rank(sources):
+    """
+    可用的数据源 (保持原有优先级)，熔断中的不返回：首选数据源熔断后，下一级自动提升为首选。
+    待探测的数据源留在原有位置，冷却后的探测请求仍先发给它，失败再走下一级，恢复后重新成为首选
+    """
+    return [source for source in sources if breaker(source).state != OPEN]
+
+
+def summary():
+    """{数据源: {state, successes, failures}}，用于运行结束时输出"""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {source: {'state': b.state, 'successes': b.successes, 'failures': b.failures}
+            for source, b in breakers.items()}
@@ -0,0 +1,99 @@
+# -*- encoding: UTF-8 -*-
+import collections
+import math
+
+import numpy as np
+
+# ==========================================
+# 增量指标：每根新 K 线 O(1) 推进，结果与 talib 全量计算逐位一致
+# ==========================================
+# 为了逐位一致，累加顺序照搬 talib：
+#   SMA: 先累加前 period-1 个值，之后每根 K 线 total += x; out = total / period; total -= 最早的值
+#   ROC: out = (x / x[t-period] - 1) * 100，分母为 0 时输出 0
+# 状态 (运行总和 + 窗口) 与行情一起保存在本地行情库，见 store。
+
+# 本地行情库维护的指标：(指标名, 源列, 参数)，与 indicators 的缓存键一致
+SPECS = [
+    ('ma', 'close', 30),
+    ('ma', 'close', 60),
+    ('ma', 'close', 250),
+    ('ma', 'volume', 5),
+    ('roc', 'close', 1),
+]
+
+
+def name(spec):
+    """指标列名，如 ma_close_250"""
+    return '_'.join(str(part) for part in spec)
+
+
+class SMA:
+
+    def __init__(self, period, total=0.0, window=None, count=0):
+        self.period = period
+        self.total = total
+        # 最近 period-1 个值 (deque，两端 O(1) 进出)，下一根 K 线输出后从总和中减去最早的一个
+        self.window = collections.deque(window or [])
+        self.count = count
+
+    def update(self, x):
+        self.count += 1
+        if self.count < self.period:
+            self.total += x
+            self.window.append(x)
+            return math.nan
+        self.total += x
+        out = self.total / self.period
+        self.window.append(x)
+        self.total -= self.window.popleft()
+        return out
+
+    def state(self):
+        return {'total': self.total, 'window': list(self.window), 'count': self.count}
+
+
+class ROC:
+
+    def __init__(self, period, window=None, count=0):
+        self.period = period
+        self.window = collections.deque(window or [])
+        self.count = count
+
+    def update(self, x):
+        self.count += 1
+        self.window.append(x)
+        if self.count <= self.period:
+            return math.nan
+        previous = self.window.popleft()
+        return (x / previous - 1.0) * 100.0 if previous != 0.0 else 0.0
+
+    def state(self):
+        return {'window': list(self.window), 'count': self.count}
+
+
+KINDS = {'ma': SMA, 'roc': ROC}
+
+
+def create(spec, state=None):
+    kind, _, period = spec
+    return KINDS[kind](period, **(state or {}))
+
+
+def run(spec, values, state=None):
+    """从 state 开始 (None 为从第一根 K 线开始) 依次推进 values，返回 (输出序列, 新状态)"""
+    indicator = create(spec, state)
+    out = np.array([indicator.update(float(x)) for x in values], dtype='float64')
+    return out, indicator.state()
+
+
+def build(data, state=None):
+    """
+    data: 统一格式日线 (新 K 线)。返回 ({指标列名: 输出序列}, {指标列名: 新状态})；
+    state 为 None 时从头计算，否则接着上次的状态推进
+    """
+    series = {}
+    states = {}
+    for spec in SPECS:
+        key = name(spec)
+        series[key], states[key] = run(spec, data[spec[1]].values, None if state is None else state.get(key))
+    return series, states
@@ -0,0 +1,127 @@
+# -*- encoding: UTF-8 -*-
+import numpy as np
+
+# ==========================================
+# 单只股票的指标缓存
+# ==========================================
+# 缓存挂在该股票的 DataFrame 上，按 (指标名, 参数) 记录，首次取用时计算，
+# 同一次扫描中所有策略共用，不再往调用方的 DataFrame 里写新列。
+# 切片/拷贝得到的新 DataFrame 不继承缓存；行数变化 (追加了新 K 线) 时缓存自动作废。
+
+_ATTR = '_indicators'
+
+def _talib(name):
+    # talib 按需导入：指标都已入库 (见 incremental) 时扫描不需要加载 talib
+    def compute(values, *params):
+        import talib
+        return getattr(talib, name)(values, *params)
+    return compute
+
+
+# 指标名 -> 计算函数 (输入 float64 数组)
+FUNCTIONS = {
+    'ma': _talib('MA'),
+    'roc': _talib('ROC'),
+}
+
+
+# 指标名 -> 计算第 t 个值需要的输入长度 (含第 t 个)
+LOOKBACK = {
+    'ma': lambda period: period,
+    'roc': lambda period: period + 1,
+}
+
+
+def _cache(data):
+    cache = data.__dict__.get(_ATTR)
+    if cache is None or cache['rows'] != len(data):
+        cache = {'rows': len(data)}
+        object.__setattr__(data, _ATTR, cache)
+    return cache
+
+
+def preload(data, series):
+    """series: {(指标名, 源列, *参数): 与 data 逐行对齐的序列}，例如本地行情库中已算好的指标"""
+    cache = _cache(data)
+    for key, values in series.items():
+        cache[key] = np.asarray(values, dtype='float64')
+
+
+def invalidate(data):
+    """原地修改了行情数据 (例如覆盖当日 K 线) 后调用"""
+    data.__dict__.pop(_ATTR, None)
+
+
+def column(data, name):
+    """float64 版本的原始列 (talib 只接受 double)"""
+    cache = _cache(data)
+    key = ('column', name)
+    if key not in cache:
+        cache[key] = data[name].values.astype('float64')
+    return cache[key]
+
+
+def get(data, name, source, *params):
+    """取 source 列上的指标 name(*params)，没有则计算并缓存"""
+    cache = _cache(data)
+    key = (name, source) + params
+    if key not in cache:
+        cache[key] = FUNCTIONS[name](column(data, source), *params)
+    return cache[key]
+
+
+def memo(data, key, compute):
+    """缓存按整段历史一次算出的序列 (例如其它策略的逐日信号)，compute 无参数"""
+    cache = _cache(data)
+    if key not in cache:
+        cache[key] = compute()
+    return cache[key]
+
+
+def extend(base, data, rows):
+    """
+    data 的前 rows 行与 base 相同，之后是新 K 线 (例如盘中临时 K 线)：
+    沿用 base 已缓存的列和指标，只重算受影响的尾部。逐日信号等无法增量更新的缓存不沿用
+    """
+    cached = _cache(base)
+    cache = _cache(data)
+    for key, value in cached.items():
+        if key != 'rows' and key[0] == 'column':
+            cache[key] = np.concatenate([value[:rows], data[key[1]].values[rows:].astype('float64')])
+    for key, value in cached.items():
+        if key != 'rows' and key[0] in FUNCTIONS:
+            name, source, params = key[0], key[1], key[2:]
+            values = column(data, source)
+            begin = max(0, rows - LOOKBACK[name](*params) + 1)
+            tail = FUNCTIONS[name](values[begin:], *params)[rows - begin:]
+            cache[key] = np.concatenate([value[:rows], tail])
+    return data
+
+
+def ma(data, period, source='close'):
+    return get(data, 'ma', source, period)
+
+
+def vol_ma(data, period=5):
+    return get(data, 'ma', 'volume', period)
+
+
+def p_change(data):
+    # 数据源已带涨跌幅时直接使用，否则按收盘价计算
+    if 'p_change' in data:
+        return column(data, 'p_change')
+    return get(data, 'roc', 'close', 1)
+
+
+# ==========================================
+# 信号序列用的滑动窗口工具
+# ==========================================
+
+def windows(values, size):
+    """长度为 size 的滑动窗口视图，第 k 行是以第 k+size-1 根 K 线结尾的窗口"""
+    return np.lib.stride_tricks.sliding_window_view(values, size)
+
+
+def prefix_count(flags):
+    """前缀计数：count[b] - count[a] 为 flags[a:b] 中 True 的个数"""
+    return np.concatenate([[0], np.cumsum(flags)])
@@ -0,0 +1,101 @@
+# -*- encoding: UTF-8 -*-
+import logging
+import sys
+import time
+
+import pandas as pd
+
+import bars
+import indicators
+import metrics
+import registry
+import settings
+import snapshot
+import store
+import utils
+import work_flow
+
+# ==========================================
+# 盘中重扫：历史只读一次，每次用行情快照拼上当天的临时 K 线
+# ==========================================
+# 历史日线常驻内存，各指标也只在第一次扫描时全量计算；之后每次扫描只把最新快照作为当天的
+# 临时 K 线接到历史末尾 (当天已入库时替换最后一根)，指标只重算尾部。
+
+# 默认的重扫间隔 (秒)
+INTERVAL = 300
+# 收盘后停止
+CLOSE = '15:00'
+
+# 盘中扫描的策略
+CHECKS = work_flow.CHECKS
+
+
+def overlay(history, quote, base=None):
+    """
+    history: 统一格式的日线；quote: snapshot.parse 的一行。
+    返回拼上临时 K 线的新日线，沿用 base (默认为 history，也可以是上一次 overlay 的结果) 已缓存的指标；
+    快照日期缺失或比历史还旧时原样返回 history
+    """
+    date = pd.Timestamp(quote['date'])
+    last = history['date'].iloc[-1]
+    if pd.isna(date) or date < last:
+        return history
+    rows = len(history) - 1 if date == last else len(history)
+    bar = bars.normalize(pd.DataFrame({column: [quote[column]] for column in bars.COLUMNS}))
+    data = pd.concat([history.iloc[:rows], bar], ignore_index=True)
+    return indicators.extend(history if base is None else base, data, rows)
+
+
+class Rescan:
+
+    def __init__(self, codes, checks=None, load=store.load):
+        # checks 为 None 时与 main.py 一样按 config.yaml 的 strategies / gates 建立策略注册表
+        self.strategies = registry.load(settings.config, CHECKS) if checks is None \
+            else registry.Registry.of(checks)
+        # 上一次扫描用的日线 (含临时 K 线)，下一次扫描沿用其指标缓存
+        self.frames = {}
+        self.history = {}
+        for code in codes:
+            data = load(code)
+            if data is not None and not data.empty:
+                # 启用的策略用到的指标在载入时算好，之后每次扫描只重算尾部
+                for spec in self.strategies.indicators:
+                    indicators.get(data, *spec)
+                self.history[code] = data
+
+    def run(self, quotes=None):
+        """扫描一次，返回命中的代码；quotes 为 None 时取一次全市场快照"""
+        codes = list(self.history)
+        if quotes is None:
+            quotes = snapshot.fetch(codes)
+        quotes = quotes.set_index('code', drop=False)
+        hits = []
+        for code in work_flow.prefilter(codes, self.strategies.checks, quotes=quotes.reset_index(drop=True),
+                                        gates=self.strategies.prefilters()):
+            data = self.history[code]
+            if code in quotes.index:
+                data = overlay(data, quotes.loc[code], self.frames.get(code))
+            self.frames[code] = data
+            try:
+                if self.strategies.run(code, data):
+                    hits.append(code)
+            except Exception as e:
+                metrics.inc(metrics.SCAN_ERRORS)
+                logging.warning("{} 盘中扫描失败: {!r}".format(code, e))
+        return hits
+
+
+# 用法：python intraday.py [间隔秒数]
+if __name__ == '__main__':
+    settings.init()
+    interval = int(sys.argv[1]) if len(sys.argv) > 1 else INTERVAL
+    with open('stock_codes.txt') as f:
+        codes = [line.strip() for line in f if line.strip()]
+    rescan = Rescan(codes)
+    print("已载入 {} 只股票的历史".format(len(rescan.history)))
+    while utils.is_weekday() and time.strftime('%H:%M') <= CLOSE:
+        started = time.time()
+        hits = rescan.run()
+        print("{} 命中 {} 只 ({:.1f} 秒): {}".format(
+            time.strftime('%H:%M:%S'), len(hits), time.time() - started, ' '.join(hits)))
+        time.sleep(interval)
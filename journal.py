@@ -0,0 +1,131 @@
+# -*- encoding: UTF-8 -*-
+import datetime
+import json
+import logging
+import os
+import time
+
+# ==========================================
+# 扫描日志：定期记录扫描进度和命中结果，中断后按同一运行 ID 续跑
+# ==========================================
+# 每次运行一个文件 data/journal/<运行 ID>.jsonl：第一行是运行信息 (启用的策略和门槛)，
+# 之后每行是一只已拉取并计算过的股票及其命中的策略。记录先缓存在内存中，
+# 每 every 只或每 interval 秒追加写入一次；进程崩溃最多丢失最近一批，重启后跳过已记录的股票。
+# 拉取失败 (空数据) 的股票不记录，续跑时会重试。扫描正常结束时追加一行完成标记，
+# 之后同一运行 ID 再次运行 (例如收盘后手动重跑) 从头开始，只有未完成的扫描才续跑。
+#
+# 运行 ID 默认为当天日期，同一天重启即自动续跑；可用环境变量 SEQUOIA_RUN_ID 或 config.yaml 的 run_id 指定
+# (例如 CI 中用 GitHub Actions 的 run_id，重新运行失败的任务时续跑)。
+# 策略或门槛与日志中记录的不一致时，旧日志作废，从头开始。
+
+ROOT = os.path.join('data', 'journal')
+# 每记录多少只股票写入一次
+EVERY = 100
+# 距上次写入超过多少秒也写入一次
+INTERVAL = 30
+# 超过多少天的日志在打开新日志时删除
+KEEP_DAYS = 7
+
+
+def run_id(config=None):
+    config = config if isinstance(config, dict) else {}
+    return str(os.environ.get('SEQUOIA_RUN_ID') or config.get('run_id') or datetime.date.today().strftime('%Y%m%d'))
+
+
+def path(run_id, root=None):
+    return os.path.join(root or ROOT, '{}.jsonl'.format(run_id))
+
+
+def _read(file):
+    """返回 (运行信息, {代码: 命中的策略名列表}, 是否已完成)；最后一行写了一半 (进程被杀) 时忽略"""
+    header = None
+    done = {}
+    complete = False
+    with open(file, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if header is None:
+                header = entry
+            elif 'code' in entry:
+                done[entry['code']] = entry.get('hits') or []
+            elif entry.get('complete'):
+                complete = True
+    return header, done, complete
+
+
+def prune(root=None, keep_days=KEEP_DAYS):
+    root = root or ROOT
+    if not os.path.isdir(root):
+        return
+    expired = time.time() - keep_days * 24 * 3600
+    for name in os.listdir(root):
+        file = os.path.join(root, name)
+        if name.endswith('.jsonl') and os.path.getmtime(file) < expired:
+            os.remove(file)
+
+
+class Journal:
+
+    def __init__(self, run_id, meta=None, root=None, every=EVERY, interval=INTERVAL):
+        self.run_id = run_id
+        self.file = path(run_id, root)
+        self.every = every
+        self.interval = interval
+        # 经 JSON 往返一次，与从文件读回的运行信息可以直接比较
+        self.meta = json.loads(json.dumps(meta or {}))
+        self.done = {}
+        self._pending = []
+        self._flushed_at = time.monotonic()
+
+        prune(root)
+        os.makedirs(os.path.dirname(self.file), exist_ok=True)
+        if os.path.exists(self.file):
+            header, done, complete = _read(self.file)
+            if complete:
+                logging.info("扫描日志 {} 对应的扫描已完成，从头开始".format(self.file))
+            elif header is not None and header.get('meta') == self.meta:
+                self.done = done
+                return
+            else:
+                logging.warning("扫描日志 {} 的策略配置已变化，从头开始".format(self.file))
+        with open(self.file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'run_id': run_id, 'meta': self.meta,
+                                'started': time.strftime('%Y-%m-%d %H:%M:%S')}, ensure_ascii=False) + '\n')
+
+    @property
+    def hits(self):
+        """已记录的命中 {代码: 命中的策略名列表}"""
+        return {code: hits for code, hits in self.done.items() if hits}
+
+    def record(self, code, hits=None):
+        hits = list(hits or [])
+        self.done[code] = hits
+        self._pending.append({'code': code, 'hits': hits})
+        if len(self._pending) >= self.every or time.monotonic() - self._flushed_at >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            with open(self.file, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in self._pending))
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending = []
+        self._flushed_at = time.monotonic()
+
+    def complete(self):
+        """扫描正常结束：写入缓存的记录和完成标记，同一运行 ID 之后不再续跑"""
+        self._pending.append({'complete': True, 'finished': time.strftime('%Y-%m-%d %H:%M:%S')})
+        self.flush()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,17 +1,20 @@
+import argparse
 import settings
+import shard
+import sys
 import work_flow
-import akshare as ak
-import tushare as ts
-import pandas as pd
+import reference
 import requests
-import os
 import traceback
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 # ==========================================
-# 1. 网络超级防抖 (90秒超时 + 10次重试)
+# 1. 网络超级防抖 (连接 5 秒 / 读取 30 秒超时 + 10次重试)
 # ==========================================
+# 超时不宜过长：数据源停服时由 health 熔断切换，而不是每只股票都等满超时
+TIMEOUT = (5, 30)
+
 def apply_retry_strategy():
     retry_strategy = Retry(
         total=10, 
@@ -27,7 +30,7 @@ def apply_retry_strategy():
     _original_request = requests.Session.request
     def patched_request(self, method, url, *args, **kwargs):
         if 'timeout' not in kwargs:
-            kwargs['timeout'] = 90
+            kwargs['timeout'] = TIMEOUT
         return _original_request(self, method, url, *args, **kwargs)
     requests.Session.request = patched_request
 
@@ -37,75 +40,40 @@ apply_retry_strategy()
 # 2. 智能名单获取 (强制补全后缀)
 # ==========================================
 def get_robust_stock_list():
-    codes = []
-    backup_file = 'stock_codes.txt'
-    
     print("🔍 正在初始化 A 股名单...")
-    
-    # --- 通道 A: Tushare (优先，自带后缀) ---
-    try:
-        print("   >>> 尝试通道 A (Tushare)...")
-        token = os.environ.get('TS_TOKEN')
-        if token:
-            ts.set_token(token)
-            pro = ts.pro_api()
-            # 关键：使用 ts_code 字段，它返回带后缀的代码 (如 000001.SZ)
-            df = pro.stock_basic(exchange='', list_status='L', fields='ts_code')
-            raw_codes = df['ts_code'].tolist()
-            # 过滤主板 (60开头或00开头)
-            codes = [c for c in raw_codes if c.startswith('60') or c.startswith('00')]
-            
-            if len(codes) > 1000:
-                print(f"   ✅ Tushare 获取成功: {len(codes)} 只")
-    except Exception as e:
-        print(f"   ⚠️ Tushare 失败: {e}")
-
-    # --- 通道 B: Akshare (备用，需手动补后缀) ---
-    if not codes:
-        try:
-            print("   >>> 尝试通道 B (Akshare)...")
-            df = ak.stock_info_a_code_name()
-            raw_codes = df['code'].tolist()
-            for c in raw_codes:
-                c = str(c).zfill(6)
-                # 强制补全后缀，修复“跑了个寂寞”的问题
-                if c.startswith('60'):
-                    codes.append(f"{c}.SH")
-                elif c.startswith('00'):
-                    codes.append(f"{c}.SZ")
-            
-            if len(codes) > 1000:
-                print(f"   ✅ Akshare 获取成功: {len(codes)} 只")
-        except Exception as e:
-            print(f"   ⚠️ Akshare 失败: {e}")
-
-    # --- C. 自动缓存与读取 ---
-    # 如果联网成功，写入缓存
-    if len(codes) > 1000:
-        try:
-            with open(backup_file, 'w') as f:
-                f.write('\n'.join(codes))
-            print(f"💾 名单已备份至 {backup_file}")
-        except:
-            pass
-    
-    # 如果联网失败，读取缓存
-    elif os.path.exists(backup_file):
-        print("🚨 联网失败，正在读取本地备份...")
-        with open(backup_file, 'r') as f:
-            codes = [line.strip() for line in f.readlines() if line.strip()]
-        print(f"📂 本地加载成功: {len(codes)} 只")
-
-    return sorted(list(set(codes)))
+    # 名单缓存一周 (stock_info.csv)，未过期时不联网；联网失败时使用过期的缓存
+    if reference.fresh(reference.STOCK_INFO, reference.UNIVERSE_TTL):
+        print(f"📂 使用本地名单 {reference.STOCK_INFO}")
+    codes = reference.codes()
+    if codes:
+        print(f"💾 名单共 {len(codes)} 只")
+    return codes
 
 # ==========================================
 # 3. 主程序入口
 # ==========================================
+# 用法：
+#   python main.py               扫描全部股票
+#   python main.py --shard 0/4   只扫描 4 片中的第 0 片，结果写入 data/shards (见 shard)
+#   python main.py --merge 4     汇总 4 片的结果，输出报告并推送
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Sequoia 选股')
+    parser.add_argument('--shard', type=shard.parse, metavar='序号/片数', help='分片扫描，如 0/4')
+    parser.add_argument('--merge', type=int, metavar='片数', help='汇总各片的结果')
+    return parser.parse_args(argv)
+
+
 if __name__ == '__main__':
+    args = parse_args()
     try:
         settings.init()
         settings.config['cron'] = False 
-        
+
+        if args.merge:
+            print(f"\n🧩 汇总 {args.merge} 片的扫描结果...")
+            work_flow.merge(args.merge)
+            sys.exit(0)
+
         final_codes = get_robust_stock_list()
         
         if final_codes:
@@ -116,7 +84,10 @@ if __name__ == '__main__':
             settings.config['codes'] = final_codes
             
             print("\n🔬 启动扫描引擎 (work_flow)...")
-            work_flow.prepare()
+            if args.shard:
+                work_flow.prepare_shard(*args.shard)
+            else:
+                work_flow.prepare()
         else:
             print("❌ 致命错误：无法获取任何股票代码。")
             
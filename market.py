@@ -0,0 +1,144 @@
+# -*- encoding: UTF-8 -*-
+import collections.abc
+import json
+import os
+import sys
+
+import numpy as np
+
+import incremental
+import indicators
+import packed
+import store
+
+# ==========================================
+# 全市场内存映射行情：本地行情库打包成每个字段一条连续数组 (packed 布局)，用 numpy.memmap 打开
+# ==========================================
+# data/market/ 下每个字段一个 .npy 文件 (日期、OHLCV，以及本地行情库已算好的指标序列)，
+# index.json 记录每只股票在数组中的 (起始, 结束) 和打包时行情库文件的修改时间。
+# 打开时不解析、不拷贝：各列是 memmap 上的视图，多个进程打开同一份文件时共用操作系统的页缓存，
+# 全市场回测、离线扫描冷启动不必逐只读取 HDF5。
+#
+# 行情库文件比打包时新 (当天已更新) 的股票视为过期，frames 退回逐只读行情库；
+# build 只重读过期和新增的股票，其余直接取自旧文件。每次 build 写一代新文件，
+# 最后替换 index.json，正在读旧文件的进程不受影响。
+
+ROOT = os.path.join('data', 'market')
+INDEX = 'index.json'
+SERIES = [incremental.name(spec) for spec in incremental.SPECS]
+
+
+def _file(root, generation, name):
+    return os.path.join(root, '{}.{}.npy'.format(generation, name))
+
+
+def _stamp(code, store_root=None):
+    """行情库文件的修改时间，不存在时为 None"""
+    try:
+        return os.stat(store.path(code, store_root)).st_mtime_ns
+    except OSError:
+        return None
+
+
+class Market(collections.abc.Mapping):
+    """{代码: 日线 DataFrame}，按需从 memmap 切出，已入库的指标放进指标缓存"""
+
+    def __init__(self, arrays, index, stamps=None, generation=0):
+        self.arrays = arrays
+        self.index = index
+        self.stamps = stamps or {}
+        self.generation = generation
+
+    def __getitem__(self, code):
+        start, stop = self.index[code]
+        data = packed.unpack(self.arrays, start, stop, copy=False)
+        indicators.preload(data, {spec: self.arrays[name][start:stop]
+                                  for spec, name in zip(incremental.SPECS, SERIES) if name in self.arrays})
+        return data
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def fresh(self, code, store_root=None):
+        """打包后行情库中该股票没有变化"""
+        return code in self.index and self.stamps.get(code) == _stamp(code, store_root)
+
+
+def load(root=None):
+    """打开 root 下的内存映射行情，没有时返回 None"""
+    root = root or ROOT
+    try:
+        with open(os.path.join(root, INDEX), encoding='utf-8') as f:
+            meta = json.load(f)
+        # np.asarray 去掉 memmap 子类 (切片交给 pandas 时仍是普通 ndarray)，底层仍是同一块映射，不拷贝
+        arrays = {name: np.asarray(np.load(_file(root, meta['generation'], name), mmap_mode='r'))
+                  for name in meta['fields']}
+    except (OSError, ValueError, KeyError):
+        return None
+    index = {code: (start, stop) for code, start, stop, _ in meta['codes']}
+    stamps = {code: stamp for code, _, _, stamp in meta['codes']}
+    return Market(arrays, index, stamps, meta['generation'])
+
+
+def frames(codes, store_root=None, root=None, market=None):
+    """逐只返回 (代码, 日线)：内存映射中未过期的直接取视图，其余读行情库 (没有时为 None)"""
+    market = market if market is not None else load(root)
+    for code in codes:
+        if market is not None and market.fresh(code, store_root):
+            yield code, market[code]
+        else:
+            yield code, store.load(code, store_root)
+
+
+def build(codes=None, store_root=None, root=None):
+    """
+    把 codes (默认行情库中的全部股票) 打包写入 root，返回新打开的 Market。
+    与已有文件相比没有过期、新增或删除的股票时不重写
+    """
+    root = root or ROOT
+    if codes is None:
+        directory = store_root or store.ROOT
+        names = os.listdir(directory) if os.path.isdir(directory) else []
+        codes = sorted(name[:-3] for name in names if name.endswith('.h5'))
+    old = load(root)
+    if old is not None and set(old) == set(codes) and all(old.fresh(code, store_root) for code in codes):
+        return old
+
+    # 先取修改时间再读，读的过程中被更新的股票下次会被判为过期
+    stamps = {code: old.stamps[code] if old is not None and old.fresh(code, store_root)
+              else _stamp(code, store_root) for code in codes}
+    data = {code: df for code, df in frames(codes, store_root, market=old) if df is not None and not df.empty}
+    arrays, index = packed.pack(data)
+    # 行情库读出的日线已带指标缓存，这里不会重算
+    for spec, name in zip(incremental.SPECS, SERIES):
+        arrays[name] = np.concatenate([indicators.get(data[code], *spec) for code, _, _ in index]) \
+            if index else np.empty(0)
+
+    generation = old.generation + 1 if old is not None else 1
+    os.makedirs(root, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(_file(root, generation, name), array)
+    meta = {'generation': generation, 'fields': list(arrays),
+            'codes': [[code, start, stop, stamps[code]] for code, start, stop in index]}
+    tmp = os.path.join(root, INDEX + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(root, INDEX))
+
+    # 旧一代的文件：已打开的 memmap 仍然有效 (Windows 上删除失败时留到下次)
+    for name in os.listdir(root):
+        if name.endswith('.npy') and not name.startswith('{}.'.format(generation)):
+            try:
+                os.remove(os.path.join(root, name))
+            except OSError:
+                pass
+    return load(root)
+
+
+# 用法：python market.py    (按本地行情库重建 data/market)
+if __name__ == '__main__':
+    market = build(sys.argv[1:] or None)
+    print("内存映射行情：{} 只，{} 根 K 线".format(len(market), len(market.arrays['date'])))
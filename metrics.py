@@ -0,0 +1,206 @@
+# -*- encoding: UTF-8 -*-
+import contextlib
+import json
+import os
+import threading
+import time
+
+# ==========================================
+# 运行指标：计数器、仪表和耗时直方图
+# ==========================================
+# 数据源耗时、失败和降级次数，各策略的 CPU 时间和命中数都记在这里，
+# 每次运行结束写一份 JSON 汇总 (data/metrics.json) 和 Prometheus 文本格式 (data/metrics.prom，
+# 可交给 node_exporter 的 textfile collector 采集)。
+#
+# 指标名遵循 Prometheus 约定：计数器以 _total 结尾，耗时以秒为单位。
+
+FETCH_SECONDS = 'sequoia_fetch_seconds'
+FETCH_FAILURES = 'sequoia_fetch_failures_total'
+FETCH_FALLBACKS = 'sequoia_fetch_fallbacks_total'
+STRATEGY_CPU = 'sequoia_strategy_cpu_seconds_total'
+STRATEGY_CALLS = 'sequoia_strategy_calls_total'
+STRATEGY_HITS = 'sequoia_strategy_hits_total'
+STRATEGY_ERRORS = 'sequoia_strategy_errors_total'
+SCAN_ERRORS = 'sequoia_scan_errors_total'
+STAGE_SECONDS = 'sequoia_stage_seconds'
+CODES = 'sequoia_codes'
+
+HELP = {
+    FETCH_SECONDS: '数据源单次请求耗时 (秒)',
+    FETCH_FAILURES: '数据源请求失败次数',
+    FETCH_FALLBACKS: '数据源未取到数据、转入下一级的次数 (reason: error/empty/open)',
+    STRATEGY_CPU: '策略检查函数占用的 CPU 时间 (秒)',
+    STRATEGY_CALLS: '策略检查函数调用次数',
+    STRATEGY_HITS: '策略命中次数',
+    STRATEGY_ERRORS: '策略检查函数抛出异常的次数',
+    SCAN_ERRORS: '策略计算抛出异常、该股票被跳过的次数',
+    STAGE_SECONDS: '扫描各阶段耗时 (秒)',
+    CODES: '扫描各阶段的股票数',
+}
+
+# 直方图分桶上界 (秒)
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+JSON_FILE = os.path.join('data', 'metrics.json')
+PROM_FILE = os.path.join('data', 'metrics.prom')
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+# (类型, 指标名, 标签) -> 值；直方图的值为 [各分桶计数..., 总和, 次数]
+_values = {}
+_lock = threading.Lock()
+
+
+def _key(kind, name, labels):
+    return kind, name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    """计数器加 value"""
+    key = _key(COUNTER, name, labels)
+    with _lock:
+        _values[key] = _values.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _values[_key(GAUGE, name, labels)] = value
+
+
+def observe(name, value, **labels):
+    """直方图记录一个样本"""
+    key = _key(HISTOGRAM, name, labels)
+    with _lock:
+        histogram = _values.setdefault(key, [0] * len(BUCKETS) + [0.0, 0])
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                histogram[i] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+
+@contextlib.contextmanager
+def timer(name, **labels):
+    """with 块的耗时 (墙钟时间) 记入直方图，块内抛出异常时也记录"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+@contextlib.contextmanager
+def stage(name):
+    """with 块的耗时记为扫描阶段 name 的耗时"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        set_gauge(STAGE_SECONDS, time.perf_counter() - started, stage=name)
+
+
+def measure(name, check, *args):
+    """运行一个策略，记录本线程占用的 CPU 时间、调用次数和命中次数，返回策略的结果"""
+    started = time.thread_time()
+    try:
+        result = check(*args)
+    except Exception:
+        inc(STRATEGY_ERRORS, strategy=name)
+        raise
+    finally:
+        inc(STRATEGY_CPU, time.thread_time() - started, strategy=name)
+        inc(STRATEGY_CALLS, strategy=name)
+    if result is True:
+        inc(STRATEGY_HITS, strategy=name)
+    return result
+
+
+def reset():
+    with _lock:
+        _values.clear()
+
+
+def snapshot():
+    """所有指标的可序列化副本：[{type, name, labels, value}]"""
+    with _lock:
+        items = sorted(_values.items())
+    return [{'type': kind, 'name': name, 'labels': dict(labels), 'value': list(value) if kind == HISTOGRAM else value}
+            for (kind, name, labels), value in items]
+
+
+def merge(samples):
+    """合并 snapshot 的结果 (例如子进程中记录的指标)；仪表取新值，计数器和直方图累加"""
+    with _lock:
+        for sample in samples:
+            key = _key(sample['type'], sample['name'], sample['labels'])
+            if sample['type'] == GAUGE or key not in _values:
+                _values[key] = list(sample['value']) if sample['type'] == HISTOGRAM else sample['value']
+            elif sample['type'] == HISTOGRAM:
+                _values[key] = [a + b for a, b in zip(_values[key], sample['value'])]
+            else:
+                _values[key] += sample['value']
+
+
+def summary():
+    """按指标名汇总，直方图给出次数、总和、平均值，用于 JSON 和运行结束时输出"""
+    result = {}
+    for sample in snapshot():
+        series = result.setdefault(sample['name'], [])
+        item = {'labels': sample['labels']}
+        if sample['type'] == HISTOGRAM:
+            counts, total, count = sample['value'][:-2], sample['value'][-2], sample['value'][-1]
+            item.update({'count': count, 'sum': total, 'mean': total / count if count else 0.0,
+                         'buckets': dict(zip([str(b) for b in BUCKETS], counts))})
+        else:
+            item['value'] = sample['value']
+        series.append(item)
+    return result
+
+
+def _labels(labels, **extra):
+    labels = {**labels, **extra}
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                          for k, v in labels.items()) + '}'
+
+
+def to_prometheus():
+    """Prometheus 文本格式"""
+    lines = []
+    described = set()
+    for sample in snapshot():
+        kind, name, labels, value = sample['type'], sample['name'], sample['labels'], sample['value']
+        if name not in described:
+            described.add(name)
+            if name in HELP:
+                lines.append('# HELP {} {}'.format(name, HELP[name]))
+            lines.append('# TYPE {} {}'.format(name, kind))
+        if kind != HISTOGRAM:
+            lines.append('{}{} {}'.format(name, _labels(labels), value))
+            continue
+        # 分桶计数在记录时已是累计值 (value <= 上界的样本都计入)
+        for bound, count in zip(BUCKETS, value[:-2]):
+            lines.append('{}_bucket{} {}'.format(name, _labels(labels, le=bound), count))
+        lines.append('{}_bucket{} {}'.format(name, _labels(labels, le='+Inf'), value[-1]))
+        lines.append('{}_sum{} {}'.format(name, _labels(labels), value[-2]))
+        lines.append('{}_count{} {}'.format(name, _labels(labels), value[-1]))
+    return '\n'.join(lines) + '\n'
+
+
+def _write(file, text):
+    # 先写临时文件再替换，采集方不会读到写了一半的文件
+    os.makedirs(os.path.dirname(file) or '.', exist_ok=True)
+    tmp = file + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, file)
+
+
+def write(info=None, json_file=JSON_FILE, prom_file=PROM_FILE):
+    """本次运行的指标写入 JSON 汇总和 Prometheus 文本文件；info 为附加的运行信息"""
+    report = {'time': time.strftime('%Y-%m-%d %H:%M:%S'), **(info or {}), 'metrics': summary()}
+    _write(json_file, json.dumps(report, ensure_ascii=False, indent=2))
+    _write(prom_file, to_prometheus())
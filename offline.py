@@ -0,0 +1,106 @@
+# -*- encoding: UTF-8 -*-
+import time
+
+STARTED = time.perf_counter()
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+import market
+import metrics
+import panel
+import reference
+import registry
+import settings
+import work_flow
+from strategy import climax_limitdown, keep_increasing, turtle_trade
+
+# ==========================================
+# 离线扫描：只用本地行情库和本地名单，不联网
+# ==========================================
+# 不加载 akshare / tushare；指标已入库时也不加载 talib。
+# 每次运行把启动耗时和扫描耗时追加到 data/offline_timing.jsonl，便于跟踪。
+
+TIMING_FILE = os.path.join('data', 'offline_timing.jsonl')
+
+# 已移植到全市场面板的策略：(逐只检查函数, 面板版本)，策略名取逐只检查函数的声明
+PANEL_CHECKS = [
+    (turtle_trade.check_enter, turtle_trade.check_enter_panel),
+    (keep_increasing.check, keep_increasing.check_panel),
+    (climax_limitdown.check, climax_limitdown.check_panel),
+]
+
+
+def scan(codes, checks=None, root=None):
+    """
+    按本地行情库扫描 (有未过期的内存映射行情时直接取视图)，返回命中的代码。
+    checks 为 None 时与 main.py 一样按 config.yaml 的 strategies / gates 建立策略注册表 (见 registry)
+    """
+    strategies = registry.load(settings.config, work_flow.CHECKS) if checks is None \
+        else registry.Registry.of(checks)
+    hits = []
+    for code, data in market.frames(codes, root):
+        if data is None or data.empty:
+            continue
+        try:
+            if strategies.run(code, data):
+                hits.append(code)
+        except Exception as e:
+            metrics.inc(metrics.SCAN_ERRORS)
+            logging.warning("{} 策略计算失败: {!r}".format(code, e))
+    return hits
+
+
+def screen(codes, end_date=None, root=None):
+    """全市场面板扫描：已移植到面板的策略一次处理全部股票，返回 {策略名: 命中代码列表}"""
+    checks = {registry.declared(check).get('name', registry.key(check)): check_panel
+              for check, check_panel in PANEL_CHECKS}
+    return panel.screen(panel.load(codes, root), checks, end_date=end_date)
+
+
+def record(timing, file=TIMING_FILE):
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    with open(file, 'a') as f:
+        f.write(json.dumps(timing) + '\n')
+
+
+# 用法：python offline.py                    (逐只扫描)
+#       python offline.py --panel [截至日期]   (全市场面板扫描，只运行 PANEL_CHECKS 中的策略)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sequoia 离线扫描')
+    parser.add_argument('--panel', nargs='?', const='', metavar='截至日期',
+                        help='全市场面板扫描，可指定截至日期，如 2023-12-29')
+    args = parser.parse_args()
+
+    settings.init(offline=True)
+    codes = reference.codes(offline=True)
+    startup = time.perf_counter() - STARTED
+
+    # 先把行情库中更新过的股票重新打包进内存映射行情 (data/market)，扫描时不再逐只读 HDF5
+    begin = time.perf_counter()
+    market.build(codes)
+    if args.panel is not None:
+        selected = screen(codes, end_date=args.panel or None)
+        hits = sorted({code for members in selected.values() for code in members})
+    else:
+        selected = None
+        hits = scan(codes)
+    elapsed = time.perf_counter() - begin
+
+    errors = sum(item['value'] for item in metrics.summary().get(metrics.SCAN_ERRORS, []))
+    print("启动耗时 {:.2f} 秒，扫描 {} 只耗时 {:.2f} 秒，命中 {} 只".format(startup, len(codes), elapsed, len(hits)))
+    if errors:
+        print("⚠️ {} 只股票策略计算抛出异常、已跳过 (见日志)".format(errors))
+    if selected is not None:
+        for name, members in selected.items():
+            print("   {} ({}): {}".format(name, len(members), ' '.join(members)))
+    else:
+        for code in hits:
+            print("   🎯 {}".format(code))
+    record({'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'mode': 'panel' if selected is not None else 'scan',
+            'startup': round(startup, 3), 'scan': round(elapsed, 3),
+            'codes': len(codes), 'hits': len(hits), 'errors': errors,
+            'heavy_modules': sorted(m for m in ('akshare', 'tushare', 'talib') if m in sys.modules)})
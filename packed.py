@@ -0,0 +1,68 @@
+# -*- encoding: UTF-8 -*-
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import bars
+
+# ==========================================
+# 紧凑列式布局：多只股票的日线首尾相接存成每个字段一条连续数组，
+# 另有 (代码, 起始, 结束) 索引。用于跨进程共享内存，进程间不再 pickle DataFrame
+# ==========================================
+
+FIELDS = bars.COLUMNS[1:]
+
+
+def pack(frames):
+    """frames: {code: 日线 DataFrame}，返回 ({字段: 连续数组}, [(code, start, stop)])"""
+    frames = {code: data for code, data in frames.items() if data is not None and not data.empty}
+    index = []
+    start = 0
+    for code, data in frames.items():
+        index.append((code, start, start + len(data)))
+        start += len(data)
+
+    arrays = {'date': np.empty(start, dtype='int64')}
+    arrays.update({field: np.empty(start, dtype=bars.DTYPES[field]) for field in FIELDS})
+    for (code, begin, end) in index:
+        data = frames[code]
+        arrays['date'][begin:end] = pd.to_datetime(data['date']).values.astype('datetime64[ns]').view('int64')
+        for field in FIELDS:
+            arrays[field][begin:end] = data[field].values.astype(bars.DTYPES[field])
+    return arrays, index
+
+
+def unpack(arrays, start, stop, copy=True):
+    """copy=False 时各列直接是 arrays 上的视图 (例如 numpy.memmap)，不拷贝"""
+    data = {'date': arrays['date'][start:stop].view('datetime64[ns]')}
+    data.update({field: arrays[field][start:stop] for field in FIELDS})
+    return pd.DataFrame(data, copy=copy)
+
+
+def share(frames):
+    """
+    把 frames 打包进共享内存，返回 (blocks, descriptor)。
+    descriptor 可直接传给子进程 attach；用完后由创建方对每个 block 调用 close() 和 unlink()
+    """
+    arrays, index = pack(frames)
+    blocks = []
+    layout = {}
+    for name, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+        blocks.append(block)
+        layout[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, {'layout': layout, 'index': index}
+
+
+def attach(descriptor):
+    """子进程挂载共享内存，返回 (blocks, arrays)；数组是共享内存上的视图，不拷贝"""
+    blocks = []
+    arrays = {}
+    for field, (name, shape, dtype) in descriptor['layout'].items():
+        # 子进程与创建方共用同一个 resource_tracker，挂载不会多登记
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        arrays[field] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    return blocks, arrays
@@ -0,0 +1,95 @@
+# -*- encoding: UTF-8 -*-
+import numpy as np
+import pandas as pd
+
+import indicators
+import market
+
+# ==========================================
+# 全市场面板：日期 × 代码 对齐的二维数组
+# ==========================================
+# 停牌 (当天没有 K 线) 及上市前为 NaN。移植到面板的策略 (check_panel) 一次处理全部股票，
+# 返回与 panel.codes 对齐的布尔数组。
+
+FIELDS = ['open', 'high', 'low', 'close', 'volume', 'p_change']
+
+
+class Panel:
+
+    def __init__(self, dates, codes, fields):
+        self.dates = dates
+        self.codes = codes
+        self.fields = fields
+        self._order = {}
+        self._tails = {}
+
+    def rows(self, end_date=None):
+        """end_date (含) 及之前的行数"""
+        if end_date is None:
+            return len(self.dates)
+        return int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end_date)), side='right'))
+
+    def bars(self, end_date=None):
+        """每只股票截至 end_date 的 K 线根数 (不含停牌日)"""
+        return np.count_nonzero(~np.isnan(self.fields['close'][:self.rows(end_date)]), axis=0)
+
+    def tail(self, field, end_date=None):
+        """
+        按股票右对齐：每列的有效 K 线挪到底部、NaN 挪到顶部 (保持先后顺序)。
+        第 -k 行即每只股票截至 end_date 的倒数第 k 根 K 线，与逐只股票 data.tail() 的语义一致
+        """
+        rows = self.rows(end_date)
+        key = (field, rows)
+        if key not in self._tails:
+            if rows not in self._order:
+                valid = ~np.isnan(self.fields['close'][:rows])
+                self._order[rows] = np.argsort(valid, axis=0, kind='stable')
+            self._tails[key] = np.take_along_axis(self.fields[field][:rows], self._order[rows], axis=0)
+        return self._tails[key]
+
+    def select(self, mask):
+        return [code for code, hit in zip(self.codes, mask) if hit]
+
+
+def rolling_mean(values, period):
+    """按列的简单移动平均；窗口内有 NaN 时为 NaN，与 talib.MA 一致 (浮点舍入误差内)"""
+    result = np.full(values.shape, np.nan)
+    if len(values) < period:
+        return result
+    valid = ~np.isnan(values)
+    total = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    count = np.cumsum(valid, axis=0)
+    total[period:] = total[period:] - total[:-period]
+    count[period:] = count[period:] - count[:-period]
+    full = count[period - 1:] == period
+    result[period - 1:] = np.where(full, total[period - 1:] / period, np.nan)
+    return result
+
+
+def build(frames):
+    """frames: {code: 日线 DataFrame (本地行情库格式)}"""
+    codes = sorted(code for code, data in frames.items() if data is not None and not data.empty)
+    if not codes:
+        return Panel(np.array([], dtype='datetime64[ns]'), [], {f: np.empty((0, 0)) for f in FIELDS})
+    dates = np.unique(np.concatenate([frames[code]['date'].values for code in codes]))
+    fields = {f: np.full((len(dates), len(codes)), np.nan) for f in FIELDS}
+    for j, code in enumerate(codes):
+        data = frames[code]
+        rows = np.searchsorted(dates, data['date'].values)
+        for field in FIELDS[:-1]:
+            fields[field][rows, j] = data[field].values
+        # 涨跌幅按该股票自身的上一根 K 线计算，停牌复牌不受影响
+        if 'p_change' in data:
+            fields['p_change'][rows, j] = data['p_change'].values
+        else:
+            fields['p_change'][rows, j] = indicators.FUNCTIONS['roc'](data['close'].values.astype('float64'), 1)
+    return Panel(dates, codes, fields)
+
+
+def load(codes, root=None):
+    return build(dict(market.frames(codes, root)))
+
+
+def screen(panel, checks, end_date=None):
+    """checks: {策略名: check_panel 函数}，返回 {策略名: 命中代码列表}"""
+    return {name: panel.select(check(panel, end_date=end_date)) for name, check in checks.items()}
@@ -1,43 +1,138 @@
+import concurrent.futures
+import datetime
+import functools
+import html
+import threading
+import time
+
 import settings
 import requests
 from wxpusher import WxPusher
 
-def push(msg):
+# ==========================================
+# 推送：命中结果按策略汇总成一条 HTML 日报，交给后台线程发送
+# ==========================================
+# hits / strategy / statistics 只把内容放进待发送的日报，不联网；flush 把日报交给后台线程 (单线程，
+# 保持先后顺序) 后立即返回，扫描不等待推送。每次请求有超时，失败最多重试 RETRIES 次，
+# 推送服务变慢或停服时最多占用 RETRIES × (超时 + 退避) 秒，且只占用后台线程。
+# 进程退出前会等后台线程把已交出的推送发完 (上述时间内)。
+
+TITLE = "Sequoia 选股日报"
+# (连接, 读取) 超时 (秒)
+TIMEOUT = (5, 10)
+# 每条推送最多尝试的次数，两次之间等待 BACKOFF * 2^(n-1) 秒
+RETRIES = 3
+BACKOFF = 1
+
+PUSHPLUS_URL = 'http://www.pushplus.plus/send'
+
+# 待发送的日报：策略名 -> 命中的代码，以及附加的文字段落
+_pending = {}
+_notes = []
+_lock = threading.Lock()
+_executor = None
+
+
+def _config():
+    config = getattr(settings, 'config', None)
+    config = config if isinstance(config, dict) else {}
+    return config.get('push') or {}
+
+
+def _pushplus(token, msg, title):
+    response = requests.post(PUSHPLUS_URL, json={"token": token, "title": title, "content": msg,
+                                                 "template": "html"}, timeout=TIMEOUT)
+    print(f"PushPlus 响应: {response.text}")
+    response.raise_for_status()
+    if response.json().get('code') != 200:
+        raise RuntimeError(response.text)
+
+
+def _wxpusher(push_config, msg):
+    result = WxPusher.send_message(msg, uids=[push_config['wxpusher_uid']], token=push_config['wxpusher_token'],
+                                   content_type=2)
+    if isinstance(result, dict) and result.get('success') is False:
+        raise RuntimeError(result.get('msg'))
+
+
+def send(msg, title=TITLE, retries=RETRIES):
+    """同步发送一条推送 (在后台线程中调用)，返回是否成功"""
     # 获取推送配置
-    push_config = settings.config['push']
-    
+    push_config = _config()
+
     # 优先检查是否有 PushPlus Token
-    if 'pushplus_token' in push_config and push_config['pushplus_token']:
+    if push_config.get('pushplus_token'):
         print("正在尝试使用 PushPlus 推送...")
-        url = 'http://www.pushplus.plus/send'
-        data = {
-            "token": push_config['pushplus_token'],
-            "title": "Sequoia 选股日报",
-            "content": msg,
-            "template": "html"
-        }
-        try:
-            response = requests.post(url, json=data)
-            print(f"PushPlus 响应: {response.text}")
-        except Exception as e:
-            print(f"PushPlus 推送失败: {e}")
-            
+        channel = 'PushPlus'
+        deliver = functools.partial(_pushplus, push_config['pushplus_token'], msg, title)
     # 如果没有 PushPlus，再尝试 WxPusher (兼容旧代码)
-    elif 'wxpusher_token' in push_config and push_config['wxpusher_token']:
+    elif push_config.get('wxpusher_token'):
         print("正在尝试使用 WxPusher 推送...")
-        try:
-            WxPusher.send_message(
-                msg, 
-                uids=[push_config['wxpusher_uid']],
-                token=push_config['wxpusher_token']
-            )
-        except Exception as e:
-            print(f"WxPusher 推送失败: {e}")
+        channel = 'WxPusher'
+        deliver = functools.partial(_wxpusher, push_config, msg)
     else:
         print("未检测到有效的推送 Token，跳过推送。")
+        return False
+
+    for attempt in range(1, retries + 1):
+        try:
+            deliver()
+            return True
+        except Exception as e:
+            print(f"{channel} 推送失败 (第 {attempt}/{retries} 次): {e}")
+            if attempt < retries:
+                time.sleep(BACKOFF * 2 ** (attempt - 1))
+    return False
+
+
+def push(msg, title=TITLE):
+    """交给后台线程发送，立即返回 Future (结果为是否发送成功)"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='push')
+        return _executor.submit(send, msg, title)
+
+
+def hits(selected):
+    """selected: {代码: 命中的策略名列表}，按策略并入待发送的日报"""
+    with _lock:
+        for code, names in selected.items():
+            for name in names:
+                codes = _pending.setdefault(name, [])
+                if code not in codes:
+                    codes.append(code)
+
+
+def digest(pending, notes=(), missing=(), title=TITLE):
+    """日报 HTML：每个策略一段 (命中数和代码)，命中多的策略在前"""
+    codes = {code for members in pending.values() for code in members}
+    parts = ["<h3>{} {}</h3>".format(html.escape(title), datetime.date.today().strftime('%Y-%m-%d')),
+             "<p>共选中 {} 只</p>".format(len(codes)) if codes else "<p>今日无符合条件的股票。</p>"]
+    for name, members in sorted(pending.items(), key=lambda item: (-len(item[1]), item[0])):
+        parts.append("<h4>{} ({})</h4>".format(html.escape(name), len(members)))
+        parts.append("<p>{}</p>".format('、'.join(html.escape(code) for code in sorted(members))))
+    parts += ["<p>{}</p>".format(html.escape(note).replace('\n', '<br>')) for note in notes if note]
+    if missing:
+        parts.append("<p>(缺少分片 {}，结果不完整)</p>".format(', '.join(str(index) for index in missing)))
+    return '\n'.join(parts)
+
+
+def flush(missing=(), title=TITLE):
+    """把待发送的日报交给后台线程并清空，立即返回 Future"""
+    with _lock:
+        pending = {name: list(codes) for name, codes in _pending.items()}
+        notes = list(_notes)
+        _pending.clear()
+        _notes.clear()
+    return push(digest(pending, notes, missing, title), title)
+
 
 def statistics(msg):
-    push(msg)
+    with _lock:
+        _notes.append(msg)
+
 
 def strategy(msg):
-    push(msg)
+    with _lock:
+        _notes.append(msg)
@@ -0,0 +1,144 @@
+# -*- encoding: UTF-8 -*-
+import logging
+import os
+import time
+
+import pandas as pd
+
+# ==========================================
+# 参考数据缓存：股票名单 (代码、名称、上市日期) 与龙虎榜机构名单
+# ==========================================
+# 缓存文件未过期时直接读本地，启动不联网；过期后重新拉取，拉取失败时继续使用过期的缓存。
+# 名单与 stock_codes.txt 放在一起 (stock_info.csv)，龙虎榜名单放在 data/ 下。
+
+STOCK_CODES = 'stock_codes.txt'
+STOCK_INFO = 'stock_info.csv'
+TOP_LIST = os.path.join('data', 'top_list.txt')
+
+# 有效期 (秒)
+UNIVERSE_TTL = 7 * 24 * 3600
+TOP_LIST_TTL = 24 * 3600
+
+
+def fresh(file, ttl):
+    return os.path.exists(file) and time.time() - os.path.getmtime(file) < ttl
+
+
+def _cached(file, ttl, fetch, read, write, force=False, offline=False):
+    if offline:
+        # 离线：只读本地缓存，过期也用
+        return read(file) if os.path.exists(file) else None
+    if not force and fresh(file, ttl):
+        return read(file)
+    try:
+        value = fetch()
+    except Exception as e:
+        logging.warning("参考数据更新失败 {}: {}".format(file, e))
+        value = None
+    if value is not None and len(value) > 0:
+        write(file, value)
+        return value
+    if os.path.exists(file):
+        logging.warning("使用过期的参考数据 {}".format(file))
+        return read(file)
+    return value
+
+
+# ------------------------------------------
+# 股票名单
+# ------------------------------------------
+
+def _main_board(codes):
+    # 只保留主板 (60 开头或 00 开头)
+    return codes.str.startswith('60') | codes.str.startswith('00')
+
+
+def _fetch_universe():
+    # --- 通道 A: Tushare (优先，自带后缀和上市日期) ---
+    token = os.environ.get('TS_TOKEN')
+    if token:
+        try:
+            import tushare as ts
+            ts.set_token(token)
+            df = ts.pro_api().stock_basic(exchange='', list_status='L', fields='ts_code,name,list_date')
+            df = df.rename(columns={'ts_code': 'code'})
+            df = df.loc[_main_board(df['code'])]
+            if len(df) > 1000:
+                print(f"   ✅ Tushare 获取成功: {len(df)} 只")
+                return df[['code', 'name', 'list_date']]
+        except Exception as e:
+            print(f"   ⚠️ Tushare 失败: {e}")
+
+    # --- 通道 B: Akshare (备用，需手动补后缀，没有上市日期) ---
+    import akshare as ak
+    df = ak.stock_info_a_code_name()
+    codes = df['code'].astype(str).str.zfill(6)
+    df = pd.DataFrame({'code': codes + codes.str.startswith('60').map({True: '.SH', False: '.SZ'}),
+                       'name': df['name'], 'list_date': ''})
+    df = df.loc[_main_board(codes)]
+    if len(df) > 1000:
+        print(f"   ✅ Akshare 获取成功: {len(df)} 只")
+        return df
+    return None
+
+
+def _read_universe(file):
+    return pd.read_csv(file, dtype=str, keep_default_na=False)
+
+
+def _write_universe(file, df):
+    df = df.sort_values('code').drop_duplicates('code')
+    df.to_csv(file, index=False)
+    # 兼容只读代码列表的用法
+    with open(STOCK_CODES, 'w') as f:
+        f.write('\n'.join(df['code']))
+
+
+def universe(force=False, offline=False):
+    """股票名单 DataFrame (code 带后缀、name、list_date 为 YYYYMMDD，未知时为空串)"""
+    df = _cached(STOCK_INFO, UNIVERSE_TTL, _fetch_universe, _read_universe, _write_universe, force, offline)
+    if df is None and os.path.exists(STOCK_CODES):
+        # 只有旧版的代码列表
+        with open(STOCK_CODES) as f:
+            codes = sorted({line.strip() for line in f if line.strip()})
+        df = pd.DataFrame({'code': codes, 'name': '', 'list_date': ''})
+    return df
+
+
+def codes(force=False, offline=False):
+    df = universe(force, offline)
+    return [] if df is None else sorted(set(df['code']))
+
+
+def names(force=False, offline=False):
+    """{代码: 名称}"""
+    df = universe(force, offline)
+    return {} if df is None else dict(zip(df['code'], df['name']))
+
+
+# ------------------------------------------
+# 龙虎榜机构名单
+# ------------------------------------------
+
+def _fetch_top_list():
+    import akshare as ak
+    df = ak.stock_lhb_stock_statistic_em(symbol="近三月")
+    mask = (df['买方机构次数'] > 1)  # 机构买入次数大于1
+    return df.loc[mask]['代码'].astype(str).tolist()
+
+
+def _read_top_list(file):
+    with open(file) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _write_top_list(file, codes):
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    with open(file, 'w') as f:
+        f.write('\n'.join(codes))
+
+
+def top_list(force=False, offline=False):
+    """近三月机构买入次数大于 1 的股票代码 (6 位，无后缀)，返回集合供逐只判断"""
+    return frozenset(_cached(TOP_LIST, TOP_LIST_TTL, _fetch_top_list, _read_top_list, _write_top_list,
+                             force, offline) or [])
@@ -0,0 +1,176 @@
+# -*- encoding: UTF-8 -*-
+import functools
+import importlib
+import sys
+
+import indicators
+import metrics
+
+# ==========================================
+# 策略注册表：config.yaml 决定启用哪些策略，按开销从低到高调度
+# ==========================================
+# 各策略模块在 REQUIREMENTS 中为检查函数声明：
+#   name         策略名 (用于输出和推送)
+#   min_history  最少 K 线数，不足时该策略必然不命中，直接跳过不调用
+#   indicators   用到的指标 (indicators 的缓存键，如 ('ma', 'close', 30))
+#   cost         估计开销，相对值 (以 turtle_trade.check_enter 为 1，由 tests/benchmark.py 测得)
+#
+# 每只股票先过门槛 (gates：排除新股、成交额下限等)，门槛按开销从低到高检查，任一不通过即跳过该股票
+# 余下的全部检查；之后各策略同样按开销从低到高运行。大部分股票在最便宜的几步就被排除，
+# 只有值得关注的股票才会跑完全部策略。
+#
+# config.yaml 示例：
+#   gates:
+#     listed_days: 60        # 排除上市不足 60 个交易日的新股
+#     turnover: 200000000    # 最后一天成交额不低于 2 亿元
+#   strategies:
+#     - turtle_trade.check_enter
+#     - check: enter.check_volume
+#       cost: 2              # 可覆盖声明的 name / min_history / cost
+
+# 门槛：config.yaml 中 gates 的键 -> (检查函数, 配置值对应的参数名, 检查函数命中时是否为不通过)
+GATES = {
+    'listed_days': ('enter.check_new', 'threshold', True),
+    'turnover': ('enter.check_turnover', 'threshold', False),
+}
+
+
+def key(check):
+    """检查函数的注册名，如 enter.check_volume"""
+    return '{}.{}'.format(check.__module__.rsplit('.', 1)[-1], check.__name__)
+
+
+def resolve(name):
+    """注册名 -> strategy 包中的检查函数"""
+    module, _, func = name.rpartition('.')
+    try:
+        return getattr(importlib.import_module('strategy.' + module), func)
+    except (ImportError, AttributeError, ValueError):
+        raise ValueError("未知的策略 {}".format(name))
+
+
+def declared(check):
+    """策略模块 REQUIREMENTS 中对该检查函数的声明，未声明时为空"""
+    requirements = getattr(sys.modules[check.__module__], 'REQUIREMENTS', {})
+    return dict(requirements.get(check.__name__, {}))
+
+
+class Strategy:
+
+    def __init__(self, check, name=None, min_history=None, indicators=(), cost=1.0):
+        self.check = check
+        self.key = key(check)
+        self.name = name or self.key
+        self.indicators = [tuple(spec) for spec in indicators]
+        self.cost = cost
+        # 未声明时按用到的指标推算：指标算不出第一个值之前不可能命中
+        self.min_history = min_history if min_history is not None else self.lookback()
+
+    def lookback(self):
+        for spec in self.indicators:
+            if spec[0] not in indicators.LOOKBACK:
+                raise ValueError("{} 声明了未知的指标 {}".format(self.key, spec))
+        return max((indicators.LOOKBACK[spec[0]](*spec[2:]) for spec in self.indicators), default=0)
+
+    @classmethod
+    def of(cls, check, **overrides):
+        info = declared(check)
+        info.update(overrides)
+        return cls(check, **info)
+
+    def run(self, code_name, data):
+        if len(data) < self.min_history:
+            return False
+        return metrics.measure(self.key, self.check, code_name, data) is True
+
+
+class Gate(Strategy):
+
+    def __init__(self, gate, value):
+        if gate not in GATES:
+            raise ValueError("未知的门槛 {}".format(gate))
+        name, param, reject = GATES[gate]
+        check = resolve(name)
+        info = declared(check)
+        super().__init__(check, name=gate, indicators=info.get('indicators', ()), cost=info.get('cost', 1.0))
+        # 门槛只用配置值作为参数，历史长度由检查函数自己判断
+        self.min_history = 0
+        self.key = 'gate.' + gate
+        self.params = {param: value}
+        self.reject = reject
+
+    def run(self, code_name, data):
+        """是否通过门槛"""
+        hit = metrics.measure(self.key, functools.partial(self.check, **self.params), code_name, data) is True
+        return hit != self.reject
+
+    def prefilter(self):
+        """快照预筛条件 (检查函数所在模块中的 <检查函数>_prefilter)，没有时返回 None"""
+        predicate = getattr(sys.modules[self.check.__module__], self.check.__name__ + '_prefilter', None)
+        if predicate is None or self.reject:
+            return None
+        return functools.partial(predicate, **self.params)
+
+
+class Registry:
+
+    def __init__(self, strategies, gates=()):
+        # 稳定排序：开销相同的保持配置中的顺序
+        self.strategies = sorted(strategies, key=lambda s: s.cost)
+        self.gates = sorted(gates, key=lambda g: g.cost)
+        # 比所有策略要求的都短时，不必再检查任何门槛和策略
+        self.min_history = min((s.min_history for s in self.strategies), default=0)
+
+    @classmethod
+    def of(cls, checks):
+        """由检查函数列表建立，不设门槛"""
+        return cls([Strategy.of(check) for check in checks])
+
+    @property
+    def checks(self):
+        return [s.check for s in self.strategies]
+
+    @property
+    def meta(self):
+        """启用的门槛和策略，用于判断扫描日志是否仍然有效"""
+        return {'gates': {g.name: g.params for g in self.gates},
+                'strategies': [[s.key, s.name] for s in self.strategies]}
+
+    @property
+    def indicators(self):
+        """启用的门槛和策略用到的全部指标"""
+        return sorted({spec for s in self.gates + self.strategies for spec in s.indicators})
+
+    def prefilters(self):
+        """门槛的快照预筛条件 (必须全部满足)"""
+        return [p for p in (gate.prefilter() for gate in self.gates) if p is not None]
+
+    def run(self, code, data):
+        """按开销从低到高检查一只股票，返回命中的策略名列表 (没有命中时为空)"""
+        if len(data) < self.min_history:
+            return []
+        code_name = (code[:6], code)
+        for gate in self.gates:
+            if not gate.run(code_name, data):
+                return []
+        return [s.name for s in self.strategies if s.run(code_name, data)]
+
+
+def strategy(entry):
+    """config.yaml 中 strategies 的一项：注册名，或带 check 键和覆盖项的字典"""
+    if isinstance(entry, str):
+        return Strategy.of(resolve(entry))
+    entry = dict(entry)
+    return Strategy.of(resolve(entry.pop('check')), **entry)
+
+
+def load(config=None, default=()):
+    """
+    按 config.yaml 的 strategies / gates 建立注册表；没有配置 strategies 时启用 default 中的检查函数，
+    没有配置 gates 时不设门槛
+    """
+    config = config if isinstance(config, dict) else {}
+    strategies = [strategy(entry) for entry in config.get('strategies') or []] \
+        or [Strategy.of(check) for check in default]
+    gates = [Gate(gate, value) for gate, value in (config.get('gates') or {}).items() if value]
+    return Registry(strategies, gates)
@@ -0,0 +1,213 @@
+# -*- encoding: UTF-8 -*-
+import contextlib
+import datetime
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import indicators
+import metrics
+import store
+
+# ==========================================
+# 选股结果库：SQLite (data/stock.db)，保留每次运行的命中记录
+# ==========================================
+#   runs     每次运行一行：运行 ID、开始/结束时间、交易日、扫描和选中的股票数
+#   signals  每个 (股票, 策略) 命中一行：信号日期和当天的收盘价、涨跌幅、量比、成交额
+#   timings  每次运行各阶段耗时、各策略 CPU 时间和各数据源请求耗时 (取自 metrics)
+#
+# 扫描过程中不写库：运行结束时一次性在同一个事务中批量写入。同一运行 ID 再次写入 (断点续跑、重新运行)
+# 时替换该次运行的记录。命中股票的指标按本地行情库计算，只读命中的几十只，不影响扫描。
+
+FILE = os.path.join('data', 'stock.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL UNIQUE,
+    started TEXT,
+    finished TEXT,
+    trade_date TEXT,
+    codes INTEGER,
+    selected INTEGER
+);
+CREATE TABLE IF NOT EXISTS signals (
+    run INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    code TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    date TEXT NOT NULL,
+    close REAL,
+    p_change REAL,
+    vol_ratio REAL,
+    amount REAL
+);
+CREATE INDEX IF NOT EXISTS signals_date ON signals (date);
+CREATE INDEX IF NOT EXISTS signals_code ON signals (code, date);
+CREATE INDEX IF NOT EXISTS signals_strategy ON signals (strategy, date);
+CREATE TABLE IF NOT EXISTS timings (
+    run INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    seconds REAL,
+    count INTEGER
+);
+CREATE INDEX IF NOT EXISTS timings_run ON timings (run);
+"""
+
+# 旧版本的 data/stock.db 是逐行的代码列表 (文本文件)，首次打开时改名保留
+_MAGIC = b'SQLite format 3\x00'
+
+
+def _migrate(file):
+    if not os.path.exists(file) or os.path.getsize(file) == 0:
+        return
+    with open(file, 'rb') as f:
+        if f.read(len(_MAGIC)) == _MAGIC:
+            return
+    logging.warning("{} 不是 SQLite 数据库 (旧版的选股列表)，已改名为 {}.txt".format(file, file))
+    os.replace(file, file + '.txt')
+
+
+@contextlib.contextmanager
+def connect(file=None):
+    file = file or FILE
+    os.makedirs(os.path.dirname(file) or '.', exist_ok=True)
+    _migrate(file)
+    conn = sqlite3.connect(file)
+    try:
+        conn.execute('PRAGMA foreign_keys = ON')
+        conn.executescript(SCHEMA)
+        yield conn
+    finally:
+        conn.close()
+
+
+def _last(values):
+    value = float(values[-1]) if len(values) else float('nan')
+    return None if np.isnan(value) else value
+
+
+def features(data):
+    """信号当天 (最后一根 K 线) 的日期、收盘价、涨跌幅、量比 (对前一日的 5 日均量) 和成交额 (元)"""
+    if data is None or data.empty:
+        return {}
+    close = indicators.column(data, 'close')
+    vol = indicators.column(data, 'volume')
+    vol_ma5 = indicators.vol_ma(data, 5)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vol_ratio = vol[-1] / vol_ma5[-2] if len(vol_ma5) > 1 else np.nan
+    return {
+        'date': pd.Timestamp(data['date'].iloc[-1]).strftime('%Y-%m-%d'),
+        'close': _last(close),
+        'p_change': _last(indicators.p_change(data)),
+        'vol_ratio': _last([vol_ratio]),
+        'amount': _last(close[-1:] * vol[-1:] * 100),
+    }
+
+
+def _timings():
+    """metrics 中的各阶段耗时、策略 CPU 时间和数据源请求耗时：[(kind, name, seconds, count)]"""
+    summary = metrics.summary()
+    calls = {item['labels'].get('strategy'): item['value'] for item in summary.get(metrics.STRATEGY_CALLS, [])}
+    # 分片汇总时各片的阶段耗时带 shard 标签，记为 阶段#序号
+    rows = [('stage', '#'.join(str(item['labels'][k]) for k in ('stage', 'shard') if k in item['labels']),
+             item['value'], None) for item in summary.get(metrics.STAGE_SECONDS, [])]
+    rows += [('strategy', item['labels'].get('strategy'), item['value'], calls.get(item['labels'].get('strategy')))
+             for item in summary.get(metrics.STRATEGY_CPU, [])]
+    rows += [('fetch', item['labels'].get('source'), item['sum'], item['count'])
+             for item in summary.get(metrics.FETCH_SECONDS, [])]
+    return rows
+
+
+def save_run(run_id, selected, codes=0, started=None, signals=None, timings=None, file=None):
+    """
+    写入一次运行：selected 为 {代码: 命中的策略名列表}；signals 为 {代码: features 的结果}，
+    为 None 时按本地行情库计算；timings 为 None 时取自 metrics。返回 runs 表中的 id
+    """
+    if signals is None:
+        signals = {code: features(store.load(code)) for code in selected}
+    timings = _timings() if timings is None else timings
+    today = datetime.date.today().strftime('%Y-%m-%d')
+    trade_date = max((info['date'] for info in signals.values() if info.get('date')), default=today)
+    finished = time.strftime('%Y-%m-%d %H:%M:%S')
+
+    rows = []
+    for code, hits in selected.items():
+        info = signals.get(code) or {}
+        for strategy in hits:
+            rows.append((code, strategy, info.get('date') or trade_date, info.get('close'), info.get('p_change'),
+                         info.get('vol_ratio'), info.get('amount')))
+
+    with connect(file) as conn, conn:
+        conn.execute('DELETE FROM runs WHERE run_id = ?', (str(run_id),))
+        run = conn.execute('INSERT INTO runs (run_id, started, finished, trade_date, codes, selected) '
+                           'VALUES (?, ?, ?, ?, ?, ?)',
+                           (str(run_id), started or finished, finished, trade_date, codes, len(selected))).lastrowid
+        conn.executemany('INSERT INTO signals (run, code, strategy, date, close, p_change, vol_ratio, amount) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', [(run,) + row for row in rows])
+        conn.executemany('INSERT INTO timings (run, kind, name, seconds, count) VALUES (?, ?, ?, ?, ?)',
+                         [(run,) + tuple(row) for row in timings])
+    return run
+
+
+# ==========================================
+# 查询
+# ==========================================
+
+def _since(days):
+    return (datetime.date.today() - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+def _query(sql, params=(), file=None):
+    with connect(file) as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+
+def runs(limit=10, file=None):
+    """最近 limit 次运行，新的在前"""
+    return _query('SELECT * FROM runs ORDER BY finished DESC, id DESC LIMIT ?', (limit,), file)
+
+
+def recent(days=30, code=None, strategy=None, file=None):
+    """最近 days 天的信号，可按代码、策略过滤，新的在前"""
+    sql = 'SELECT runs.run_id, signals.* FROM signals JOIN runs ON runs.id = signals.run WHERE signals.date >= ?'
+    params = [_since(days)]
+    if code is not None:
+        sql += ' AND signals.code = ?'
+        params.append(code)
+    if strategy is not None:
+        sql += ' AND signals.strategy = ?'
+        params.append(strategy)
+    return _query(sql + ' ORDER BY signals.date DESC, signals.code', params, file)
+
+
+def recurrence(days=30, min_count=2, file=None):
+    """最近 days 天各股票被同一策略选中的天数 (不少于 min_count)，多的在前"""
+    return _query('SELECT code, strategy, COUNT(DISTINCT date) AS days, MIN(date) AS first, MAX(date) AS last '
+                  'FROM signals WHERE date >= ? GROUP BY code, strategy HAVING days >= ? '
+                  'ORDER BY days DESC, last DESC, code', (_since(days), min_count), file)
+
+
+def timings(run_id=None, file=None):
+    """一次运行 (默认最近一次) 的耗时明细"""
+    if run_id is None:
+        latest = runs(1, file)
+        if latest.empty:
+            return pd.DataFrame(columns=['kind', 'name', 'seconds', 'count'])
+        run_id = latest['run_id'].iloc[0]
+    return _query('SELECT kind, name, seconds, count FROM timings JOIN runs ON runs.id = timings.run '
+                  'WHERE runs.run_id = ? ORDER BY kind, seconds DESC', (str(run_id),), file)
+
+
+if __name__ == '__main__':
+    # python results.py [天数]：最近的运行、信号和反复出现的股票
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    with pd.option_context('display.max_rows', 200, 'display.width', 200):
+        print(runs())
+        print(recent(days))
+        print(recurrence(days))
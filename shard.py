@@ -0,0 +1,96 @@
+# -*- encoding: UTF-8 -*-
+import json
+import os
+import time
+import zlib
+
+import metrics
+
+# ==========================================
+# 分片扫描：名单按代码的 CRC32 确定性地分成 count 片，每片单独扫描，最后汇总
+# ==========================================
+# 同一只股票在任何机器、任何 Python 进程中都落在同一片 (不依赖名单顺序和 hash 随机化)，
+# 各片可以是 CI 矩阵中的不同任务，也可以是本机的多个进程：
+#   python main.py --shard 0/4    ...    python main.py --shard 3/4
+#   python main.py --merge 4
+# 每片的结果 (命中、扫描数、运行指标) 写入 data/shards/<运行 ID>/<序号>-of-<片数>.json，
+# 汇总时合并各片，统一写结果库、运行指标并推送。各片与汇总须使用同一运行 ID (见 journal.run_id)。
+
+ROOT = os.path.join('data', 'shards')
+
+
+def parse(text):
+    """'0/4' -> (0, 4)"""
+    try:
+        index, count = (int(part) for part in str(text).split('/'))
+    except ValueError:
+        raise ValueError("分片格式应为 序号/片数，如 0/4: {}".format(text))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError("分片序号应在 0 到 {} 之间: {}".format(count - 1, text))
+    return index, count
+
+
+def owner(code, count):
+    """代码所属的分片序号"""
+    return zlib.crc32(code.encode('utf-8')) % count
+
+
+def partition(codes, index, count):
+    """codes 中属于第 index 片的代码，保持原有顺序"""
+    return [code for code in codes if owner(code, count) == index]
+
+
+def suffix(config=None):
+    """分片模式下扫描日志等按片区分的后缀，非分片模式为空"""
+    config = config if isinstance(config, dict) else {}
+    if not config.get('shard'):
+        return ''
+    return '.{}-of-{}'.format(*config['shard'])
+
+
+def path(run_id, index, count, root=None):
+    return os.path.join(root or ROOT, str(run_id), '{}-of-{}.json'.format(index, count))
+
+
+def write(run_id, index, count, codes, selected, signals=None, root=None):
+    """
+    写入一片的结果：codes 为本片扫描的股票数，selected 为 {代码: 命中的策略名列表}，
+    signals 为 {代码: 信号当天的指标} (见 results.features，汇总的任务可能没有各片的本地行情库)
+    """
+    file = path(run_id, index, count, root)
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    report = {'run_id': str(run_id), 'shard': index, 'count': count, 'codes': codes, 'selected': selected,
+              'signals': signals or {}, 'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+              'metrics': metrics.snapshot()}
+    # 先写临时文件再替换，汇总时不会读到写了一半的文件
+    with open(file + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False)
+    os.replace(file + '.tmp', file)
+    return file
+
+
+def merge(run_id, count, root=None):
+    """
+    汇总各片：返回 {'codes': 扫描总数, 'selected': {代码: 命中的策略名列表}, 'signals': {代码: 信号当天的指标},
+    'missing': [缺失的分片序号]}。
+    各片的运行指标并入本进程的 metrics (计数器和直方图累加，仪表按片加 shard 标签)
+    """
+    codes = 0
+    selected = {}
+    signals = {}
+    missing = []
+    for index in range(count):
+        try:
+            with open(path(run_id, index, count, root), encoding='utf-8') as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            missing.append(index)
+            continue
+        codes += report['codes']
+        selected.update(report['selected'])
+        signals.update(report.get('signals') or {})
+        for sample in report['metrics']:
+            if sample['type'] == metrics.GAUGE:
+                sample['labels']['shard'] = index
+        metrics.merge(report['metrics'])
+    return {'codes': codes, 'selected': dict(sorted(selected.items())), 'signals': signals, 'missing': missing}
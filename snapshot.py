@@ -0,0 +1,100 @@
+# -*- encoding: UTF-8 -*-
+import re
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+import health
+import metrics
+
+# ==========================================
+# 新浪全市场行情快照
+# ==========================================
+# hq.sinajs.cn/list= 支持一次查询多个代码 (逗号分隔)，每次请求几百只，
+# 复用同一个连接池，整个市场只需几次请求。
+
+URL = 'http://hq.sinajs.cn/list='
+# 每次请求的代码数
+BATCH_SIZE = 500
+# 新浪行情接口要求带 Referer，否则返回 403
+HEADERS = {'Referer': 'https://finance.sina.com.cn'}
+TIMEOUT = 5
+
+COLUMNS = ['code', 'name', 'date', 'open', 'high', 'low', 'close', 'pre_close', 'volume', 'amount', 'p_change']
+
+# var hq_str_sz000001="平安银行,10.00,...";
+_LINE = re.compile(r'hq_str_(s[hz]\d{6})="([^"]*)"')
+
+_session = None
+
+
+def session():
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        _session.mount('http://', adapter)
+        _session.mount('https://', adapter)
+        _session.headers.update(HEADERS)
+    return _session
+
+
+def symbol(code):
+    """000001.SZ -> sz000001，无法识别时返回 None"""
+    if code.endswith('.SZ'):
+        return 'sz' + code[:6]
+    if code.endswith('.SH'):
+        return 'sh' + code[:6]
+    return None
+
+
+def parse(text):
+    """
+    批量解析行情文本，返回每只股票一行 (成交量单位为手，p_change 为涨跌幅%)。
+    未知代码、停牌 (开盘价为 0) 的股票不在结果中
+    """
+    rows = []
+    for sina_code, body in _LINE.findall(text):
+        fields = body.split(',')
+        if len(fields) <= 31:
+            continue
+        code = sina_code[2:] + ('.SH' if sina_code.startswith('sh') else '.SZ')
+        rows.append([code, fields[0], fields[30], fields[1], fields[4], fields[5], fields[3], fields[2],
+                     fields[8], fields[9]])
+    if not rows:
+        return pd.DataFrame(columns=COLUMNS)
+
+    data = pd.DataFrame(rows, columns=COLUMNS[:-1])
+    data['date'] = pd.to_datetime(data['date'], errors='coerce')
+    for column in ['open', 'high', 'low', 'close', 'pre_close', 'volume', 'amount']:
+        data[column] = pd.to_numeric(data[column], errors='coerce')
+    data['volume'] = data['volume'] / 100
+    data = data.loc[data['open'] > 0].reset_index(drop=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        data['p_change'] = (data['close'] / data['pre_close'] - 1) * 100
+    return data
+
+
+def fetch(codes, batch_size=BATCH_SIZE):
+    """全市场快照：codes 为带后缀的代码，返回 parse 格式的 DataFrame；失败的批次跳过"""
+    symbols = [s for s in (symbol(code) for code in codes) if s]
+    breaker = health.breaker('sina')
+    frames = []
+    for i in range(0, len(symbols), batch_size):
+        if not breaker.allow():
+            break
+        try:
+            with metrics.timer(metrics.FETCH_SECONDS, source='sina'):
+                resp = session().get(URL + ','.join(symbols[i:i + batch_size]), timeout=TIMEOUT)
+            resp.raise_for_status()
+        except Exception:
+            breaker.failure()
+            metrics.inc(metrics.FETCH_FAILURES, source='sina')
+            continue
+        breaker.success()
+        frames.append(parse(resp.text))
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(frames, ignore_index=True)
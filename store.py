@@ -0,0 +1,211 @@
+# -*- encoding: UTF-8 -*-
+import datetime
+import json
+import logging
+import os
+import threading
+
+import pandas as pd
+
+import bars
+import incremental
+import indicators
+
+# ==========================================
+# 本地行情库：每只股票一个 HDF5 分区 (data/history/000001.SZ.h5)
+# ==========================================
+# 按 bars 的统一格式入库，各数据源多余的字段不入库，保证追加时表结构一致
+ROOT = os.path.join('data', 'history')
+KEY = 'daily'
+COLUMNS = bars.COLUMNS
+# 同一文件中与日线逐行对齐的指标序列 (incremental.SPECS)，推进状态另存为 <代码>.state.json
+INDICATORS = 'indicators'
+
+# 增量更新时与库中重叠的 K 线数：这段时间内的除权除息 (包括之前用未复权数据补上、跨过除权日的尾部)
+# 在下次用前复权数据源更新时都能发现
+OVERLAP = 20
+
+# PyTables 不是线程安全的，所有读写串行化
+_lock = threading.Lock()
+
+
+def path(code, root=None):
+    return os.path.join(root or ROOT, '{}.h5'.format(code))
+
+
+def state_path(code, root=None):
+    return os.path.join(root or ROOT, '{}.state.json'.format(code))
+
+
+def _read_state(code, root=None):
+    try:
+        with open(state_path(code, root)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_state(code, state, root=None):
+    # 先写临时文件再替换，中途失败不会留下半个状态
+    file = state_path(code, root)
+    with open(file + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(file + '.tmp', file)
+
+
+def _save_indicators(code, data, root=None):
+    """按整段历史重算指标序列和推进状态"""
+    series, states = incremental.build(data)
+    with _lock:
+        pd.DataFrame(series).to_hdf(path(code, root), key=INDICATORS, mode='a', format='table', index=False)
+        _write_state(code, {'rows': len(data), 'indicators': states}, root)
+
+
+def _append_indicators(code, data, rows, root=None):
+    """新 K 线逐根推进指标状态；状态缺失或与库中行数对不上时整段重算"""
+    state = _read_state(code, root)
+    if state is None or state.get('rows') != rows \
+            or set(state.get('indicators', {})) != {incremental.name(spec) for spec in incremental.SPECS}:
+        _save_indicators(code, load(code, root), root)
+        return
+    series, states = incremental.build(data, state['indicators'])
+    with _lock:
+        pd.DataFrame(series).to_hdf(path(code, root), key=INDICATORS, mode='a', format='table', append=True,
+                                    index=False)
+        _write_state(code, {'rows': rows + len(data), 'indicators': states}, root)
+
+
+def load(code, root=None):
+    """读取本地历史，不存在时返回 None"""
+    file = path(code, root)
+    if not os.path.exists(file):
+        return None
+    try:
+        with _lock:
+            data = pd.read_hdf(file, KEY)
+            with pd.HDFStore(file, mode='r') as hdf:
+                series = hdf.get(INDICATORS) if '/' + INDICATORS in hdf.keys() else None
+    except Exception as e:
+        logging.warning("本地行情读取失败 {}: {}".format(code, e))
+        return None
+    if not bars.is_canonical(data):
+        # 旧版本按 float64 入库的分区，读出时统一转换
+        data = bars.normalize(data)
+    else:
+        data = data.reset_index(drop=True)
+    if series is not None and len(series) == len(data):
+        # 已入库的指标直接放进指标缓存，策略不再全量重算
+        indicators.preload(data, {spec: series[incremental.name(spec)].values for spec in incremental.SPECS
+                                  if incremental.name(spec) in series})
+    return data
+
+
+def last_date(code, root=None):
+    data = load(code, root)
+    if data is None or data.empty:
+        return None
+    return data['date'].iloc[-1]
+
+
+def save(code, data, root=None):
+    """整表覆盖写入 (首次入库或复权因子变化后重建)"""
+    file = path(code, root)
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    data = bars.normalize(data)
+    with _lock:
+        data.to_hdf(file, key=KEY, mode='w', format='table', index=False)
+    _save_indicators(code, data, root)
+    return data
+
+
+def append(code, data, root=None):
+    """只追加库中最后日期之后的新 K 线 (指标状态同步推进)，返回实际追加的行"""
+    cached = load(code, root)
+    if cached is None or cached.empty:
+        return save(code, data, root)
+    data = bars.normalize(data)
+    data = data.loc[data['date'] > cached['date'].iloc[-1]].reset_index(drop=True)
+    if data.empty:
+        return data
+    try:
+        with _lock:
+            data.to_hdf(path(code, root), key=KEY, mode='a', format='table', append=True, index=False)
+    except ValueError:
+        # 表结构与旧分区不一致 (旧版本按 float64 入库)，整表按新格式重写
+        save(code, pd.concat([cached, data], ignore_index=True), root)
+        return data
+    _append_indicators(code, data, len(cached), root)
+    return data
+
+
+def _same_bars(cached, fresh):
+    # 复权因子变化 (除权除息) 时，库中旧 K 线与新拉取的同日 K 线收盘价不再一致。
+    # 除权日之后的 K 线前复权与未复权价格相同，只比最后一根发现不了，重叠的 K 线逐根比较
+    both = cached[['date', 'close']].merge(fresh[['date', 'close']], on='date')
+    return bool((both['close_x'].astype('float64') - both['close_y'].astype('float64')).abs().lt(1e-6).all())
+
+
+def _rebuild(code, rebuild):
+    """拉取前复权的全量历史，失败时返回 None"""
+    try:
+        data = rebuild()
+    except Exception as e:
+        logging.warning("{} 拉取全量历史失败: {}".format(code, e))
+        return None
+    return None if data is None or data.empty else data
+
+
+def update(code, fetch, root=None, rebuild=None):
+    """
+    读库 + 增量补齐：fetch(start_date) 返回 start_date (含) 之后的日线，
+    start_date 为 None 表示全量。网络全部失败时退回库中数据，库中也没有则返回 None。
+    rebuild() 返回前复权的全量历史，首次入库和复权数据变化时只用它 (默认 fetch(None)，fetch 可能退回
+    未复权或不完整的数据源时必须提供)：重建失败时保留库中数据，下次运行再试；
+    首次入库失败时本次运行使用 fetch(None) 的数据，不入库
+    """
+    adjusted = rebuild or (lambda: fetch(None))
+    cached = load(code, root)
+    if cached is not None and not cached.empty:
+        last = cached['date'].iloc[-1]
+        if last.date() >= datetime.date.today():
+            return cached
+
+        # 从库中最后 OVERLAP 根开始拉，重叠的部分用于校验复权是否一致
+        try:
+            tail = fetch(cached['date'].iloc[-min(OVERLAP, len(cached))])
+        except Exception as e:
+            logging.warning("{} 增量更新失败，使用本地数据: {}".format(code, e))
+            return cached
+        if tail is None or tail.empty:
+            return cached
+
+        tail = bars.normalize(tail)
+        if _same_bars(cached, tail):
+            if append(code, tail, root).empty:
+                return cached
+            # 重新读取，带上已入库的指标
+            return load(code, root)
+
+        logging.info("{} 复权数据发生变化，重建本地历史".format(code))
+        data = _rebuild(code, adjusted)
+        if data is None:
+            logging.warning("{} 没有取到前复权的全量历史，暂用本地数据，下次运行再重建".format(code))
+            return cached
+        return save(code, data, root)
+
+    # 库中没有: 只用前复权的全量历史入库
+    data = _rebuild(code, adjusted)
+    if data is not None:
+        return save(code, data, root)
+    if rebuild is None:
+        return cached
+    # 前复权的数据源不可用：本次运行先用 fetch 的数据 (可能未复权、不足一年)，不入库，下次运行再入库
+    try:
+        data = fetch(None)
+    except Exception as e:
+        logging.warning("{} 拉取历史失败: {}".format(code, e))
+        return cached
+    if data is None or data.empty:
+        return cached
+    logging.warning("{} 没有取到前复权的全量历史，本次使用未入库的数据".format(code))
+    return bars.normalize(data)
@@ -1,9 +1,17 @@
 # -*- encoding: UTF-8 -*-
 
-import talib as tl
+import numpy as np
 import pandas as pd
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
+
+import indicators
+
+
+# 各检查函数的名称、最少 K 线数、用到的指标和估计开销，见 registry
+REQUIREMENTS = {
+    'check': {'name': '回踩年线', 'min_history': 250, 'indicators': [('ma', 'close', 250)], 'cost': 5},
+}
 
 
 # 使用示例：result = backtrace_ma250.check(code_name, data, end_date=end_date)
@@ -12,75 +20,112 @@ from datetime import datetime, timedelta
 # 当然，该函数中的参数可能存在过拟合的问题
 
 
+def _highest_index(values):
+    # 等价于逐行扫描：初值取最后一行，遇到严格更高的行才替换，并列最高时取先出现的行
+    last = len(values) - 1
+    top = np.fmax.reduce(values)
+    if np.isnan(values[last]) or not top > values[last]:
+        return last
+    return int(np.argmax(values == top))
+
+
+def _lowest_index(values):
+    return _highest_index(-values)
+
+
 # 回踩年线策略
 def check(code_name, data, end_date=None, threshold=60):
     if len(data) < 250:
         logging.debug("{0}:样本小于250天...\n".format(code_name))
         return
-    data['ma250'] = pd.Series(tl.MA(data['收盘'].values, 250), index=data.index.values)
+    close = indicators.column(data, 'close')
+    vol = indicators.column(data, 'volume')
+    dates = data['date'].values
+    ma250 = indicators.ma(data, 250)
 
-    begin_date = data.iloc[0].日期
+    begin_date = dates[0]
     if end_date is not None:
-        if end_date < begin_date:  # 该股票在end_date时还未上市
+        if pd.Timestamp(end_date) < pd.Timestamp(begin_date):  # 该股票在end_date时还未上市
             logging.debug("{}在{}时还未上市".format(code_name, end_date))
             return False
 
     if end_date is not None:
-        mask = (data['日期'] <= end_date)
-        data = data.loc[mask]
-
-    data = data.tail(n=threshold)
-
-    last_close = data.iloc[-1]['收盘']
-
-    # 区间最低点
-    lowest_row = data.iloc[-1]
-    # 区间最高点
-    highest_row = data.iloc[-1]
-
-    # 近期低点
-    recent_lowest_row = data.iloc[-1]
-
-    # 计算区间最高、最低价格
-    for index, row in data.iterrows():
-        if row['收盘'] > highest_row['收盘']:
-            highest_row = row
-        elif row['收盘'] < lowest_row['收盘']:
-            lowest_row = row
-
-    if lowest_row['成交量'] == 0 or highest_row['成交量'] == 0:
+        mask = (data['date'] <= end_date).values
+        close, vol, dates, ma250 = close[mask], vol[mask], dates[mask], ma250[mask]
+
+    return _check_window(close[-threshold:], vol[-threshold:], dates[-threshold:], ma250[-threshold:])
+
+
+# 逐日信号：第 t 个元素等于 check(end_date=第 t 天) 的结果
+# 每个窗口的最高点、最低点和最高点之后的近期低点都在滑动窗口视图上按行求出，不逐日调用 _check_window
+def check_signals(code_name, data, threshold=60):
+    signals = np.zeros(len(data), dtype=bool)
+    # 窗口第一天必须在年线下方，年线未形成 (NaN) 的日子不可能命中
+    if len(data) < 249 + threshold:
+        return signals
+    close = indicators.column(data, 'close')
+    vol = indicators.column(data, 'volume')
+    days = pd.to_datetime(data['date']).values.astype('datetime64[D]')
+    ma250 = indicators.ma(data, 250)
+
+    window = indicators.windows(close, threshold)
+    start = np.arange(len(window))
+    highest = start + _highest_indices(window)
+    lowest = start + _highest_indices(-window)
+    # 近期低点：最高点 (含) 之后的最低点，最高点之前的位置不参与
+    after = np.arange(threshold) >= (highest - start)[:, None]
+    recent_lowest = start + _highest_indices(np.where(after, -window, np.nan))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        below = indicators.prefix_count(close < ma250)
+        date_diff = days[recent_lowest] - days[highest]
+        signals[threshold - 1:] = (vol[lowest] != 0) & (vol[highest] != 0) & (highest != start) \
+            & (close[start] < ma250[start]) & (close[highest - 1] > ma250[highest - 1]) \
+            & (below[start + threshold] - below[highest] == 0) \
+            & (np.timedelta64(10, 'D') <= date_diff) & (date_diff <= np.timedelta64(50, 'D')) \
+            & (vol[highest] / vol[recent_lowest] > 2) & (close[recent_lowest] / close[highest] < 0.8)
+    return signals
+
+
+def _highest_indices(windows):
+    # 按行的 _highest_index：NaN 的位置不参与比较
+    last = windows.shape[1] - 1
+    top = np.fmax.reduce(windows, axis=1)
+    first = np.argmax(windows == top[:, None], axis=1)
+    tail = windows[:, last]
+    return np.where(np.isnan(tail) | ~(top > tail), last, first)
+
+
+def _check_window(close, vol, dates, ma250):
+    # 区间最高、最低点
+    highest = _highest_index(close)
+    lowest = _lowest_index(close)
+
+    if vol[lowest] == 0 or vol[highest] == 0:
         return False
 
-    data_front = data.loc[(data['日期'] < highest_row['日期'])]
-    data_end = data.loc[(data['日期'] >= highest_row['日期'])]
-
-    if data_front.empty:
+    if highest == 0:
         return False
     # 前半段由年线以下向上突破
-    if not (data_front.iloc[0]['收盘'] < data_front.iloc[0]['ma250'] and
-            data_front.iloc[-1]['收盘'] > data_front.iloc[-1]['ma250']):
+    if not (close[0] < ma250[0] and close[highest - 1] > ma250[highest - 1]):
         return False
 
-    if not data_end.empty:
-        # 后半段必须在年线以上运行（回踩年线）
-        for index, row in data_end.iterrows():
-            if row['收盘'] < row['ma250']:
-                return False
-            if row['收盘'] < recent_lowest_row['收盘']:
-                recent_lowest_row = row
+    # 后半段必须在年线以上运行（回踩年线）
+    if np.any(close[highest:] < ma250[highest:]):
+        return False
+    # 近期低点
+    recent_lowest = highest + _lowest_index(close[highest:])
 
-# 修复 TypeError: 使用 str() 确保输入始终为字符串
-        date_diff = datetime.date(datetime.strptime(str(recent_lowest_row['日期']), '%Y-%m-%d')) - \
-                    datetime.date(datetime.strptime(str(highest_row['日期']), '%Y-%m-%d'))
+    # 日期可能是字符串、date 或 datetime64，统一转成 Timestamp 按自然日相减
+    date_diff = pd.Timestamp(dates[recent_lowest]).normalize() - pd.Timestamp(dates[highest]).normalize()
 
     if not(timedelta(days=10) <= date_diff <= timedelta(days=50)):
         return False
     # 回踩伴随缩量
-    vol_ratio = highest_row['成交量']/recent_lowest_row['成交量']
-    back_ratio = recent_lowest_row['收盘'] / highest_row['收盘']
+    vol_ratio = vol[highest]/vol[recent_lowest]
+    back_ratio = close[recent_lowest] / close[highest]
 
     if not (vol_ratio > 2 and back_ratio < 0.8) :
         return False
 
     return True
-
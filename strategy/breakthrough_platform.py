@@ -1,47 +1,77 @@
 # -*- encoding: UTF-8 -*-
 
-import talib as tl
-import pandas as pd
+import numpy as np
 import logging
+
+import indicators
 from strategy import enter
 
 
+# 各检查函数的名称、最少 K 线数、用到的指标和估计开销，见 registry
+REQUIREMENTS = {
+    'check': {'name': '突破平台', 'min_history': 60,
+              'indicators': [('ma', 'close', 60), ('ma', 'volume', 5), ('roc', 'close', 1)], 'cost': 6},
+}
+
+
+# 每一天是否满足 enter.check_volume (放量上涨)，整段历史只算一次
+def _volume_breakouts(code_name, data, threshold):
+    return indicators.memo(data, ('check_volume_signals', threshold),
+                           lambda: enter.check_volume_signals(code_name, data, threshold))
+
+
 # 平台突破策略
 def check(code_name, data, end_date=None, threshold=60):
-    origin_data = data
     if len(data) < threshold:
         logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
         return
-    data['ma60'] = pd.Series(tl.MA(data['收盘'].values, 60), index=data.index.values)
-
-    if end_date is not None:
-        mask = (data['日期'] <= end_date)
-        data = data.loc[mask]
-
-    data = data.tail(n=threshold)
 
-    breakthrough_row = None
+    index = np.arange(len(data)) if end_date is None else np.flatnonzero((data['date'] <= end_date).values)
+    index = index[-threshold:]
+    close = indicators.column(data, 'close')[index]
+    open_ = indicators.column(data, 'open')[index]
+    ma60 = indicators.ma(data, 60)[index]
+    volume = _volume_breakouts(code_name, data, threshold)[index]
 
-    for index, row in data.iterrows():
-        if row['开盘'] < row['ma60'] <= row['收盘']:
-            if enter.check_volume(code_name, origin_data, row['日期'], threshold):
-                breakthrough_row = row
+    # 最后一个放量站上 MA60 的交易日
+    with np.errstate(invalid='ignore'):
+        breakthrough = np.flatnonzero((open_ < ma60) & (ma60 <= close) & volume)
 
-    if breakthrough_row is None:
+    if len(breakthrough) == 0:
         return False
+    breakthrough = breakthrough[-1]
 
-    data_front = data.loc[(data['日期'] < breakthrough_row['日期'])]
-    data_end = data.loc[(data['日期'] >= breakthrough_row['日期'])]
-
-    for index, row in data_front.iterrows():
-        if not (-0.05 < (row['ma60'] - row['收盘']) / row['ma60'] < 0.2):
-            return False
+    # 突破前一直在 MA60 附近整理
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deviation = (ma60[:breakthrough] - close[:breakthrough]) / ma60[:breakthrough]
+    if not np.all((-0.05 < deviation) & (deviation < 0.2)):
+        return False
 
     return True
 
 
-
-
-
-
-
+# 逐日信号：第 t 个元素等于 check(end_date=第 t 天) 的结果
+def check_signals(code_name, data, threshold=60):
+    close = indicators.column(data, 'close')
+    open_ = indicators.column(data, 'open')
+    signals = np.zeros(len(close), dtype=bool)
+    if len(close) < threshold:
+        return signals
+    ma60 = indicators.ma(data, 60)
+
+    # 截至每一天最近一次放量站上 MA60 的位置
+    with np.errstate(invalid='ignore'):
+        breakthrough = (open_ < ma60) & (ma60 <= close) & _volume_breakouts(code_name, data, threshold)
+    index = np.arange(len(close))
+    last_breakthrough = np.maximum.accumulate(np.where(breakthrough, index, -1))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deviation = (ma60 - close) / ma60
+        outside = indicators.prefix_count(~((-0.05 < deviation) & (deviation < 0.2)))
+
+    # 窗口为 [start, t]，突破日须在窗口内，且窗口起点到突破日之前都在 MA60 附近
+    start = np.maximum(index - threshold + 1, 0)
+    found = last_breakthrough >= start
+    position = np.where(found, last_breakthrough, start)
+    signals[:] = found & (outside[position] - outside[start] == 0)
+    return signals
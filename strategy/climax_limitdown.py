@@ -1,35 +1,47 @@
 # -*- encoding: UTF-8 -*-
 
-import talib as tl
-import pandas as pd
 import logging
 
+import numpy as np
+
+import indicators
+from panel import rolling_mean
+
+
+# 各检查函数的名称、最少 K 线数、用到的指标和估计开销，见 registry
+REQUIREMENTS = {
+    'check': {'name': '放量跌停', 'min_history': 61,
+              'indicators': [('ma', 'volume', 5), ('roc', 'close', 1)], 'cost': 3},
+}
+
 
 def check(code_name, data, end_date=None, threshold=60):
     if len(data) < threshold:
         logging.debug("{0}:样本小于250天...\n".format(code_name))
         return False
 
-    data['vol_ma5'] = pd.Series(tl.MA(data['成交量'].values, 5), index=data.index.values)
+    close = indicators.column(data, 'close')
+    vol = indicators.column(data, 'volume')
+    vol_ma5 = indicators.vol_ma(data, 5)
+    p_change = indicators.p_change(data)
 
     if end_date is not None:
-        mask = (data['日期'] <= end_date)
-        data = data.loc[mask]
-    if data.empty:
+        mask = (data['date'] <= end_date).values
+        close, vol, vol_ma5, p_change = close[mask], vol[mask], vol_ma5[mask], p_change[mask]
+    if len(close) == 0:
         return False
-    p_change = data.iloc[-1]['p_change']
+    p_change = p_change[-1]
     if p_change > -9.5:
         return False
 
-    data = data.tail(n=threshold + 1)
-    if len(data) < threshold + 1:
+    if len(close) < threshold + 1:
         logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
         return False
 
     # 最后一天收盘价
-    last_close = data.iloc[-1]['收盘']
+    last_close = close[-1]
     # 最后一天成交量
-    last_vol = data.iloc[-1]['成交量']
+    last_vol = vol[-1]
 
     amount = last_close * last_vol * 100
 
@@ -37,9 +49,7 @@ def check(code_name, data, end_date=None, threshold=60):
     if amount < 200000000:
         return False
 
-    data = data.head(n=threshold)
-
-    mean_vol = data.iloc[-1]['vol_ma5']
+    mean_vol = vol_ma5[-2]
 
     vol_ratio = last_vol / mean_vol
     if vol_ratio >= 4:
@@ -49,3 +59,43 @@ def check(code_name, data, end_date=None, threshold=60):
     else:
         return False
 
+
+# 逐日信号：第 t 个元素等于 check(end_date=第 t 天) 的结果
+def check_signals(code_name, data, threshold=60):
+    signals = np.zeros(len(data), dtype=bool)
+    if len(data) < threshold + 1:
+        return signals
+    close = indicators.column(data, 'close')[threshold:]
+    vol = indicators.column(data, 'volume')[threshold:]
+    p_change = indicators.p_change(data)[threshold:]
+    mean_vol = indicators.vol_ma(data, 5)[threshold - 1:-1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        signals[threshold:] = ~(p_change > -9.5) & ~(close * vol * 100 < 200000000) & (vol / mean_vol >= 4)
+    return signals
+
+
+# 快照预筛：只看最后一根 K 线的必要条件 (跌停、成交额)，阈值略放宽
+def check_prefilter(quotes):
+    with np.errstate(invalid='ignore'):
+        return ~(quotes['p_change'].values > -9.5 + 0.01) \
+            & ~(quotes['close'].values * quotes['volume'].values * 100 < 200000000 * 0.999)
+
+
+# 全市场面板版本，返回与 panel.codes 对齐的布尔数组
+def check_panel(panel, end_date=None, threshold=60):
+    close = panel.tail('close', end_date)
+    if len(close) < threshold + 1:
+        return np.zeros(len(panel.codes), dtype=bool)
+    vol = panel.tail('volume', end_date)
+    p_change = panel.tail('p_change', end_date)[-1]
+    vol_ma5 = rolling_mean(vol[-threshold - 1:], 5)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 与逐只版本一致：涨跌幅、成交额缺失 (NaN) 时不据此排除
+        limit_down = ~(p_change > -9.5)
+        # 成交额不低于2亿
+        amount = ~(close[-1] * vol[-1] * 100 < 200000000)
+        vol_ratio = vol[-1] / vol_ma5[-2]
+        return limit_down & amount & (vol_ratio >= 4) \
+            & (panel.bars() >= threshold) & (panel.bars(end_date) >= threshold + 1)
@@ -1,32 +1,44 @@
 # -*- encoding: UTF-8 -*-
 
-import talib as tl
-import pandas as pd
+import numpy as np
 import logging
 
+import indicators
+
+
+# 各检查函数的名称、最少 K 线数、用到的指标和估计开销，见 registry
+REQUIREMENTS = {
+    'check_breakthrough': {'name': '突破新高', 'min_history': 31, 'indicators': [], 'cost': 3},
+    'check_ma': {'name': '站上年线', 'min_history': 250, 'indicators': [('ma', 'close', 250)], 'cost': 1},
+    'check_new': {'name': '新股', 'min_history': 0, 'indicators': [], 'cost': 0.1},
+    'check_turnover': {'name': '成交额', 'min_history': 1, 'indicators': [], 'cost': 0.1},
+    'check_volume': {'name': '放量上涨', 'min_history': 61,
+                     'indicators': [('ma', 'volume', 5), ('roc', 'close', 1)], 'cost': 3},
+    'check_continuous_volume': {'name': '持续放量', 'min_history': 63,
+                                'indicators': [('ma', 'volume', 5)], 'cost': 3},
+}
+
 
 # TODO 真实波动幅度（ATR）放大
 # 最后一个交易日收市价从下向上突破指定区间内最高价
 def check_breakthrough(code_name, data, end_date=None, threshold=30):
-    max_price = 0
+    close = indicators.column(data, 'close')
+    open_ = indicators.column(data, 'open')
     if end_date is not None:
-        mask = (data['日期'] <= end_date)
-        data = data.loc[mask]
-    data = data.tail(n=threshold+1)
-    if len(data) < threshold + 1:
+        mask = (data['date'] <= end_date).values
+        close = close[mask]
+        open_ = open_[mask]
+    if len(close) < threshold + 1:
         logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
         return False
 
     # 最后一天收市价
-    last_close = float(data.iloc[-1]['收盘'])
-    last_open = float(data.iloc[-1]['开盘'])
-
-    data = data.head(n=threshold)
-    second_last_close = data.iloc[-1]['收盘']
+    last_close = float(close[-1])
+    last_open = float(open_[-1])
 
-    for index, row in data.iterrows():
-        if row['收盘'] > max_price:
-            max_price = float(row['收盘'])
+    close = close[-threshold - 1:-1]
+    second_last_close = close[-1]
+    max_price = float(np.fmax.reduce(close, initial=0.0))
 
     if last_close > max_price > second_last_close and max_price > last_open \
             and last_close / last_open > 1.06:
@@ -35,27 +47,59 @@ def check_breakthrough(code_name, data, end_date=None, threshold=30):
         return False
 
 
+# 逐日信号：第 t 个元素等于 check_breakthrough(end_date=第 t 天) 的结果
+def check_breakthrough_signals(code_name, data, threshold=30):
+    close = indicators.column(data, 'close')
+    open_ = indicators.column(data, 'open')
+    signals = np.zeros(len(close), dtype=bool)
+    if len(close) < threshold + 1:
+        return signals
+
+    max_price = np.fmax.reduce(indicators.windows(close[:-1], threshold), axis=1, initial=0.0)
+    last_close = close[threshold:]
+    last_open = open_[threshold:]
+    second_last_close = close[threshold - 1:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        signals[threshold:] = (last_close > max_price) & (max_price > second_last_close) \
+            & (max_price > last_open) & (last_close / last_open > 1.06)
+    return signals
+
+
+# 快照预筛：只看最后一根 K 线的必要条件，quotes 为 snapshot.parse 的结果，返回布尔数组
+# 阈值略放宽，避免快照与库中价格精度不同造成漏选
+def check_breakthrough_prefilter(quotes):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (quotes['close'].values / quotes['open'].values > 1.06 - 1e-4)
+
+
 # 收盘价高于N日均线
 def check_ma(code_name, data, end_date=None, ma_days=250):
     if data is None or len(data) < ma_days:
         logging.debug("{0}:样本小于{1}天...\n".format(code_name, ma_days))
         return False
 
-    ma_tag = 'ma' + str(ma_days)
-    data[ma_tag] = pd.Series(tl.MA(data['收盘'].values, ma_days), index=data.index.values)
+    close = indicators.column(data, 'close')
+    ma = indicators.ma(data, ma_days)
 
     if end_date is not None:
-        mask = (data['日期'] <= end_date)
-        data = data.loc[mask]
+        mask = (data['date'] <= end_date).values
+        close, ma = close[mask], ma[mask]
 
-    last_close = data.iloc[-1]['收盘']
-    last_ma = data.iloc[-1][ma_tag]
+    last_close = close[-1]
+    last_ma = ma[-1]
     if last_close > last_ma:
         return True
     else:
         return False
 
 
+def check_ma_signals(code_name, data, ma_days=250):
+    if data is None or len(data) < ma_days:
+        return np.zeros(0 if data is None else len(data), dtype=bool)
+    with np.errstate(invalid='ignore'):
+        return indicators.column(data, 'close') > indicators.ma(data, ma_days)
+
+
 # 上市日小于60天
 def check_new(code_name, data, end_date=None, threshold=60):
     size = len(data.index)
@@ -65,6 +109,33 @@ def check_new(code_name, data, end_date=None, threshold=60):
         return False
 
 
+# 与 check_new 一致，只看全部历史的长度，不随日期变化
+def check_new_signals(code_name, data, threshold=60):
+    return np.full(len(data), check_new(code_name, data, threshold=threshold))
+
+
+# 最后一个交易日成交额不低于 threshold 元 (成交量单位为手)，缺失 (NaN) 时不据此排除
+def check_turnover(code_name, data, end_date=None, threshold=200000000):
+    close = indicators.column(data, 'close')
+    vol = indicators.column(data, 'volume')
+    if end_date is not None:
+        mask = (data['date'] <= end_date).values
+        close, vol = close[mask], vol[mask]
+    if len(close) == 0:
+        return False
+    return not close[-1] * vol[-1] * 100 < threshold
+
+
+def check_turnover_signals(code_name, data, threshold=200000000):
+    with np.errstate(invalid='ignore'):
+        return ~(indicators.column(data, 'close') * indicators.column(data, 'volume') * 100 < threshold)
+
+
+def check_turnover_prefilter(quotes, threshold=200000000):
+    with np.errstate(invalid='ignore'):
+        return ~(quotes['close'].values * quotes['volume'].values * 100 < threshold * 0.999)
+
+
 # 量比大于2
 # 例如：
 #   2017-09-26 2019-02-11 京东方A
@@ -76,26 +147,29 @@ def check_volume(code_name, data, end_date=None, threshold=60):
     if len(data) < threshold:
         logging.debug("{0}:样本小于250天...\n".format(code_name))
         return False
-    data['vol_ma5'] = pd.Series(tl.MA(data['成交量'].values, 5), index=data.index.values)
+    close = indicators.column(data, 'close')
+    open_ = indicators.column(data, 'open')
+    vol = indicators.column(data, 'volume')
+    vol_ma5 = indicators.vol_ma(data, 5)
+    p_change = indicators.p_change(data)
 
     if end_date is not None:
-        mask = (data['日期'] <= end_date)
-        data = data.loc[mask]
-    if data.empty:
+        mask = (data['date'] <= end_date).values
+        close, open_, vol, vol_ma5, p_change = close[mask], open_[mask], vol[mask], vol_ma5[mask], p_change[mask]
+    if len(close) == 0:
         return False
-    p_change = data.iloc[-1]['p_change']
+    p_change = p_change[-1]
     if p_change < 2 \
-            or data.iloc[-1]['收盘'] < data.iloc[-1]['开盘']:
+            or close[-1] < open_[-1]:
         return False
-    data = data.tail(n=threshold + 1)
-    if len(data) < threshold + 1:
+    if len(close) < threshold + 1:
         logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
         return False
 
     # 最后一天收盘价
-    last_close = data.iloc[-1]['收盘']
+    last_close = close[-1]
     # 最后一天成交量
-    last_vol = data.iloc[-1]['成交量']
+    last_vol = vol[-1]
 
     amount = last_close * last_vol * 100
 
@@ -103,9 +177,7 @@ def check_volume(code_name, data, end_date=None, threshold=60):
     if amount < 200000000:
         return False
 
-    data = data.head(n=threshold)
-
-    mean_vol = data.iloc[-1]['vol_ma5']
+    mean_vol = vol_ma5[-2]
 
     vol_ratio = last_vol / mean_vol
     if vol_ratio >= 2:
@@ -116,33 +188,68 @@ def check_volume(code_name, data, end_date=None, threshold=60):
         return False
 
 
+def check_volume_signals(code_name, data, threshold=60):
+    signals = np.zeros(len(data), dtype=bool)
+    if len(data) < threshold + 1:
+        return signals
+    close = indicators.column(data, 'close')[threshold:]
+    open_ = indicators.column(data, 'open')[threshold:]
+    vol = indicators.column(data, 'volume')[threshold:]
+    p_change = indicators.p_change(data)[threshold:]
+    mean_vol = indicators.vol_ma(data, 5)[threshold - 1:-1]
+
+    # 与 check_volume 一致：涨幅、成交额缺失 (NaN) 时不据此排除
+    with np.errstate(divide='ignore', invalid='ignore'):
+        signals[threshold:] = ~(p_change < 2) & ~(close < open_) \
+            & ~(close * vol * 100 < 200000000) & (vol / mean_vol >= 2)
+    return signals
+
+
+def check_volume_prefilter(quotes):
+    close = quotes['close'].values
+    with np.errstate(invalid='ignore'):
+        return ~(quotes['p_change'].values < 2 - 0.01) & ~(close < quotes['open'].values - 0.001) \
+            & ~(close * quotes['volume'].values * 100 < 200000000 * 0.999)
+
+
 # 量比大于3.0
 def check_continuous_volume(code_name, data, end_date=None, threshold=60, window_size=3):
-    stock = code_name[0]
-    name = code_name[1]
-    data['vol_ma5'] = pd.Series(tl.MA(data['成交量'].values, 5), index=data.index.values)
+    vol = indicators.column(data, 'volume')
+    close = indicators.column(data, 'close')
+    vol_ma5 = indicators.vol_ma(data, 5)
     if end_date is not None:
-        mask = (data['日期'] <= end_date)
-        data = data.loc[mask]
-    data = data.tail(n=threshold + window_size)
-    if len(data) < threshold + window_size:
+        mask = (data['date'] <= end_date).values
+        vol = vol[mask]
+        close = close[mask]
+        vol_ma5 = vol_ma5[mask]
+    if len(vol) < threshold + window_size:
         logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold+window_size))
         return False
 
     # 最后一天收盘价
-    last_close = data.iloc[-1]['收盘']
+    last_close = close[-1]
     # 最后一天成交量
-    last_vol = data.iloc[-1]['成交量']
-
-    data_front = data.head(n=threshold)
-    data_end = data.tail(n=window_size)
+    last_vol = vol[-1]
 
-    mean_vol = data_front.iloc[-1]['vol_ma5']
+    mean_vol = vol_ma5[-window_size - 1]
 
-    for index, row in data_end.iterrows():
-        if float(row['成交量']) / mean_vol < 3.0:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if np.any(vol[-window_size:] / mean_vol < 3.0):
             return False
 
     msg = "*{0} 量比：{1:.2f}\n\t收盘价：{2}\n".format(code_name, last_vol/mean_vol, last_close)
     logging.debug(msg)
     return True
+
+
+def check_continuous_volume_signals(code_name, data, threshold=60, window_size=3):
+    vol = indicators.column(data, 'volume')
+    signals = np.zeros(len(vol), dtype=bool)
+    size = threshold + window_size
+    if len(vol) < size:
+        return signals
+    mean_vol = indicators.vol_ma(data, 5)[threshold - 1:len(vol) - window_size]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = indicators.windows(vol, window_size)[threshold:] / mean_vol[:, None]
+        signals[size - 1:] = ~np.any(ratio < 3.0, axis=1)
+    return signals
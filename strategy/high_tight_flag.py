@@ -1,38 +1,65 @@
 # -*- encoding: UTF-8 -*-
 import logging
+
+import numpy as np
+
+import indicators
 import settings
 
 
+# 各检查函数的名称、最少 K 线数、用到的指标和估计开销，见 registry
+REQUIREMENTS = {
+    'check': {'name': '高而窄的旗形', 'min_history': 60, 'indicators': [('roc', 'close', 1)], 'cost': 0.5},
+}
+
+
 # 高而窄的旗形
 def check(code_name, data, end_date=None, threshold=60):
     # 龙虎榜上必须有机构
     if code_name[0] not in settings.top_list:
         return False
 
+    high = indicators.column(data, 'high')
+    low = indicators.column(data, 'low')
+    p_change = indicators.p_change(data)
     if end_date is not None:
-        mask = (data['日期'] <= end_date)
-        data = data.loc[mask]
-    data = data.tail(n=threshold)
+        mask = (data['date'] <= end_date).values
+        high, low, p_change = high[mask], low[mask], p_change[mask]
 
-    if len(data) < threshold:
+    if len(high) < threshold:
         logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
         return False
 
-    data = data.tail(n=14)
-    low = data['最低'].min()
-    ratio_increase = data.iloc[-1]['最高'] / low
+    high, low, p_change = high[-14:], low[-14:], p_change[-14:]
+    ratio_increase = high[-1] / np.nanmin(low)
     if ratio_increase < 1.9:
         return False
 
-    previous_p_change = 0.0
     # 连续两天涨幅大于等于10%
-    for _p_change in data['p_change'].values:
-        if _p_change >= 9.5:
-            if previous_p_change >= 9.5:
-                return True
-            else:
-                previous_p_change = _p_change
-        else:
-            previous_p_change = 0.0
-
-    return False
+    limit_up = p_change >= 9.5
+    return bool(np.any(limit_up[1:] & limit_up[:-1]))
+
+
+# 逐日信号：第 t 个元素等于 check(end_date=第 t 天) 的结果 (龙虎榜按当前名单)
+def check_signals(code_name, data, threshold=60):
+    signals = np.zeros(len(data), dtype=bool)
+    size = max(threshold, 14)
+    if code_name[0] not in settings.top_list or len(data) < size:
+        return signals
+
+    high = indicators.column(data, 'high')
+    low = np.fmin.reduce(indicators.windows(indicators.column(data, 'low'), 14), axis=1)
+    limit_up = indicators.p_change(data) >= 9.5
+    pairs = np.zeros(len(data), dtype=bool)
+    pairs[1:] = limit_up[1:] & limit_up[:-1]
+    pairs = indicators.prefix_count(pairs)
+
+    end = np.arange(size - 1, len(data))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        signals[size - 1:] = ~(high[end] / low[end - 13] < 1.9) & (pairs[end + 1] - pairs[end - 12] > 0)
+    return signals
+
+
+# 快照预筛：龙虎榜上必须有机构
+def check_prefilter(quotes):
+    return quotes['code'].str[:6].isin(settings.top_list).values
@@ -1,29 +1,69 @@
 # -*- encoding: UTF-8 -*-
 
-import talib as tl
-import pandas as pd
 import logging
 
+import numpy as np
+
+import indicators
+from panel import rolling_mean
+
+
+# 各检查函数的名称、最少 K 线数、用到的指标和估计开销，见 registry
+REQUIREMENTS = {
+    'check': {'name': '均线多头', 'min_history': 30, 'indicators': [('ma', 'close', 30)], 'cost': 1},
+}
+
 
 # 持续上涨（MA30向上）
 def check(code_name, data, end_date=None, threshold=30):
     if len(data) < threshold:
         logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
         return
-    data['ma30'] = pd.Series(tl.MA(data['收盘'].values, 30), index=data.index.values)
+    ma30 = indicators.ma(data, 30)
 
     if end_date is not None:
-        mask = (data['日期'] <= end_date)
-        data = data.loc[mask]
+        mask = (data['date'] <= end_date).values
+        ma30 = ma30[mask]
 
-    data = data.tail(n=threshold)
+    ma30 = ma30[-threshold:]
 
     step1 = round(threshold/3)
     step2 = round(threshold*2/3)
 
-    if data.iloc[0]['ma30'] < data.iloc[step1]['ma30'] < \
-        data.iloc[step2]['ma30'] < data.iloc[-1]['ma30'] and data.iloc[-1]['ma30'] > 1.2*data.iloc[0]['ma30']:
+    if ma30[0] < ma30[step1] < ma30[step2] < ma30[-1] and ma30[-1] > 1.2*ma30[0]:
         return True
     else:
         return False
 
+
+# 逐日信号：第 t 个元素等于 check(end_date=第 t 天) 的结果 (不足 threshold 天时为 False)
+def check_signals(code_name, data, threshold=30):
+    signals = np.zeros(len(data), dtype=bool)
+    if len(data) < threshold:
+        return signals
+    ma30 = indicators.ma(data, 30)
+    end = np.arange(threshold - 1, len(data))
+    start = end - threshold + 1
+
+    step1 = round(threshold/3)
+    step2 = round(threshold*2/3)
+
+    first, last = ma30[start], ma30[end]
+    with np.errstate(invalid='ignore'):
+        signals[threshold - 1:] = (first < ma30[start + step1]) & (ma30[start + step1] < ma30[start + step2]) \
+            & (ma30[start + step2] < last) & (last > 1.2*first)
+    return signals
+
+
+# 全市场面板版本，返回与 panel.codes 对齐的布尔数组
+def check_panel(panel, end_date=None, threshold=30):
+    ma30 = rolling_mean(panel.tail('close', end_date), 30)[-threshold:]
+    if len(ma30) < threshold:
+        return np.zeros(len(panel.codes), dtype=bool)
+
+    step1 = round(threshold/3)
+    step2 = round(threshold*2/3)
+
+    with np.errstate(invalid='ignore'):
+        return (ma30[0] < ma30[step1]) & (ma30[step1] < ma30[step2]) & (ma30[step2] < ma30[-1]) \
+            & (ma30[-1] > 1.2*ma30[0]) & (panel.bars() >= threshold)
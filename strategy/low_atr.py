@@ -1,8 +1,16 @@
 # -*- encoding: UTF-8 -*-
-import pandas as pd
-import talib as tl
+import numpy as np
 import logging
 
+import indicators
+
+
+# 各检查函数的名称、最少 K 线数、用到的指标和估计开销，见 registry
+REQUIREMENTS = {
+    'check_low_increase': {'name': '低ATR成长', 'min_history': 250,
+                           'indicators': [('roc', 'close', 1)], 'cost': 3},
+}
+
 
 # 低ATR成长策略
 def check_low_increase(code_name, data, end_date=None, ma_short=30, ma_long=250, threshold=10):
@@ -12,54 +20,51 @@ def check_low_increase(code_name, data, end_date=None, ma_short=30, ma_long=250,
         logging.debug("{0}:样本小于{1}天...\n".format(code_name, ma_long))
         return False
 
-    data['ma_short'] = pd.Series(tl.MA(data['收盘'].values, ma_short), index=data.index.values)
-    data['ma_long'] = pd.Series(tl.MA(data['收盘'].values, ma_long), index=data.index.values)
-
+    close = indicators.column(data, 'close')
+    dates = data['date'].values
+    p_change = indicators.p_change(data)
     if end_date is not None:
-        mask = (data['日期'] <= end_date)
-        data = data.loc[mask]
-    data = data.tail(n=threshold)
-    inc_days = 0
-    dec_days = 0
-    if len(data) < threshold:
+        mask = (data['date'] <= end_date).values
+        close, dates, p_change = close[mask], dates[mask], p_change[mask]
+    if len(close) < threshold:
         logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
         return False
+    close, dates, p_change = close[-threshold:], dates[-threshold:], p_change[-threshold:]
 
-    # 区间最低点
-    lowest_row = data.iloc[-1]
-    # 区间最高点
-    highest_row = data.iloc[-1]
-
-    days_count = len(data)
-    total_change = 0.0
-    for index, row in data.iterrows():
-        if 'p_change' in row:
-            p_change = float(row['p_change'])
-            if abs(p_change) > 0:
-                total_change += abs(p_change)
-            # if p_change < -7:
-            #     return False
-            # if row['ma_short'] < row['ma_long']:
-            #     return False
-
-            if p_change > 0:
-                inc_days = inc_days + 1
-            if p_change < 0:
-                dec_days = dec_days + 1
-
-            if row['收盘'] > highest_row['收盘']:
-                highest_row = row
-            if row['收盘'] < lowest_row['收盘']:
-                lowest_row = row
-
-    atr = total_change / days_count
+    # NaN 不计入
+    atr = np.nansum(np.abs(p_change)) / threshold
     if atr > 10:
         return False
 
-    ratio = (highest_row['收盘'] - lowest_row['收盘']) / lowest_row['收盘']
+    # 区间最高、最低点：比较对象以最后一天为初值，最后一天缺失时不成立
+    last_close = close[-1]
+    if np.isnan(last_close):
+        return False
+    highest = np.fmax.reduce(close, initial=last_close)
+    lowest = np.fmin.reduce(close, initial=last_close)
+    ratio = (highest - lowest) / lowest
 
     if ratio > 1.1:
-        logging.debug("股票：{0}（{1}）  最低:{2}, 最高:{3}, 涨跌比率:{4}       上涨天数:{5}， 下跌天数:{6}".format(name, stock, lowest_row['日期'], highest_row['日期'], ratio, inc_days, dec_days))
+        logging.debug("股票：{0}（{1}）  最低:{2}, 最高:{3}, 涨跌比率:{4}       上涨天数:{5}， 下跌天数:{6}".format(
+            name, stock, dates[np.argmax(close == lowest)], dates[np.argmax(close == highest)], ratio,
+            np.count_nonzero(p_change > 0), np.count_nonzero(p_change < 0)))
         return True
 
     return False
+
+
+# 逐日信号：第 t 个元素等于 check_low_increase(end_date=第 t 天) 的结果
+def check_low_increase_signals(code_name, data, ma_short=30, ma_long=250, threshold=10):
+    signals = np.zeros(len(data), dtype=bool)
+    if len(data) < max(ma_long, threshold):
+        return signals
+    close = indicators.column(data, 'close')
+    window = indicators.windows(close, threshold)
+
+    atr = np.nansum(np.abs(indicators.windows(indicators.p_change(data), threshold)), axis=1) / threshold
+    highest = np.fmax.reduce(window, axis=1)
+    lowest = np.fmin.reduce(window, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = (highest - lowest) / lowest
+    signals[threshold - 1:] = ~(atr > 10) & ~np.isnan(close[threshold - 1:]) & (ratio > 1.1)
+    return signals
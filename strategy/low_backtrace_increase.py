@@ -1,34 +1,67 @@
 # -*- encoding: UTF-8 -*-
 import logging
 
+import numpy as np
+
+import indicators
+
+
+# 各检查函数的名称、最少 K 线数、用到的指标和估计开销，见 registry
+REQUIREMENTS = {
+    'check': {'name': '无大幅回撤', 'min_history': 60, 'indicators': [('roc', 'close', 1)], 'cost': 3},
+}
+
 
 # 低回撤稳步上涨策略
 def check(code_name, data, end_date=None, threshold=60):
+    close = indicators.column(data, 'close')
+    open_ = indicators.column(data, 'open')
+    p_change = indicators.p_change(data)
     if end_date is not None:
-        mask = (data['日期'] <= end_date)
-        data = data.loc[mask]
-    data = data.tail(n=threshold)
+        mask = (data['date'] <= end_date).values
+        close, open_, p_change = close[mask], open_[mask], p_change[mask]
 
-    if len(data) < threshold:
+    if len(close) < threshold:
         logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
         return False
+    close, open_, p_change = close[-threshold:], open_[-threshold:], p_change[-threshold:]
 
-    ratio_increase = (data.iloc[-1]['收盘'] - data.iloc[0]['收盘']) / data.iloc[0]['收盘']
+    ratio_increase = (close[-1] - close[0]) / close[0]
     if ratio_increase < 0.6:
         return False
 
-    # 允许有一次“洗盘”
-    flag = True
-    for i in range(1, len(data)):
-        # 单日跌幅超7%；高开低走7%；两日累计跌幅10%；两日高开低走累计10%
-        if data.iloc[i - 1]['p_change'] < -7 \
-                or (data.iloc[i]['收盘'] - data.iloc[i]['开盘'])/data.iloc[i]['开盘'] * 100 < -7 \
-                or data.iloc[i - 1]['p_change'] + data.iloc[i]['p_change'] < -10 \
-                or (data.iloc[i]['收盘'] - data.iloc[i - 1]['开盘']) / data.iloc[i - 1]['开盘'] * 100 < -10:
-            return False
-            # if flag:
-            #     flag = False
-            # else:
-            #     return False
+    # 单日跌幅超7%；高开低走7%；两日累计跌幅10%；两日高开低走累计10%
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drop = (p_change[:-1] < -7) \
+            | ((close[1:] - open_[1:]) / open_[1:] * 100 < -7) \
+            | (p_change[:-1] + p_change[1:] < -10) \
+            | ((close[1:] - open_[:-1]) / open_[:-1] * 100 < -10)
+    if np.any(drop):
+        return False
 
     return True
+
+
+# 逐日信号：第 t 个元素等于 check(end_date=第 t 天) 的结果
+def check_signals(code_name, data, threshold=60):
+    close = indicators.column(data, 'close')
+    open_ = indicators.column(data, 'open')
+    p_change = indicators.p_change(data)
+    signals = np.zeros(len(close), dtype=bool)
+    if len(close) < threshold:
+        return signals
+
+    end = np.arange(threshold - 1, len(close))
+    start = end - threshold + 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio_increase = (close[end] - close[start]) / close[start]
+        # drop[i] 为第 i-1、i 两天是否触发回撤条件
+        drop = np.zeros(len(close), dtype=bool)
+        drop[1:] = (p_change[:-1] < -7) \
+            | ((close[1:] - open_[1:]) / open_[1:] * 100 < -7) \
+            | (p_change[:-1] + p_change[1:] < -10) \
+            | ((close[1:] - open_[:-1]) / open_[:-1] * 100 < -10)
+    drops = indicators.prefix_count(drop)
+
+    signals[threshold - 1:] = ~(ratio_increase < 0.6) & (drops[end + 1] - drops[start + 1] == 0)
+    return signals
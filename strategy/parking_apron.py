@@ -1,63 +1,82 @@
 # -*- encoding: UTF-8 -*-
 
 import logging
-from strategy import turtle_trade
-
-
-# “停机坪”策略
-def check(code_name, data, end_date=None, threshold=15):
-    origin_data = data
 
-    if end_date is not None:
-        mask = (data['日期'] <= end_date)
-        data = data.loc[mask]
+import numpy as np
 
-    if len(data) < threshold:
-        logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
-        return
+import indicators
+from strategy import turtle_trade
 
-    data = data.tail(n=threshold)
 
-    flag = False
+# 各检查函数的名称、最少 K 线数、用到的指标和估计开销，见 registry
+REQUIREMENTS = {
+    'check': {'name': '停机坪', 'min_history': 15, 'indicators': [('roc', 'close', 1)], 'cost': 6},
+}
 
-    # 找出涨停日
-    for index, row in data.iterrows():
-        try:
-            if float(row['p_change']) > 9.5:
-                if turtle_trade.check_enter(code_name, origin_data, row['日期'], threshold):
-                    if check_internal(code_name, data, row):
-                        flag = True
-        except KeyError as error:
-            logging.debug("{}处理异常：{}".format(code_name, error))
 
-    return flag
+# 每一天是否为 threshold 日新高 (turtle_trade.check_enter)，整段历史只算一次
+def _new_highs(code_name, data, threshold):
+    return indicators.memo(data, ('check_enter_signals', threshold),
+                           lambda: turtle_trade.check_enter_signals(code_name, data, threshold))
 
 
-def check_internal(code_name, data, limitup_row):
-    limitup_price = limitup_row['收盘']
-    limitup_end = data.loc[(data['日期'] > limitup_row['日期'])]
-    limitup_end = limitup_end.head(n=3)
-    if len(limitup_end.index) < 3:
-        return False
+# “停机坪”策略
+def check(code_name, data, end_date=None, threshold=15):
+    index = np.arange(len(data)) if end_date is None else np.flatnonzero((data['date'] <= end_date).values)
+    if len(index) < threshold:
+        logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
+        return
 
-    consolidation_day1 = limitup_end.iloc[0]
-    consolidation_day23 = limitup_end = limitup_end.tail(n=2)
+    index = index[-threshold:]
+    close = indicators.column(data, 'close')[index]
+    open_ = indicators.column(data, 'open')[index]
+    p_change = indicators.p_change(data)[index]
 
-    if not(consolidation_day1['收盘'] > limitup_price and consolidation_day1['开盘'] > limitup_price and
-        0.97 < consolidation_day1['收盘'] / consolidation_day1['开盘'] < 1.03):
+    # 找出涨停日 (其后至少还有3个交易日横盘，且涨停日创新高)
+    with np.errstate(invalid='ignore'):
+        limitup = np.flatnonzero((p_change > 9.5) & check_internal(close, open_, p_change)
+                                 & _new_highs(code_name, data, threshold)[index])
+    if len(limitup) == 0:
         return False
 
-    threshold_price = limitup_end.iloc[-1]['收盘']
-
-    for index, row in consolidation_day23.iterrows():
-        try:
-            if not (0.97 < (row['收盘'] / row['开盘']) < 1.03 and -5 < row['p_change'] < 5
-                    and row['收盘'] > limitup_price and row['开盘'] > limitup_price):
-                return False
-        except KeyError as error:
-            logging.debug("{}处理异常：{}".format(code_name, error))
-
-    logging.debug("股票{0} 涨停日期：{1}".format(code_name, limitup_row['日期']))
-
+    logging.debug("股票{0} 涨停日期：{1}".format(code_name, data['date'].values[index[limitup[0]]]))
     return True
 
+
+# 逐日信号：第 t 个元素等于 check(end_date=第 t 天) 的结果
+def check_signals(code_name, data, threshold=15):
+    close = indicators.column(data, 'close')
+    open_ = indicators.column(data, 'open')
+    p_change = indicators.p_change(data)
+    signals = np.zeros(len(close), dtype=bool)
+    if len(close) < threshold:
+        return signals
+
+    # 涨停、随后三天横盘、且涨停日创 threshold 日新高
+    with np.errstate(invalid='ignore'):
+        limitup = (p_change > 9.5) & check_internal(close, open_, p_change) & _new_highs(code_name, data, threshold)
+    limitup = indicators.prefix_count(limitup)
+
+    # 以第 t 天结尾的窗口中，涨停日只能落在 [t-threshold+1, t-3]
+    end = np.arange(threshold - 1, len(close))
+    signals[threshold - 1:] = limitup[end - 2] - limitup[end - threshold + 1] > 0
+    return signals
+
+
+# 每一天作为涨停日时，其后三天是否在涨停价上方横盘整理 (后面不足三天为 False)
+def check_internal(close, open_, p_change):
+    result = np.zeros(len(close), dtype=bool)
+    if len(close) < 4:
+        return result
+    limitup_price = close[:-3]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        body = close / open_
+        day1 = slice(1, len(close) - 2)
+        result[:-3] = (close[day1] > limitup_price) & (open_[day1] > limitup_price) \
+            & (0.97 < body[day1]) & (body[day1] < 1.03)
+        for k in (2, 3):
+            day = slice(k, len(close) - 3 + k)
+            result[:-3] &= (0.97 < body[day]) & (body[day] < 1.03) & (-5 < p_change[day]) & (p_change[day] < 5) \
+                & (close[day] > limitup_price) & (open_[day] > limitup_price)
+    return result
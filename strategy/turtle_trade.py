@@ -1,4 +1,13 @@
 # -*- coding: UTF-8 -*-
+import numpy as np
+
+import indicators
+
+
+# 各检查函数的名称、最少 K 线数、用到的指标和估计开销，见 registry
+REQUIREMENTS = {
+    'check_enter': {'name': '海龟交易法则', 'min_history': 60, 'indicators': [], 'cost': 1},
+}
 
 # 总市值
 BALANCE = 200000
@@ -6,22 +15,36 @@ BALANCE = 200000
 
 # 最后一个交易日收市价为指定区间内最高价
 def check_enter(code_name, data, end_date=None, threshold=60):
-    max_price = 0
-    if end_date is not None:
-        mask = (data['日期'] <= end_date)
-        data = data.loc[mask]
     if data is None:
         return False
-    data = data.tail(n=threshold)
-    if len(data) < threshold:
+    close = indicators.column(data, 'close')
+    if end_date is not None:
+        close = close[(data['date'] <= end_date).values]
+    if len(close) < threshold:
         return False
-    for index, row in data.iterrows():
-        if row['收盘'] > max_price:
-            max_price = float(row['收盘'])
+    close = close[-threshold:]
+
+    # fmax 跳过 NaN，初值 0 与逐行比较一致
+    max_price = np.fmax.reduce(close, initial=0.0)
+
+    return bool(close[-1] >= max_price)
+
 
-    last_close = data.iloc[-1]['收盘']
+# 逐日信号：第 t 个元素等于 check_enter(end_date=第 t 天) 的结果，一次算完整段历史
+def check_enter_signals(code_name, data, threshold=60):
+    close = indicators.column(data, 'close')
+    signals = np.zeros(len(close), dtype=bool)
+    if len(close) < threshold:
+        return signals
+    max_price = np.fmax.reduce(indicators.windows(close, threshold), axis=1, initial=0.0)
+    with np.errstate(invalid='ignore'):
+        signals[threshold - 1:] = close[threshold - 1:] >= max_price
+    return signals
 
-    if last_close >= max_price:
-        return True
 
-    return False
+# 全市场面板版本，返回与 panel.codes 对齐的布尔数组
+def check_enter_panel(panel, end_date=None, threshold=60):
+    close = panel.tail('close', end_date)[-threshold:]
+    max_price = np.fmax.reduce(close, axis=0, initial=0.0)
+    with np.errstate(invalid='ignore'):
+        return (close[-1] >= max_price) & (panel.bars(end_date) >= threshold)
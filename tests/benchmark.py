@@ -0,0 +1,201 @@
+# -*- encoding: UTF-8 -*-
+# 性能基准：合成全市场日线 + 数据源替身，计时 strategy/ 下每个策略函数、整个 work_flow.process 流程，
+# 以及从本地行情库和内存映射行情 (market) 读入全市场日线的耗时。
+#
+# 用法 (在项目根目录)：
+#   python tests/benchmark.py --codes 3000 --json data/benchmark.json
+#   python tests/benchmark.py --baseline data/benchmark.json   # 任一项比基准慢 20% 以上时退出码为 1
+import argparse
+import contextlib
+import importlib
+import inspect
+import io
+import json
+import os
+import pkgutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(TESTS), TESTS]
+
+import market
+import panel
+import settings
+import snapshot
+import store
+import strategy
+import work_flow
+from fake_sources import installed
+from synthetic import make_universe
+
+# 策略函数按第一个参数区分：逐只检查、全市场面板、行情快照预筛
+KINDS = {'code_name': 'check', 'panel': 'panel', 'quotes': 'prefilter'}
+# 低于该耗时 (秒) 的项目不参与回归判断，避免计时噪声
+NOISE = 0.05
+
+
+def discover():
+    """strategy/ 下所有公开的策略函数，返回 [(模块名.函数名, 类型, 函数)]"""
+    found = []
+    for info in pkgutil.iter_modules(strategy.__path__):
+        module = importlib.import_module('strategy.' + info.name)
+        for name, func in inspect.getmembers(module, inspect.isfunction):
+            if name.startswith('_') or func.__module__ != module.__name__:
+                continue
+            params = list(inspect.signature(func).parameters)
+            if params and params[0] in KINDS:
+                found.append(('{}.{}'.format(info.name, name), KINDS[params[0]], func))
+    return found
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+def bench_strategies(universe, quotes):
+    """每个策略在全市场上各跑一遍；逐只检查的策略每次都用新的副本，指标缓存不在策略之间共享"""
+    timings = {}
+    elapsed, market = _timed(panel.build, universe)
+    timings['panel.build'] = {'seconds': elapsed}
+    for name, kind, func in discover():
+        if kind == 'check':
+            frames = [((code[:6], code), data.copy()) for code, data in universe.items()]
+            started = time.perf_counter()
+            hits = errors = 0
+            for code_name, data in frames:
+                try:
+                    result = func(code_name, data)
+                except Exception:
+                    errors += 1
+                    continue
+                # *_signals 返回逐日信号，统计整段历史的信号天数
+                hits += int(np.count_nonzero(result)) if name.endswith('_signals') else int(result is True)
+            elapsed = time.perf_counter() - started
+            timings[name] = {'seconds': elapsed, 'per_code_ms': elapsed / len(frames) * 1000,
+                             'hits': hits, 'errors': errors}
+        elif kind == 'panel':
+            elapsed, result = _timed(func, market)
+            timings[name] = {'seconds': elapsed, 'hits': len(market.select(result))}
+        else:
+            elapsed, result = _timed(func, quotes)
+            timings[name] = {'seconds': elapsed, 'hits': int(result.sum())}
+    return timings
+
+
+@contextlib.contextmanager
+def configured(universe, root):
+    """基准运行期间的配置：本地行情库指向 root，不做批量更新，不用进程池，不写扫描日志；龙虎榜名单取每 10 只中的 1 只"""
+    saved = store.ROOT, getattr(settings, 'config', None), getattr(settings, 'top_list', None)
+    store.ROOT = root
+    settings.config = {'codes': sorted(universe), 'bulk_update': False, 'processes': 0, 'journal': False}
+    settings.top_list = frozenset(code[:6] for code in sorted(universe)[::10])
+    try:
+        yield
+    finally:
+        store.ROOT, settings.config, settings.top_list = saved
+
+
+def bench_pipeline(universe, checks=None, latency=0.0):
+    """
+    work_flow.process 全流程：冷启动 (空的本地行情库，全部经 akshare 替身拉取全量历史) 和热启动
+    (库中已有历史；当天已入库时直接读库，否则只补拉尾部)
+    """
+    checks = checks or work_flow.CHECKS
+    timings = {}
+    with installed(universe, latency) as (akshare, _, _):
+        for run in ('cold', 'warm'):
+            calls = len(akshare.calls)
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed, hits = _timed(work_flow.process, checks)
+            timings[run] = {'seconds': elapsed, 'hits': len(hits), 'fetches': len(akshare.calls) - calls}
+    return timings
+
+
+def bench_load(codes, root):
+    """全市场日线读入：逐只读 HDF5 行情库、打包内存映射行情、从内存映射行情读入 (各取一次收盘价)"""
+    timings = {}
+    elapsed, _ = _timed(lambda: [store.load(code)['close'].values[-1] for code in codes])
+    timings['store'] = {'seconds': elapsed}
+    elapsed, _ = _timed(market.build, codes, None, root)
+    timings['build'] = {'seconds': elapsed}
+    elapsed, _ = _timed(lambda: [data['close'].values[-1] for _, data in market.frames(codes, root=root)])
+    timings['mapped'] = {'seconds': elapsed}
+    return timings
+
+
+def run(codes, days, latency=0.0, seed=0):
+    report = {'codes': codes, 'days': days, 'latency': latency}
+    elapsed, universe = _timed(make_universe, codes, days, seed)
+    report['generate'] = {'seconds': elapsed}
+    with tempfile.TemporaryDirectory() as root, configured(universe, root):
+        with installed(universe):
+            quotes = snapshot.fetch(list(universe))
+        report['strategies'] = bench_strategies(universe, quotes)
+        report['pipeline'] = bench_pipeline(universe, latency=latency)
+        report['load'] = bench_load(sorted(universe), os.path.join(root, 'market'))
+    return report
+
+
+def flatten(report):
+    """{项目名: 秒数}"""
+    timings = {'generate': report['generate']['seconds']}
+    for group in ('strategies', 'pipeline', 'load'):
+        for name, item in report.get(group, {}).items():
+            timings['{}.{}'.format(group, name)] = item['seconds']
+    return timings
+
+
+def regressions(report, baseline, tolerance):
+    """比基准慢超过 tolerance (比例) 的项目：[(项目名, 基准秒数, 本次秒数)]"""
+    current, previous = flatten(report), flatten(baseline)
+    return [(name, previous[name], seconds) for name, seconds in current.items()
+            if name in previous and max(seconds, previous[name]) >= NOISE
+            and seconds > previous[name] * (1 + tolerance)]
+
+
+def show(report):
+    print("合成 {} 只 x {} 天: {:.2f} 秒".format(report['codes'], report['days'], report['generate']['seconds']))
+    for name, item in sorted(report['strategies'].items(), key=lambda kv: -kv[1]['seconds']):
+        extra = ' ({:.3f} ms/只)'.format(item['per_code_ms']) if 'per_code_ms' in item else ''
+        print("   {:<45} {:>8.3f} 秒{}  命中 {}".format(name, item['seconds'], extra, item.get('hits', '-')))
+    for name, item in report['pipeline'].items():
+        print("   work_flow.process ({}) {:>8.3f} 秒  拉取 {} 次  命中 {}".format(
+            name, item['seconds'], item['fetches'], item['hits']))
+    for name, item in report.get('load', {}).items():
+        print("   读入全市场日线 ({}) {:>8.3f} 秒".format(name, item['seconds']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sequoia 性能基准')
+    parser.add_argument('--codes', type=int, default=3000, help='合成股票数')
+    parser.add_argument('--days', type=int, default=500, help='每只股票的交易日数')
+    parser.add_argument('--latency', type=float, default=0.0, help='数据源替身每次请求的模拟延迟 (秒)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='结果写入该文件，可作为之后的基准')
+    parser.add_argument('--baseline', help='与该基准文件比较')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许比基准慢的比例')
+    args = parser.parse_args(argv)
+
+    report = run(args.codes, args.days, args.latency, args.seed)
+    show(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(report, json.load(f), args.tolerance)
+        for name, previous, seconds in slower:
+            print("⚠️ 性能回退 {}: {:.3f} -> {:.3f} 秒".format(name, previous, seconds))
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+# -*- encoding: UTF-8 -*-
+# 数据源替身：用合成日线 (synthetic.make_universe) 冒充 akshare / tushare / 新浪行情，
+# 接口和返回格式与真实数据源一致，可选模拟网络延迟。akshare / tushare 都是按需导入的，
+# 替换 sys.modules 中的模块即可，不需要改动被测代码。
+import contextlib
+import sys
+import time
+import types
+
+import pandas as pd
+
+import health
+import snapshot
+
+
+def _by_symbol(universe):
+    return {code[:6]: code for code in universe}
+
+
+def _sleep(latency):
+    if latency:
+        time.sleep(latency)
+
+
+def make_akshare(universe, latency=0.0):
+    """ak.stock_zh_a_hist / stock_info_a_code_name / stock_lhb_stock_statistic_em"""
+    symbols = _by_symbol(universe)
+    module = types.ModuleType('akshare')
+    module.calls = []
+
+    def stock_zh_a_hist(symbol, period='daily', start_date=None, end_date=None, adjust=''):
+        module.calls.append(('stock_zh_a_hist', symbol, start_date))
+        _sleep(latency)
+        data = universe.get(symbols.get(symbol))
+        if data is None:
+            return pd.DataFrame()
+        if start_date is not None:
+            data = data.loc[data['date'] >= pd.Timestamp(start_date)]
+        if end_date is not None:
+            data = data.loc[data['date'] <= pd.Timestamp(end_date)]
+        return pd.DataFrame({
+            '日期': data['date'].dt.strftime('%Y-%m-%d').values,
+            '股票代码': symbol,
+            '开盘': data['open'].values.astype('float64'),
+            '收盘': data['close'].values.astype('float64'),
+            '最高': data['high'].values.astype('float64'),
+            '最低': data['low'].values.astype('float64'),
+            '成交量': data['volume'].values,
+            '成交额': data['volume'].values * data['close'].values.astype('float64') * 100,
+        })
+
+    def stock_info_a_code_name():
+        return pd.DataFrame({'code': list(symbols), 'name': ['合成' + symbol for symbol in symbols]})
+
+    def stock_lhb_stock_statistic_em(symbol='近三月'):
+        codes = list(symbols)[::10]
+        return pd.DataFrame({'代码': codes, '买方机构次数': [2] * len(codes)})
+
+    module.stock_zh_a_hist = stock_zh_a_hist
+    module.stock_info_a_code_name = stock_info_a_code_name
+    module.stock_lhb_stock_statistic_em = stock_lhb_stock_statistic_em
+    return module
+
+
+def _tushare_rows(code, data):
+    close = data['close'].values.astype('float64')
+    pre_close = pd.Series(close).shift(1).bfill().values
+    return pd.DataFrame({
+        'ts_code': code,
+        'trade_date': data['date'].dt.strftime('%Y%m%d').values,
+        'open': data['open'].values.astype('float64'),
+        'high': data['high'].values.astype('float64'),
+        'low': data['low'].values.astype('float64'),
+        'close': close,
+        'pre_close': pre_close,
+        'vol': data['volume'].values.astype('float64'),
+        'amount': data['volume'].values * close / 10,
+    })
+
+
+class FakePro:
+    """ts.pro_api() 的替身：pro.daily 按代码或按交易日返回日线 (倒序，与 Tushare 一致)"""
+
+    def __init__(self, universe, latency=0.0):
+        self.universe = universe
+        self.latency = latency
+        self.calls = []
+        self._market = None
+
+    def market(self):
+        if self._market is None:
+            self._market = pd.concat([_tushare_rows(code, data) for code, data in self.universe.items()],
+                                     ignore_index=True)
+        return self._market
+
+    def daily(self, ts_code=None, trade_date=None, start_date=None, end_date=None):
+        self.calls.append(('daily', ts_code, trade_date))
+        _sleep(self.latency)
+        if trade_date is not None:
+            rows = self.market().loc[lambda df: df['trade_date'] == trade_date]
+        elif ts_code in self.universe:
+            rows = _tushare_rows(ts_code, self.universe[ts_code])
+        else:
+            return pd.DataFrame()
+        if start_date is not None:
+            rows = rows.loc[rows['trade_date'] >= start_date]
+        if end_date is not None:
+            rows = rows.loc[rows['trade_date'] <= end_date]
+        return rows.iloc[::-1].reset_index(drop=True)
+
+    def trade_cal(self, exchange='', start_date=None, end_date=None, is_open='1'):
+        self.calls.append(('trade_cal', start_date, end_date))
+        dates = pd.bdate_range(start_date, end_date).strftime('%Y%m%d')
+        return pd.DataFrame({'exchange': 'SSE', 'cal_date': dates, 'is_open': 1})
+
+    def stock_basic(self, exchange='', list_status='L', fields=None):
+        return pd.DataFrame({'ts_code': list(self.universe), 'name': '合成',
+                             'list_date': [data['date'].iloc[0].strftime('%Y%m%d') for data in self.universe.values()]})
+
+
+def make_tushare(universe, latency=0.0):
+    module = types.ModuleType('tushare')
+    module.pro = FakePro(universe, latency)
+    module.set_token = lambda token: None
+    module.pro_api = lambda token=None: module.pro
+    return module
+
+
+class FakeSession:
+    """snapshot.session() 的替身：按 hq.sinajs.cn 的格式返回每只股票最后一根 K 线"""
+
+    def __init__(self, universe, latency=0.0):
+        self.symbols = {snapshot.symbol(code): data for code, data in universe.items()}
+        self.latency = latency
+        self.urls = []
+
+    def quote(self, symbol):
+        data = self.symbols.get(symbol)
+        if data is None or data.empty:
+            return 'var hq_str_{}="";\n'.format(symbol)
+        last = data.iloc[-1]
+        pre_close = data['close'].iloc[-2] if len(data) > 1 else last['open']
+        price = float(last['close'])
+        fields = ['合成', float(last['open']), float(pre_close), price, float(last['high']), float(last['low']),
+                  price, price, int(last['volume']) * 100, int(last['volume']) * 100 * price] \
+            + ['0'] * 20 + [last['date'].strftime('%Y-%m-%d'), '15:00:00', '00']
+        return 'var hq_str_{}="{}";\n'.format(symbol, ','.join(str(f) for f in fields))
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        _sleep(self.latency)
+        text = ''.join(self.quote(s) for s in url[len(snapshot.URL):].split(','))
+        return type('Response', (), {'text': text, 'raise_for_status': lambda self: None})()
+
+
+@contextlib.contextmanager
+def installed(universe, latency=0.0):
+    """
+    在 with 块内用替身替换 akshare、tushare 和新浪行情，退出时恢复。
+    latency 为每次请求的模拟延迟 (秒)，返回 (akshare, tushare, session) 便于统计调用次数
+    """
+    akshare = make_akshare(universe, latency)
+    tushare = make_tushare(universe, latency)
+    session = FakeSession(universe, latency)
+    saved = {name: sys.modules.get(name) for name in ('akshare', 'tushare')}
+    saved_session = snapshot._session
+    sys.modules['akshare'] = akshare
+    sys.modules['tushare'] = tushare
+    snapshot._session = session
+    health.reset()
+    try:
+        yield akshare, tushare, session
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        snapshot._session = saved_session
+        health.reset()
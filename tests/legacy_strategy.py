@@ -0,0 +1,386 @@
+# -*- encoding: UTF-8 -*-
+# 逐行 (iterrows / iloc) 实现的策略原版，仅作为向量化版本的对照基准
+import logging
+from datetime import datetime, timedelta
+
+import pandas as pd
+import talib as tl
+
+
+
+def turtle_trade_check_enter(code_name, data, end_date=None, threshold=60):
+    max_price = 0
+    if end_date is not None:
+        mask = (data['日期'] <= end_date)
+        data = data.loc[mask]
+    if data is None:
+        return False
+    data = data.tail(n=threshold)
+    if len(data) < threshold:
+        return False
+    for index, row in data.iterrows():
+        if row['收盘'] > max_price:
+            max_price = float(row['收盘'])
+
+    last_close = data.iloc[-1]['收盘']
+
+    if last_close >= max_price:
+        return True
+
+    return False
+
+
+def enter_check_volume(code_name, data, end_date=None, threshold=60):
+    if len(data) < threshold:
+        logging.debug("{0}:样本小于250天...\n".format(code_name))
+        return False
+    data['vol_ma5'] = pd.Series(tl.MA(data['成交量'].values, 5), index=data.index.values)
+
+    if end_date is not None:
+        mask = (data['日期'] <= end_date)
+        data = data.loc[mask]
+    if data.empty:
+        return False
+    p_change = data.iloc[-1]['p_change']
+    if p_change < 2 \
+            or data.iloc[-1]['收盘'] < data.iloc[-1]['开盘']:
+        return False
+    data = data.tail(n=threshold + 1)
+    if len(data) < threshold + 1:
+        logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
+        return False
+
+    # 最后一天收盘价
+    last_close = data.iloc[-1]['收盘']
+    # 最后一天成交量
+    last_vol = data.iloc[-1]['成交量']
+
+    amount = last_close * last_vol * 100
+
+    # 成交额不低于2亿
+    if amount < 200000000:
+        return False
+
+    data = data.head(n=threshold)
+
+    mean_vol = data.iloc[-1]['vol_ma5']
+
+    vol_ratio = last_vol / mean_vol
+    if vol_ratio >= 2:
+        msg = "*{0}\n量比：{1:.2f}\t涨幅：{2}%\n".format(code_name, vol_ratio, p_change)
+        logging.debug(msg)
+        return True
+    else:
+        return False
+
+
+def enter_check_breakthrough(code_name, data, end_date=None, threshold=30):
+    max_price = 0
+    if end_date is not None:
+        mask = (data['日期'] <= end_date)
+        data = data.loc[mask]
+    data = data.tail(n=threshold+1)
+    if len(data) < threshold + 1:
+        logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
+        return False
+
+    # 最后一天收市价
+    last_close = float(data.iloc[-1]['收盘'])
+    last_open = float(data.iloc[-1]['开盘'])
+
+    data = data.head(n=threshold)
+    second_last_close = data.iloc[-1]['收盘']
+
+    for index, row in data.iterrows():
+        if row['收盘'] > max_price:
+            max_price = float(row['收盘'])
+
+    if last_close > max_price > second_last_close and max_price > last_open \
+            and last_close / last_open > 1.06:
+        return True
+    else:
+        return False
+
+
+def enter_check_continuous_volume(code_name, data, end_date=None, threshold=60, window_size=3):
+    stock = code_name[0]
+    name = code_name[1]
+    data['vol_ma5'] = pd.Series(tl.MA(data['成交量'].values, 5), index=data.index.values)
+    if end_date is not None:
+        mask = (data['日期'] <= end_date)
+        data = data.loc[mask]
+    data = data.tail(n=threshold + window_size)
+    if len(data) < threshold + window_size:
+        logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold+window_size))
+        return False
+
+    # 最后一天收盘价
+    last_close = data.iloc[-1]['收盘']
+    # 最后一天成交量
+    last_vol = data.iloc[-1]['成交量']
+
+    data_front = data.head(n=threshold)
+    data_end = data.tail(n=window_size)
+
+    mean_vol = data_front.iloc[-1]['vol_ma5']
+
+    for index, row in data_end.iterrows():
+        if float(row['成交量']) / mean_vol < 3.0:
+            return False
+
+    msg = "*{0} 量比：{1:.2f}\n\t收盘价：{2}\n".format(code_name, last_vol/mean_vol, last_close)
+    logging.debug(msg)
+    return True
+
+
+def backtrace_ma250_check(code_name, data, end_date=None, threshold=60):
+    if len(data) < 250:
+        logging.debug("{0}:样本小于250天...\n".format(code_name))
+        return
+    data['ma250'] = pd.Series(tl.MA(data['收盘'].values, 250), index=data.index.values)
+
+    begin_date = data.iloc[0].日期
+    if end_date is not None:
+        if end_date < begin_date:  # 该股票在end_date时还未上市
+            logging.debug("{}在{}时还未上市".format(code_name, end_date))
+            return False
+
+    if end_date is not None:
+        mask = (data['日期'] <= end_date)
+        data = data.loc[mask]
+
+    data = data.tail(n=threshold)
+
+    last_close = data.iloc[-1]['收盘']
+
+    # 区间最低点
+    lowest_row = data.iloc[-1]
+    # 区间最高点
+    highest_row = data.iloc[-1]
+
+    # 近期低点
+    recent_lowest_row = data.iloc[-1]
+
+    # 计算区间最高、最低价格
+    for index, row in data.iterrows():
+        if row['收盘'] > highest_row['收盘']:
+            highest_row = row
+        elif row['收盘'] < lowest_row['收盘']:
+            lowest_row = row
+
+    if lowest_row['成交量'] == 0 or highest_row['成交量'] == 0:
+        return False
+
+    data_front = data.loc[(data['日期'] < highest_row['日期'])]
+    data_end = data.loc[(data['日期'] >= highest_row['日期'])]
+
+    if data_front.empty:
+        return False
+    # 前半段由年线以下向上突破
+    if not (data_front.iloc[0]['收盘'] < data_front.iloc[0]['ma250'] and
+            data_front.iloc[-1]['收盘'] > data_front.iloc[-1]['ma250']):
+        return False
+
+    if not data_end.empty:
+        # 后半段必须在年线以上运行（回踩年线）
+        for index, row in data_end.iterrows():
+            if row['收盘'] < row['ma250']:
+                return False
+            if row['收盘'] < recent_lowest_row['收盘']:
+                recent_lowest_row = row
+
+# 修复 TypeError: 使用 str() 确保输入始终为字符串
+        date_diff = datetime.date(datetime.strptime(str(recent_lowest_row['日期']), '%Y-%m-%d')) - \
+                    datetime.date(datetime.strptime(str(highest_row['日期']), '%Y-%m-%d'))
+
+    if not(timedelta(days=10) <= date_diff <= timedelta(days=50)):
+        return False
+    # 回踩伴随缩量
+    vol_ratio = highest_row['成交量']/recent_lowest_row['成交量']
+    back_ratio = recent_lowest_row['收盘'] / highest_row['收盘']
+
+    if not (vol_ratio > 2 and back_ratio < 0.8) :
+        return False
+
+    return True
+
+
+def breakthrough_platform_check(code_name, data, end_date=None, threshold=60):
+    origin_data = data
+    if len(data) < threshold:
+        logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
+        return
+    data['ma60'] = pd.Series(tl.MA(data['收盘'].values, 60), index=data.index.values)
+
+    if end_date is not None:
+        mask = (data['日期'] <= end_date)
+        data = data.loc[mask]
+
+    data = data.tail(n=threshold)
+
+    breakthrough_row = None
+
+    for index, row in data.iterrows():
+        if row['开盘'] < row['ma60'] <= row['收盘']:
+            if enter_check_volume(code_name, origin_data, row['日期'], threshold):
+                breakthrough_row = row
+
+    if breakthrough_row is None:
+        return False
+
+    data_front = data.loc[(data['日期'] < breakthrough_row['日期'])]
+    data_end = data.loc[(data['日期'] >= breakthrough_row['日期'])]
+
+    for index, row in data_front.iterrows():
+        if not (-0.05 < (row['ma60'] - row['收盘']) / row['ma60'] < 0.2):
+            return False
+
+    return True
+
+
+def low_atr_check_low_increase(code_name, data, end_date=None, ma_short=30, ma_long=250, threshold=10):
+    stock = code_name[0]
+    name = code_name[1]
+    if len(data) < ma_long:
+        logging.debug("{0}:样本小于{1}天...\n".format(code_name, ma_long))
+        return False
+
+    data['ma_short'] = pd.Series(tl.MA(data['收盘'].values, ma_short), index=data.index.values)
+    data['ma_long'] = pd.Series(tl.MA(data['收盘'].values, ma_long), index=data.index.values)
+
+    if end_date is not None:
+        mask = (data['日期'] <= end_date)
+        data = data.loc[mask]
+    data = data.tail(n=threshold)
+    inc_days = 0
+    dec_days = 0
+    if len(data) < threshold:
+        logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
+        return False
+
+    # 区间最低点
+    lowest_row = data.iloc[-1]
+    # 区间最高点
+    highest_row = data.iloc[-1]
+
+    days_count = len(data)
+    total_change = 0.0
+    for index, row in data.iterrows():
+        if 'p_change' in row:
+            p_change = float(row['p_change'])
+            if abs(p_change) > 0:
+                total_change += abs(p_change)
+            # if p_change < -7:
+            #     return False
+            # if row['ma_short'] < row['ma_long']:
+            #     return False
+
+            if p_change > 0:
+                inc_days = inc_days + 1
+            if p_change < 0:
+                dec_days = dec_days + 1
+
+            if row['收盘'] > highest_row['收盘']:
+                highest_row = row
+            if row['收盘'] < lowest_row['收盘']:
+                lowest_row = row
+
+    atr = total_change / days_count
+    if atr > 10:
+        return False
+
+    ratio = (highest_row['收盘'] - lowest_row['收盘']) / lowest_row['收盘']
+
+    if ratio > 1.1:
+        logging.debug("股票：{0}（{1}）  最低:{2}, 最高:{3}, 涨跌比率:{4}       上涨天数:{5}， 下跌天数:{6}".format(name, stock, lowest_row['日期'], highest_row['日期'], ratio, inc_days, dec_days))
+        return True
+
+    return False
+
+
+def parking_apron_check(code_name, data, end_date=None, threshold=15):
+    origin_data = data
+
+    if end_date is not None:
+        mask = (data['日期'] <= end_date)
+        data = data.loc[mask]
+
+    if len(data) < threshold:
+        logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
+        return
+
+    data = data.tail(n=threshold)
+
+    flag = False
+
+    # 找出涨停日
+    for index, row in data.iterrows():
+        try:
+            if float(row['p_change']) > 9.5:
+                if turtle_trade_check_enter(code_name, origin_data, row['日期'], threshold):
+                    if parking_apron_check_internal(code_name, data, row):
+                        flag = True
+        except KeyError as error:
+            logging.debug("{}处理异常：{}".format(code_name, error))
+
+    return flag
+
+
+def parking_apron_check_internal(code_name, data, limitup_row):
+    limitup_price = limitup_row['收盘']
+    limitup_end = data.loc[(data['日期'] > limitup_row['日期'])]
+    limitup_end = limitup_end.head(n=3)
+    if len(limitup_end.index) < 3:
+        return False
+
+    consolidation_day1 = limitup_end.iloc[0]
+    consolidation_day23 = limitup_end = limitup_end.tail(n=2)
+
+    if not(consolidation_day1['收盘'] > limitup_price and consolidation_day1['开盘'] > limitup_price and
+        0.97 < consolidation_day1['收盘'] / consolidation_day1['开盘'] < 1.03):
+        return False
+
+    threshold_price = limitup_end.iloc[-1]['收盘']
+
+    for index, row in consolidation_day23.iterrows():
+        try:
+            if not (0.97 < (row['收盘'] / row['开盘']) < 1.03 and -5 < row['p_change'] < 5
+                    and row['收盘'] > limitup_price and row['开盘'] > limitup_price):
+                return False
+        except KeyError as error:
+            logging.debug("{}处理异常：{}".format(code_name, error))
+
+    logging.debug("股票{0} 涨停日期：{1}".format(code_name, limitup_row['日期']))
+
+    return True
+
+
+def low_backtrace_increase_check(code_name, data, end_date=None, threshold=60):
+    if end_date is not None:
+        mask = (data['日期'] <= end_date)
+        data = data.loc[mask]
+    data = data.tail(n=threshold)
+
+    if len(data) < threshold:
+        logging.debug("{0}:样本小于{1}天...\n".format(code_name, threshold))
+        return False
+
+    ratio_increase = (data.iloc[-1]['收盘'] - data.iloc[0]['收盘']) / data.iloc[0]['收盘']
+    if ratio_increase < 0.6:
+        return False
+
+    # 允许有一次“洗盘”
+    flag = True
+    for i in range(1, len(data)):
+        # 单日跌幅超7%；高开低走7%；两日累计跌幅10%；两日高开低走累计10%
+        if data.iloc[i - 1]['p_change'] < -7 \
+                or (data.iloc[i]['收盘'] - data.iloc[i]['开盘'])/data.iloc[i]['开盘'] * 100 < -7 \
+                or data.iloc[i - 1]['p_change'] + data.iloc[i]['p_change'] < -10 \
+                or (data.iloc[i]['收盘'] - data.iloc[i - 1]['开盘']) / data.iloc[i - 1]['开盘'] * 100 < -10:
+            return False
+            # if flag:
+            #     flag = False
+            # else:
+            #     return False
+
+    return True
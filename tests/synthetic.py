@@ -0,0 +1,95 @@
+# -*- encoding: UTF-8 -*-
+# 合成日线数据：随机游走 + 趋势切换，带涨跌停和放量日，格式与 bars 统一格式一致
+import numpy as np
+import pandas as pd
+import talib as tl
+
+import bars
+
+# 统一格式 -> 旧版策略使用的 akshare 中文列名
+LEGACY_COLUMNS = {'date': '日期', 'open': '开盘', 'close': '收盘', 'high': '最高', 'low': '最低', 'volume': '成交量'}
+
+
+def _frame(start, open_, close, high, low, volume, dates=None):
+    return bars.normalize(pd.DataFrame({
+        'date': pd.bdate_range(start, periods=len(close)) if dates is None else dates,
+        'open': open_,
+        'high': np.round(high, 2),
+        'low': np.round(low, 2),
+        'close': close,
+        'volume': np.round(volume),
+    }))
+
+
+def to_legacy(data):
+    """转换成旧版策略的输入：中文列名、float64、字符串日期、带 p_change 列"""
+    data = data.rename(columns=LEGACY_COLUMNS)
+    data['日期'] = data['日期'].dt.strftime('%Y-%m-%d')
+    for column in ['开盘', '收盘', '最高', '最低', '成交量']:
+        data[column] = data[column].astype('float64')
+    data['p_change'] = tl.ROC(data['收盘'].values, 1)
+    return data
+
+
+def make_history(seed, days=400, start='2020-01-02', price=10.0, limit_up_rate=0.03, dates=None):
+    rng = np.random.default_rng(seed)
+
+    # 趋势分段切换，制造突破、回踩和横盘
+    drift = np.repeat(rng.normal(0.002, 0.012, days // 20 + 1), 20)[:days]
+    returns = drift + rng.normal(0, rng.uniform(0.01, 0.03), days)
+    limit = rng.random(days)
+    returns[limit < limit_up_rate] = 0.1
+    returns[limit > 0.985] = -0.1
+    returns = np.clip(returns, -0.1, 0.1)
+
+    close = np.round(price * np.cumprod(1 + returns), 2)
+    prev_close = np.concatenate([[price], close[:-1]])
+    gap = rng.normal(0, 0.01, days)
+    open_ = np.round(prev_close * (1 + np.clip(gap, -0.1, 0.1)), 2)
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, days)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, days)))
+
+    volume = rng.lognormal(12, 0.4, days) * (1 + 8 * np.abs(returns))
+    volume[rng.random(days) < 0.03] *= 6
+    # 连续放量
+    for i in np.flatnonzero(rng.random(days) < 0.01):
+        volume[i:i + 3] *= 8
+
+    return _frame(start, open_, close, high, low, volume, dates)
+
+
+def make_backtrace_history(seed, start='2020-01-02'):
+    """年线下方长期横盘 -> 放量突破年线 -> 缩量回踩，用于命中回踩年线策略"""
+    rng = np.random.default_rng(seed)
+    base = 10.0 - np.linspace(0, 0.5, 300) + rng.normal(0, 0.05, 300)
+    rally = np.linspace(base[-1], base[-1] * rng.uniform(1.7, 2.0), 31)[1:]
+    pullback = np.linspace(rally[-1], rally[-1] * rng.uniform(0.7, 0.78), 25)[1:]
+    close = np.round(np.concatenate([base, rally, pullback]), 2)
+    open_ = np.round(close * (1 + rng.normal(0, 0.005, len(close))), 2)
+
+    volume = rng.lognormal(12, 0.2, len(close))
+    volume[len(base) + len(rally) - 1] *= 5
+    volume[-len(pullback):] *= 0.3
+
+    return _frame(start, open_, close, np.maximum(open_, close), np.minimum(open_, close), volume)
+
+
+def make_universe(count, days=500, seed=0, end=None):
+    """
+    全市场合成日线 {代码: 日线}，截止到 end (默认今天，周末时为之前最近的工作日)。
+    个股的价格、涨停频率各不相同，约 5% 为上市不久的新股，约 10% 有一段停牌 (连续缺失若干交易日)
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.today().normalize()
+    calendar = pd.bdate_range(end=end, periods=days)
+    frames = {}
+    for i in range(count):
+        code = '{:06d}.SH'.format(600000 + i) if i % 2 == 0 else '{:06d}.SZ'.format(i)
+        length = min(int(rng.integers(20, 120)), days) if rng.random() < 0.05 else days
+        data = make_history(seed * 100003 + i, days=length, price=float(rng.uniform(3, 80)),
+                            limit_up_rate=float(rng.uniform(0.01, 0.06)), dates=calendar[-length:])
+        if rng.random() < 0.1 and length > 60:
+            begin = int(rng.integers(0, length - 10))
+            data = data.drop(data.index[begin:begin + int(rng.integers(3, 40))]).reset_index(drop=True)
+        frames[code] = data
+    return frames
@@ -71,17 +71,17 @@ settings.init()
 # data = ts.get_stock_basics()
 # print(data)
 
-stocks = [('002728', '特一药业')]
-strategies = {
-        '海龟交易法则': turtle_trade.check_enter,
-        # '放量上涨': enter.check_volume,
-        # '均线多头': keep_increasing.check,
-        # '停机坪': parking_apron.check,
-        # '回踩年线': backtrace_ma250.check,
-        '高而窄的旗形': high_tight_flag.check,
-        '放量跌停': climax_limitdown.check,
-        # '突破平台': breakthrough_platform.check,
-        # '无大幅回撤': low_backtrace_increase.check,
-    }
+settings.config['codes'] = ['002728.SZ']
+strategies = [
+        turtle_trade.check_enter,  # 海龟交易法则
+        # enter.check_volume,  # 放量上涨
+        # keep_increasing.check,  # 均线多头
+        # parking_apron.check,  # 停机坪
+        # backtrace_ma250.check,  # 回踩年线
+        high_tight_flag.check,  # 高而窄的旗形
+        climax_limitdown.check,  # 放量跌停
+        # breakthrough_platform.check,  # 突破平台
+        # low_backtrace_increase.check,  # 无大幅回撤
+    ]
 
-process(stocks, strategies)
\ No newline at end of file
+print(process(strategies))
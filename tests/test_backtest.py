@@ -0,0 +1,26 @@
+import numpy as np
+
+import backtest
+from strategy import turtle_trade
+from synthetic import make_history
+
+
+def test_run_collects_signals_and_forward_returns():
+    stocks_data = {('{:06d}'.format(i), '测试{}'.format(i)): make_history(i) for i in range(3)}
+    trades = backtest.run(stocks_data, {'海龟交易法则': turtle_trade.check_enter_signals},
+                          start_date='2020-06-01', end_date='2021-03-31')
+
+    assert len(trades) > 0
+    assert (trades['日期'] >= np.datetime64('2020-06-01')).all()
+    assert (trades['日期'] <= np.datetime64('2021-03-31')).all()
+
+    # 每笔信号都与单日 check 结果一致，收益率按之后第 N 根 K 线计算
+    for _, trade in trades.iterrows():
+        data = stocks_data[(trade['代码'], trade['名称'])]
+        i = int(np.flatnonzero(data['date'].values == trade['日期'])[0])
+        assert turtle_trade.check_enter(None, data, end_date=data['date'].iloc[i])
+        close = data['close'].values.astype('float64')
+        assert np.isclose(trade['5日收益率'], close[i + 5] / close[i] - 1)
+
+    summary = backtest.summary(trades)
+    assert summary.loc['海龟交易法则', '信号次数'] == len(trades)
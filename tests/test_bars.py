@@ -0,0 +1,27 @@
+import pandas as pd
+
+import bars
+
+
+def test_from_akshare_drops_extra_fields():
+    data = pd.DataFrame({
+        '日期': ['2023-01-03', '2023-01-04'], '股票代码': ['000001', '000001'],
+        '开盘': [10.0, 10.5], '收盘': [10.5, 10.8], '最高': [10.6, 11.0], '最低': [9.9, 10.4],
+        '成交量': [12345, 23456], '成交额': [1.3e7, 2.5e7], '振幅': [7.0, 5.7], '换手率': [0.1, 0.2],
+    })
+    result = bars.from_akshare(data)
+    assert list(result.columns) == bars.COLUMNS
+    assert bars.is_canonical(result)
+    assert list(result['volume']) == [12345, 23456]
+
+
+def test_from_tushare_sorts_ascending():
+    data = pd.DataFrame({
+        'ts_code': ['000001.SZ', '000001.SZ'], 'trade_date': ['20230104', '20230103'],
+        'open': [10.5, 10.0], 'high': [11.0, 10.6], 'low': [10.4, 9.9], 'close': [10.8, 10.5],
+        'pre_close': [10.5, 10.2], 'vol': [23456.7, 12345.2], 'amount': [2.5e4, 1.3e4],
+    })
+    result = bars.from_tushare(data)
+    assert bars.is_canonical(result)
+    assert list(result['date']) == [pd.Timestamp('2023-01-03'), pd.Timestamp('2023-01-04')]
+    assert list(result['volume']) == [12345, 23457]
@@ -0,0 +1,48 @@
+import benchmark
+import bars
+import work_flow
+from fake_sources import installed
+from synthetic import make_universe
+
+
+def test_universe_shapes():
+    universe = make_universe(200, days=300, seed=1)
+    lengths = [len(data) for data in universe.values()]
+    assert len(universe) == 200
+    assert all(bars.is_canonical(data) for data in universe.values())
+    # 新股和停牌
+    assert min(lengths) < 120
+    assert sum(20 < 300 - n < 60 for n in lengths) > 0
+    # 所有股票截止到同一天
+    assert len({data['date'].iloc[-1] for data in universe.values()}) <= 2
+
+
+def test_fake_sources_round_trip():
+    universe = make_universe(4, days=100)
+    code, data = next(iter(universe.items()))
+    with installed(universe) as (akshare, _, _):
+        fetched = work_flow.fetch_akshare(code)
+        tail = work_flow.fetch_akshare(code, data['date'].iloc[-5])
+        quote = work_flow.fetch_from_sina(code)
+    assert fetched.equals(data)
+    assert len(tail) == 5
+    assert quote['close'].iloc[0] == data['close'].iloc[-1]
+    assert len(akshare.calls) == 2
+
+
+def test_benchmark_smoke():
+    report = benchmark.run(codes=30, days=300)
+    names = {name for name, _, _ in benchmark.discover()}
+    assert names <= set(report['strategies'])
+    assert 'turtle_trade.check_enter' in names and 'enter.check_volume_prefilter' in names
+    assert all(item.get('errors', 0) == 0 for item in report['strategies'].values())
+    assert report['pipeline']['cold']['fetches'] == 30
+    assert report['pipeline']['cold']['hits'] == report['pipeline']['warm']['hits']
+
+
+def test_regressions():
+    baseline = {'generate': {'seconds': 1.0}, 'strategies': {'a': {'seconds': 1.0}, 'b': {'seconds': 0.01}},
+                'pipeline': {'cold': {'seconds': 2.0}}}
+    report = {'generate': {'seconds': 1.1}, 'strategies': {'a': {'seconds': 1.5}, 'b': {'seconds': 0.03}},
+              'pipeline': {'cold': {'seconds': 2.0}}}
+    assert benchmark.regressions(report, baseline, 0.2) == [('strategies.a', 1.0, 1.5)]
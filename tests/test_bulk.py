@@ -0,0 +1,105 @@
+import pandas as pd
+
+import bulk
+import store
+from test_store import make_bars
+
+
+class FakePro:
+    """pro_api 的本地替身：按交易日返回全市场日线"""
+
+    def __init__(self, daily):
+        self.daily_frame = daily
+        self.calls = []
+
+    def trade_cal(self, exchange='', start_date=None, end_date=None, is_open='1'):
+        self.calls.append(('trade_cal', start_date, end_date))
+        dates = pd.bdate_range(start_date, end_date).strftime('%Y%m%d')
+        return pd.DataFrame({'exchange': 'SSE', 'cal_date': dates, 'is_open': 1})
+
+    def daily(self, trade_date=None):
+        self.calls.append(('daily', trade_date))
+        return self.daily_frame.loc[self.daily_frame['trade_date'] == trade_date].reset_index(drop=True)
+
+
+def tushare_rows(code, data, pre_close=None):
+    closes = list(data['close'])
+    return pd.DataFrame({
+        'ts_code': code,
+        'trade_date': data['date'].dt.strftime('%Y%m%d').values,
+        'open': data['open'].values, 'high': data['high'].values, 'low': data['low'].values,
+        'close': closes,
+        'pre_close': [pre_close] + closes[:-1],
+        'vol': data['volume'].values,
+        'amount': 0.0,
+    })
+
+
+def test_bulk_update_fans_out_trade_days(tmp_path):
+    a = make_bars('2023-01-02', 12)
+    b = make_bars('2023-01-02', 12, close=20.0)
+    store.save('000001.SZ', a.head(8), root=tmp_path)
+    store.save('600000.SH', b.head(10), root=tmp_path)
+
+    daily = pd.concat([
+        tushare_rows('000001.SZ', a.iloc[8:], pre_close=a['close'].iloc[7]),
+        tushare_rows('600000.SH', b.iloc[10:], pre_close=b['close'].iloc[9]),
+        # 库中没有的股票不入库
+        tushare_rows('000002.SZ', a.iloc[8:], pre_close=a['close'].iloc[7]),
+    ])
+    pro = FakePro(daily)
+    fresh = bulk.update(['000001.SZ', '600000.SH', '000003.SZ'], pro, root=tmp_path, end_date='2023-01-17')
+
+    assert fresh == {'000001.SZ', '600000.SH'}
+    # 一次交易日历 + 每个交易日一次，而不是每只股票一次
+    assert [c[0] for c in pro.calls].count('daily') == 4
+    assert list(store.load('000001.SZ', root=tmp_path)['close']) == list(a['close'].astype('float32'))
+    assert len(store.load('600000.SH', root=tmp_path)) == 12
+    assert store.load('000002.SZ', root=tmp_path) is None
+
+
+def test_bulk_update_skips_ex_rights(tmp_path):
+    a = make_bars('2023-01-02', 10)
+    store.save('000001.SZ', a.head(8), root=tmp_path)
+    # 除权：pre_close 与库中收盘价不一致
+    pro = FakePro(tushare_rows('000001.SZ', a.iloc[8:], pre_close=a['close'].iloc[7] * 0.9))
+
+    assert bulk.update(['000001.SZ'], pro, root=tmp_path, end_date='2023-01-13') == set()
+    assert len(store.load('000001.SZ', root=tmp_path)) == 8
+
+
+def test_bulk_update_stops_at_unpublished_day(tmp_path):
+    a = make_bars('2023-01-02', 10)
+    store.save('000001.SZ', a.head(8), root=tmp_path)
+    pro = FakePro(tushare_rows('000001.SZ', a.iloc[8:9], pre_close=a['close'].iloc[7]))
+
+    # 已发布的部分照样入库，但 20230113 之后尚未发布：不能算最新，留给逐只更新补齐
+    assert bulk.update(['000001.SZ'], pro, root=tmp_path, end_date='2023-01-20') == set()
+    assert len(store.load('000001.SZ', root=tmp_path)) == 9
+    # 第一个未发布的交易日之后不再请求
+    assert [c for c in pro.calls if c[0] == 'daily'] == [('daily', '20230112'), ('daily', '20230113')]
+
+
+def test_bulk_update_nothing_published(tmp_path):
+    a = make_bars('2023-01-02', 10)
+    store.save('000001.SZ', a, root=tmp_path)
+    store.save('600000.SH', a.head(9), root=tmp_path)
+    # 下一个交易日 (20230116) 尚未发布：库中的股票都不是最新
+    pro = FakePro(tushare_rows('000001.SZ', a.head(1)))
+    assert bulk.update(['000001.SZ', '600000.SH'], pro, root=tmp_path, end_date='2023-01-16') == set()
+    # 没有新的交易日：已到最后交易日的股票是最新
+    assert bulk.update(['000001.SZ'], pro, root=tmp_path, end_date='2023-01-13') == {'000001.SZ'}
+
+
+def test_bulk_update_caps_lookback(tmp_path):
+    a = make_bars('2023-01-02', 60)
+    store.save('000001.SZ', a.head(58), root=tmp_path)
+    # 长期停牌的股票不把起点拉到两个月前
+    store.save('600000.SH', make_bars('2023-01-02', 5), root=tmp_path)
+    pro = FakePro(tushare_rows('000001.SZ', a.iloc[58:], pre_close=a['close'].iloc[57]))
+
+    end = a['date'].iloc[-1].strftime('%Y-%m-%d')
+    assert bulk.update(['000001.SZ', '600000.SH'], pro, root=tmp_path, end_date=end) == {'000001.SZ'}
+    assert [c for c in pro.calls if c[0] == 'daily'] == \
+        [('daily', d.strftime('%Y%m%d')) for d in a['date'].iloc[58:]]
+    assert len(store.load('600000.SH', root=tmp_path)) == 5
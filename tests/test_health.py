@@ -0,0 +1,117 @@
+import pandas as pd
+
+import health
+import work_flow
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_trips_and_recovers():
+    clock = Clock()
+    breaker = health.Breaker('akshare', failures=3, cooldown=60, clock=clock)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.failure()
+    assert breaker.state == health.CLOSED
+    breaker.failure()
+    assert breaker.state == health.OPEN
+    assert not breaker.allow()
+
+    # 冷却后只放行一个探测请求
+    clock.now = 60
+    assert breaker.state == health.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    # 探测失败重新熔断
+    breaker.failure()
+    assert breaker.state == health.OPEN
+    clock.now = 120
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == health.CLOSED
+    assert breaker.allow()
+
+
+def test_success_resets_consecutive_failures():
+    breaker = health.Breaker('akshare', failures=3)
+    breaker.failure()
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    breaker.failure()
+    assert breaker.state == health.CLOSED
+
+
+def test_waterfall_promotes_healthy_source(monkeypatch):
+    health.reset()
+    monkeypatch.setattr(health, 'breaker_config', lambda: {'failures': 3, 'cooldown': 60})
+    calls = []
+
+    def akshare(code, start_date=None):
+        calls.append('akshare')
+        raise ConnectionError('eastmoney down')
+
+    def tushare(code, start_date=None):
+        calls.append('tushare')
+        return pd.DataFrame({'close': [1.0]})
+
+    monkeypatch.setitem(work_flow.HISTORY_SOURCES, 'akshare', akshare)
+    monkeypatch.setitem(work_flow.HISTORY_SOURCES, 'tushare', tushare)
+    try:
+        for i in range(100):
+            assert not work_flow.fetch_history('{:06d}.SZ'.format(i)).empty
+        # 只有熔断前的几次请求打到故障数据源
+        assert calls.count('akshare') == 3
+        assert calls.count('tushare') == 100
+        assert health.rank(['akshare', 'tushare']) == ['tushare']
+    finally:
+        health.reset()
+
+
+def test_waterfall_returns_to_primary_after_cooldown(monkeypatch):
+    health.reset()
+    clock = Clock()
+    for source in ('akshare', 'tushare'):
+        monkeypatch.setitem(health._breakers, source, health.Breaker(source, failures=3, cooldown=60, clock=clock))
+    calls = []
+    down = [True]
+
+    def akshare(code, start_date=None):
+        calls.append('akshare')
+        if down[0]:
+            raise ConnectionError('eastmoney down')
+        return pd.DataFrame({'close': [1.0]})
+
+    def tushare(code, start_date=None):
+        calls.append('tushare')
+        return pd.DataFrame({'close': [1.0]})
+
+    monkeypatch.setitem(work_flow.HISTORY_SOURCES, 'akshare', akshare)
+    monkeypatch.setitem(work_flow.HISTORY_SOURCES, 'tushare', tushare)
+    for i in range(10):
+        work_flow.fetch_history('{:06d}.SZ'.format(i))
+    assert health.rank(['akshare', 'tushare']) == ['tushare']
+
+    # 冷却后探测失败：本次走下一级，重新熔断
+    clock.now = 60
+    calls.clear()
+    assert not work_flow.fetch_history('000001.SZ').empty
+    assert calls == ['akshare', 'tushare']
+    assert health.rank(['akshare', 'tushare']) == ['tushare']
+
+    # 恢复后首选数据源重新成为首选
+    down[0] = False
+    clock.now = 120
+    calls.clear()
+    for i in range(5):
+        work_flow.fetch_history('{:06d}.SZ'.format(i))
+    assert calls == ['akshare'] * 5
+    assert health.breaker('akshare').state == health.CLOSED
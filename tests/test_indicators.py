@@ -0,0 +1,57 @@
+import collections
+
+import numpy as np
+import talib as tl
+
+import indicators
+import settings
+from strategy import backtrace_ma250, breakthrough_platform, climax_limitdown, enter, high_tight_flag, \
+    keep_increasing, low_atr, low_backtrace_increase, parking_apron, turtle_trade
+from synthetic import make_history
+
+CHECKS = [
+    enter.check_volume, enter.check_ma, enter.check_breakthrough, enter.check_continuous_volume,
+    keep_increasing.check, parking_apron.check, backtrace_ma250.check, breakthrough_platform.check,
+    low_backtrace_increase.check, turtle_trade.check_enter, high_tight_flag.check, climax_limitdown.check,
+    low_atr.check_low_increase,
+]
+
+
+def test_each_indicator_computed_once(monkeypatch):
+    calls = collections.Counter()
+
+    def counting(name, func):
+        def wrapper(values, *params):
+            calls[(name,) + params] += 1
+            return func(values, *params)
+        return wrapper
+
+    for name, func in list(indicators.FUNCTIONS.items()):
+        monkeypatch.setitem(indicators.FUNCTIONS, name, counting(name, func))
+    monkeypatch.setattr(settings, 'top_list', ['000001'], raising=False)
+
+    data = make_history(1, days=400)
+    columns = list(data.columns)
+    for check in CHECKS:
+        check(('000001', '测试'), data)
+
+    assert calls
+    assert set(calls.values()) == {1}
+    # 策略不再往调用方的数据里写列
+    assert list(data.columns) == columns
+
+
+def test_cache_matches_talib_and_invalidates():
+    data = make_history(2, days=300)
+    ma = indicators.ma(data, 30)
+    np.testing.assert_array_equal(ma, tl.MA(data['close'].values.astype('float64'), 30))
+    assert indicators.ma(data, 30) is ma
+
+    # 追加 K 线后自动重算
+    data.loc[len(data)] = data.iloc[-1]
+    assert len(indicators.ma(data, 30)) == 301
+
+    # 原地改写后手动作废
+    data.loc[data.index[-1], 'close'] = 99.0
+    indicators.invalidate(data)
+    assert indicators.ma(data, 30)[-1] == tl.MA(data['close'].values.astype('float64'), 30)[-1]
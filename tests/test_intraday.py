@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+import indicators
+import intraday
+import registry
+import settings
+from synthetic import make_history
+
+
+def quote_of(code, data, i, scale=1.0):
+    """用第 i 根 K 线模拟盘中快照"""
+    return {'code': code, 'name': '测试', 'date': data['date'].iloc[i],
+            'open': float(data['open'].iloc[i]), 'high': float(data['high'].iloc[i]) * scale,
+            'low': float(data['low'].iloc[i]), 'close': float(data['close'].iloc[i]) * scale,
+            'volume': float(data['volume'].iloc[i]) * scale}
+
+
+def warm(data):
+    for period in (5, 10, 20, 30, 60, 250):
+        indicators.ma(data, period)
+    indicators.vol_ma(data)
+    indicators.p_change(data)
+
+
+def test_overlay_recomputes_only_tail(monkeypatch):
+    full = make_history(7, days=300)
+    history = full.iloc[:-1].reset_index(drop=True)
+    warm(history)
+    warm(full)
+
+    calls = []
+    for name, func in list(indicators.FUNCTIONS.items()):
+        def counting(values, *params, func=func):
+            calls.append(len(values))
+            return func(values, *params)
+        monkeypatch.setitem(indicators.FUNCTIONS, name, counting)
+
+    # 新的一天：追加临时 K 线；当天已入库：替换最后一根
+    frames = [intraday.overlay(history, pd.Series(quote_of('000001.SZ', full, -1))),
+              intraday.overlay(full, pd.Series(quote_of('000001.SZ', full, -1, scale=1.02)))]
+    assert calls and max(calls) <= 251
+    monkeypatch.undo()
+
+    for data in frames:
+        assert len(data) == len(full)
+        expected = data.copy()
+        for period in (5, 30, 250):
+            np.testing.assert_allclose(indicators.ma(data, period), indicators.ma(expected, period), rtol=1e-12)
+        np.testing.assert_allclose(indicators.vol_ma(data), indicators.vol_ma(expected), rtol=1e-12)
+        np.testing.assert_allclose(indicators.p_change(data), indicators.p_change(expected), rtol=1e-12)
+
+
+def test_rescan_matches_full_scan(monkeypatch):
+    fulls = {'{:06d}.SZ'.format(seed): make_history(seed, days=200, limit_up_rate=0.2) for seed in range(60)}
+    histories = {code: data.iloc[:-1].reset_index(drop=True) for code, data in fulls.items()}
+    monkeypatch.setattr(settings, 'top_list', [code[:6] for code in list(fulls)[::3]], raising=False)
+    rescan = intraday.Rescan(list(fulls), load=histories.get)
+
+    total = 0
+    for scale in (0.97, 1.0, 1.08):
+        quotes = pd.DataFrame([quote_of(code, data, -1, scale) for code, data in fulls.items()])
+        quotes['p_change'] = [(q / float(h['close'].iloc[-1]) - 1) * 100
+                              for q, h in zip(quotes['close'], histories.values())]
+        hits = rescan.run(quotes)
+
+        expected = []
+        for code, quote in quotes.set_index('code', drop=False).iterrows():
+            data = intraday.overlay(histories[code], quote).copy()
+            if registry.Registry.of(intraday.CHECKS).run(code, data):
+                expected.append(code)
+        assert hits == expected
+        total += len(hits)
+    assert total > 0
+
+
+def test_rescan_warms_declared_indicators():
+    history = make_history(1, days=120)
+    rescan = intraday.Rescan(['000001.SZ'], load={'000001.SZ': history}.get)
+    cache = rescan.history['000001.SZ'].__dict__['_indicators']
+    assert set(rescan.strategies.indicators) <= set(cache)
@@ -0,0 +1,104 @@
+import json
+
+import pandas as pd
+
+import journal
+import settings
+import store
+import work_flow
+from fake_sources import installed
+from synthetic import make_universe
+
+META = {'gates': {'listed_days': {'threshold': 60}}, 'strategies': [['turtle_trade.check_enter', '海龟交易法则']]}
+
+
+def test_record_flush_and_resume(tmp_path):
+    with journal.Journal('run', META, root=str(tmp_path), every=2) as log:
+        log.record('000001.SZ', ['海龟交易法则'])
+        log.record('000002.SZ')
+        log.record('600000.SH')
+    resumed = journal.Journal('run', META, root=str(tmp_path))
+    assert resumed.done == {'000001.SZ': ['海龟交易法则'], '000002.SZ': [], '600000.SH': []}
+    assert resumed.hits == {'000001.SZ': ['海龟交易法则']}
+
+
+def test_completed_run_starts_fresh(tmp_path):
+    with journal.Journal('run', META, root=str(tmp_path)) as log:
+        log.record('000001.SZ', ['海龟交易法则'])
+        log.complete()
+    # 已完成的扫描不续跑 (例如同一天收盘后手动重跑)
+    assert journal.Journal('run', META, root=str(tmp_path)).done == {}
+
+
+def test_changed_meta_starts_fresh(tmp_path):
+    with journal.Journal('run', META, root=str(tmp_path)) as log:
+        log.record('000001.SZ', ['海龟交易法则'])
+    assert journal.Journal('run', {'gates': {}, 'strategies': []}, root=str(tmp_path)).done == {}
+    # 旧日志已被覆盖
+    assert journal.Journal('run', META, root=str(tmp_path)).done == {}
+
+
+def test_half_written_line_is_ignored(tmp_path):
+    with journal.Journal('run', META, root=str(tmp_path)) as log:
+        log.record('000001.SZ', ['海龟交易法则'])
+    with open(journal.path('run', str(tmp_path)), 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'code': '000002.SZ', 'hits': []})[:10])
+    assert list(journal.Journal('run', META, root=str(tmp_path)).done) == ['000001.SZ']
+
+
+def test_run_id(monkeypatch):
+    monkeypatch.delenv('SEQUOIA_RUN_ID', raising=False)
+    assert journal.run_id({'run_id': 42}) == '42'
+    monkeypatch.setenv('SEQUOIA_RUN_ID', 'ci-7')
+    assert journal.run_id({'run_id': 42}) == 'ci-7'
+
+
+def rising(code, df):
+    return bool(df['close'].iloc[-1] > df['close'].iloc[0])
+
+
+def test_evaluate_parallel_reports_every_batch():
+    frames = []
+    for i in range(7):
+        closes = [10.0, 10.0 + (1 if i % 2 else -1)]
+        frames.append(('{:06d}.SZ'.format(i), pd.DataFrame({
+            'date': pd.to_datetime(['2023-01-02', '2023-01-03']),
+            'open': closes, 'high': closes, 'low': closes, 'close': closes, 'volume': [100.0, 100.0],
+        })))
+    batches = []
+    hits = work_flow.evaluate_parallel(iter(frames), processes=2, check=rising, batch_size=3,
+                                       done=lambda codes, found: batches.append((codes, found)))
+    assert sorted(code for codes, _ in batches for code in codes) == [code for code, _ in frames]
+    assert {code: hit for _, found in batches for code, hit in found.items()} == hits
+
+
+def test_process_resumes_from_journal(tmp_path, monkeypatch):
+    universe = make_universe(30, days=300, seed=5)
+    codes = sorted(universe)
+    monkeypatch.setattr(store, 'ROOT', str(tmp_path / 'history'))
+    monkeypatch.setattr(journal, 'ROOT', str(tmp_path / 'journal'))
+    monkeypatch.setattr(settings, 'top_list', frozenset(), raising=False)
+    monkeypatch.setattr(settings, 'config', {
+        'codes': codes, 'bulk_update': False, 'run_id': 'resume',
+        'strategies': ['turtle_trade.check_enter', 'keep_increasing.check'],
+    }, raising=False)
+    with installed(universe):
+        expected = work_flow.process()
+
+    # 模拟中断：日志只保留前 10 只
+    file = journal.path('resume')
+    with open(file, encoding='utf-8') as f:
+        lines = f.readlines()
+    with open(file, 'w', encoding='utf-8') as f:
+        f.writelines(lines[:11])
+    finished = {json.loads(line)['code'][:6] for line in lines[1:11]}
+
+    with installed(universe) as (akshare, _, _):
+        assert work_flow.process() == expected
+        fetched = {call[1] for call in akshare.calls}
+    assert fetched and not fetched & finished
+
+    # 续跑完成后再次运行：从头扫描全部股票
+    with installed(universe) as (akshare, _, _):
+        assert work_flow.process() == expected
+        assert len({call[1] for call in akshare.calls}) == len(codes)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+import incremental
+import market
+import offline
+import registry
+import settings
+import store
+import work_flow
+from synthetic import make_history
+
+
+def saved(root, count=12, days=120):
+    frames = {'{:06d}.SZ'.format(seed): make_history(seed, days=days - seed, limit_up_rate=0.2)
+              for seed in range(count)}
+    for code, data in frames.items():
+        store.save(code, data, root=str(root))
+    return frames
+
+
+def test_build_and_zero_copy_views(tmp_path):
+    saved(tmp_path / 'history')
+    mapped = market.build(store_root=str(tmp_path / 'history'), root=str(tmp_path / 'market'))
+    assert len(mapped) == 12
+    assert isinstance(mapped.arrays['close'].base, np.memmap)
+    assert not mapped.arrays['close'].flags.writeable
+    for code in mapped:
+        expected = store.load(code, str(tmp_path / 'history'))
+        data = mapped[code]
+        pd.testing.assert_frame_equal(data, expected)
+        assert np.shares_memory(data['close'].values, mapped.arrays['close'])
+        # 已入库的指标随行情一起映射，不再重算
+        cache = data.__dict__['_indicators']
+        for spec in incremental.SPECS:
+            np.testing.assert_array_equal(cache[spec], expected.__dict__['_indicators'][spec])
+
+
+def test_stale_codes_fall_back_and_rebuild_incrementally(tmp_path, monkeypatch):
+    history, root = str(tmp_path / 'history'), str(tmp_path / 'market')
+    frames = saved(tmp_path / 'history')
+    first = market.build(store_root=history, root=root)
+    assert market.build(store_root=history, root=root).generation == first.generation
+
+    code = '000003.SZ'
+    bar = frames[code].iloc[[-1]].copy()
+    bar['date'] = bar['date'] + pd.Timedelta(days=1)
+    store.append(code, bar, root=history)
+    loaded = dict(market.frames(list(frames), history, root))
+    assert len(loaded[code]) == len(frames[code]) + 1
+    assert all(len(loaded[c]) == len(frames[c]) for c in frames if c != code)
+
+    reads = []
+    load = store.load
+    monkeypatch.setattr(store, 'load', lambda c, r=None: reads.append(c) or load(c, r))
+    second = market.build(store_root=history, root=root)
+    assert reads == [code]
+    assert second.generation == first.generation + 1
+    assert len(second[code]) == len(frames[code]) + 1
+    # 旧一代文件已删除，只留新一代
+    assert {file.name.split('.')[0] for file in (tmp_path / 'market').glob('*.npy')} == {str(second.generation)}
+
+
+def test_offline_scan_uses_market(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'top_list', frozenset(), raising=False)
+    history, root = str(tmp_path / 'history'), str(tmp_path / 'market')
+    frames = {'{:06d}.SZ'.format(seed): make_history(seed, days=200, limit_up_rate=0.2) for seed in range(30)}
+    for code, data in frames.items():
+        store.save(code, data, root=history)
+    market.build(store_root=history, root=root)
+    monkeypatch.setattr(market, 'ROOT', root)
+    monkeypatch.setattr(store, 'load', lambda code, r=None: None)
+
+    hits = offline.scan(list(frames), root=history)
+    expected = [code for code, data in frames.items() if registry.Registry.of(work_flow.CHECKS).run(code, data)]
+    assert hits == expected
+    assert hits
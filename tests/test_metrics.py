@@ -0,0 +1,96 @@
+import functools
+import json
+
+import pandas as pd
+
+import health
+import metrics
+import registry
+import work_flow
+
+
+def test_histogram_and_prometheus_text():
+    metrics.reset()
+    for value in (0.01, 0.2, 3.0):
+        metrics.observe(metrics.FETCH_SECONDS, value, source='akshare')
+    metrics.inc(metrics.FETCH_FAILURES, source='akshare')
+    metrics.inc(metrics.FETCH_FAILURES, source='akshare')
+    metrics.set_gauge(metrics.STAGE_SECONDS, 1.5, stage='scan')
+
+    text = metrics.to_prometheus()
+    assert '# TYPE sequoia_fetch_seconds histogram' in text
+    assert 'sequoia_fetch_seconds_bucket{source="akshare",le="0.05"} 1' in text
+    assert 'sequoia_fetch_seconds_bucket{source="akshare",le="0.25"} 2' in text
+    assert 'sequoia_fetch_seconds_bucket{source="akshare",le="+Inf"} 3' in text
+    assert 'sequoia_fetch_seconds_count{source="akshare"} 3' in text
+    assert 'sequoia_fetch_failures_total{source="akshare"} 2' in text
+    assert 'sequoia_stage_seconds{stage="scan"} 1.5' in text
+
+    # 合并子进程的指标：计数器和直方图累加
+    metrics.merge(metrics.snapshot())
+    summary = metrics.summary()
+    assert summary[metrics.FETCH_FAILURES][0]['value'] == 4
+    assert summary[metrics.FETCH_SECONDS][0]['count'] == 6
+
+
+def test_fetch_history_counts_fallbacks(monkeypatch):
+    metrics.reset()
+    health.reset()
+
+    def broken(code, start_date=None):
+        raise ConnectionError('boom')
+
+    monkeypatch.setattr(work_flow, 'HISTORY_SOURCES', {
+        'akshare': broken,
+        'tushare': lambda code, start_date=None: pd.DataFrame({'close': [1.0]}),
+    })
+    for _ in range(5):
+        assert not work_flow.fetch_history('000001.SZ').empty
+    health.reset()
+
+    fallbacks = {item['labels']['reason']: item['value'] for item in metrics.summary()[metrics.FETCH_FALLBACKS]}
+    # 连续失败 3 次后熔断，之后直接跳过
+    assert fallbacks == {'error': 3, 'open': 2}
+    assert metrics.summary()[metrics.FETCH_FAILURES][0]['value'] == 3
+
+
+def test_registry_records_strategies(tmp_path):
+    metrics.reset()
+
+    def hit(code_name, data):
+        return True
+
+    def miss(code_name, data):
+        return False
+
+    for code in ('000001.SZ', '000002.SZ'):
+        assert registry.Registry.of([miss, hit]).run(code, pd.DataFrame()) == ['test_metrics.hit']
+    calls = {item['labels']['strategy']: item['value'] for item in metrics.summary()[metrics.STRATEGY_CALLS]}
+    hits = {item['labels']['strategy']: item['value'] for item in metrics.summary()[metrics.STRATEGY_HITS]}
+    assert calls == {'test_metrics.miss': 2, 'test_metrics.hit': 2}
+    assert hits == {'test_metrics.hit': 2}
+
+    metrics.write({'codes': 2}, json_file=str(tmp_path / 'metrics.json'), prom_file=str(tmp_path / 'metrics.prom'))
+    report = json.loads((tmp_path / 'metrics.json').read_text(encoding='utf-8'))
+    assert report['codes'] == 2
+    assert metrics.STRATEGY_CPU in report['metrics']
+    assert 'sequoia_strategy_calls_total{strategy="test_metrics.hit"} 2' in \
+        (tmp_path / 'metrics.prom').read_text(encoding='utf-8')
+
+
+def rising(code, df):
+    return bool(df['close'].iloc[-1] > df['close'].iloc[0])
+
+
+def test_evaluate_parallel_merges_worker_metrics():
+    metrics.reset()
+    frames = [('{:06d}.SZ'.format(i), pd.DataFrame({
+        'date': pd.to_datetime(['2023-01-02', '2023-01-03']),
+        'open': [10.0, 11.0], 'high': [10.0, 11.0], 'low': [10.0, 11.0], 'close': [10.0, 11.0],
+        'volume': [100.0, 100.0],
+    })) for i in range(6)]
+    check = functools.partial(metrics.measure, 'rising', rising)
+    hits = work_flow.evaluate_parallel(iter(frames), processes=2, check=check, batch_size=2)
+    assert len(hits) == 6
+    hits = {item['labels']['strategy']: item['value'] for item in metrics.summary()[metrics.STRATEGY_HITS]}
+    assert hits == {'rising': 6}
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+import metrics
+import offline
+import registry
+import settings
+import store
+import work_flow
+from synthetic import make_history
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_startup_skips_heavy_modules():
+    code = ("import sys, offline, main, intraday, backtest; "
+            "print(' '.join(m for m in ('akshare', 'tushare', 'talib') if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ''
+
+
+def test_scan_from_local_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'top_list', frozenset(), raising=False)
+    frames = {'{:06d}.SZ'.format(seed): make_history(seed, days=200, limit_up_rate=0.2) for seed in range(30)}
+    for code, data in frames.items():
+        store.save(code, data, root=tmp_path)
+
+    hits = offline.scan(list(frames) + ['999999.SZ'], root=tmp_path)
+    expected = [code for code, data in frames.items() if registry.Registry.of(work_flow.CHECKS).run(code, data)]
+    assert hits == expected
+    assert hits
+
+
+def test_panel_screen_matches_scan(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'top_list', frozenset(), raising=False)
+    frames = {'{:06d}.SZ'.format(seed): make_history(seed, days=200, limit_up_rate=0.2) for seed in range(30)}
+    for code, data in frames.items():
+        store.save(code, data, root=tmp_path)
+
+    selected = offline.screen(list(frames), root=tmp_path)
+    assert set(selected) == {registry.declared(check)['name'] for check, _ in offline.PANEL_CHECKS}
+    for check, _ in offline.PANEL_CHECKS:
+        name = registry.declared(check)['name']
+        assert selected[name] == offline.scan(list(frames), checks=[check], root=tmp_path)
+    assert any(selected.values())
+
+
+def broken(code_name, data):
+    raise ValueError('boom')
+
+
+def test_scan_counts_strategy_errors(tmp_path):
+    metrics.reset()
+    store.save('000001.SZ', make_history(1, days=60), root=tmp_path)
+    assert offline.scan(['000001.SZ'], checks=[broken], root=tmp_path) == []
+    assert metrics.summary()[metrics.SCAN_ERRORS][0]['value'] == 1
+
+
+def test_record_timing(tmp_path):
+    file = tmp_path / 'timing.jsonl'
+    offline.record({'startup': 0.1}, file=str(file))
+    offline.record({'startup': 0.2}, file=str(file))
+    assert len(file.read_text().splitlines()) == 2
@@ -0,0 +1,17 @@
+import pandas as pd
+
+import packed
+
+
+def test_pack_round_trip():
+    frames = {
+        '000001.SZ': pd.DataFrame({'date': pd.to_datetime(['2023-01-02', '2023-01-03']),
+                                   'open': [1.0, 2.0], 'high': [1.5, 2.5], 'low': [0.5, 1.5],
+                                   'close': [1.2, 2.2], 'volume': [10.0, 20.0]}),
+        '000002.SZ': pd.DataFrame({'date': pd.to_datetime(['2023-01-03']),
+                                   'open': [3.0], 'high': [3.5], 'low': [2.5], 'close': [3.2], 'volume': [30.0]}),
+    }
+    arrays, index = packed.pack(frames)
+    assert index == [('000001.SZ', 0, 2), ('000002.SZ', 2, 3)]
+    for code, start, stop in index:
+        pd.testing.assert_frame_equal(packed.unpack(arrays, start, stop), frames[code], check_dtype=False)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+import panel
+from strategy import climax_limitdown, keep_increasing, turtle_trade
+from synthetic import make_history
+
+CHECKS = [
+    (turtle_trade.check_enter, turtle_trade.check_enter_panel),
+    (keep_increasing.check, keep_increasing.check_panel),
+    (climax_limitdown.check, climax_limitdown.check_panel),
+]
+
+
+def make_universe(count=40):
+    rng = np.random.default_rng(0)
+    frames = {}
+    for i in range(count):
+        data = make_history(i, days=int(rng.integers(20, 300)), start='2021-01-04' if i % 3 else '2020-06-01')
+        if i % 4 == 0:
+            # 放量跌停
+            k = len(data) - int(rng.integers(1, min(len(data), 100)))
+            data.loc[k, 'close'] = round(data.loc[k - 1, 'close'] * 0.9, 2)
+            data.loc[k, 'volume'] *= 10
+        # 随机停牌
+        frames['{:06d}.SZ'.format(i)] = data.loc[rng.random(len(data)) > 0.05].reset_index(drop=True)
+    return frames
+
+
+def test_panel_alignment():
+    frames = make_universe(5)
+    p = panel.build(frames)
+    assert p.fields['close'].shape == (len(p.dates), 5)
+    for j, code in enumerate(p.codes):
+        # 停牌日为 NaN，右对齐后末尾即该股票最后几根 K 线
+        assert np.count_nonzero(~np.isnan(p.fields['close'][:, j])) == len(frames[code])
+        np.testing.assert_array_equal(p.tail('close')[-10:, j], frames[code]['close'].values[-10:])
+
+
+def test_panel_matches_per_stock_checks():
+    frames = make_universe()
+    p = panel.build(frames)
+    hits = {check: 0 for check, _ in CHECKS}
+    for end_date in [None] + list(pd.bdate_range('2021-03-01', '2021-12-31', freq='7B').strftime('%Y-%m-%d')):
+        for check, check_panel in CHECKS:
+            vectorized = check_panel(p, end_date=end_date)
+            for j, code in enumerate(p.codes):
+                data = frames[code]
+                if end_date is not None and (data['date'] <= end_date).sum() == 0:
+                    continue
+                expected = check(code, data, end_date=end_date) is True
+                assert vectorized[j] == expected, (check.__module__, code, end_date)
+                hits[check] += expected
+    assert all(hits.values())
@@ -0,0 +1,64 @@
+import functools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+import settings
+import work_flow
+from strategy import climax_limitdown, enter, high_tight_flag, turtle_trade
+from synthetic import make_history
+
+CHECKS = [enter.check_volume, enter.check_breakthrough, climax_limitdown.check, high_tight_flag.check]
+
+
+def quotes_of(frames):
+    """用每只股票最后一根 K 线模拟行情快照"""
+    rows = []
+    for code, data in frames.items():
+        rows.append({'code': code, 'open': float(data['open'].iloc[-1]), 'close': float(data['close'].iloc[-1]),
+                     'volume': float(data['volume'].iloc[-1]), 'p_change': indicators.p_change(data)[-1]})
+    return pd.DataFrame(rows)
+
+
+@functools.lru_cache()
+def universe():
+    frames = {}
+    for seed in range(300):
+        data = make_history(seed, days=120, limit_up_rate=0.1)
+        if seed % 5 == 0:
+            # 放量跌停
+            data.loc[len(data) - 1, 'close'] = np.float32(round(float(data['close'].iloc[-2]) * 0.9, 2))
+            data.loc[len(data) - 1, 'volume'] *= 20
+        frames['{:06d}.SZ'.format(seed)] = data
+    return frames
+
+
+@pytest.mark.parametrize('check', CHECKS, ids=[c.__module__ + '.' + c.__name__ for c in CHECKS])
+def test_prefilter_is_necessary_condition(monkeypatch, check):
+    frames = universe()
+    monkeypatch.setattr(settings, 'top_list', [code[:6] for code in list(frames)[::2]], raising=False)
+    candidates = set(work_flow.prefilter(list(frames), [check], quotes=quotes_of(frames)))
+
+    hits = {code for code, data in frames.items() if check((code[:6], code), data) is True}
+    assert hits
+    assert hits <= candidates
+    # 预筛确实排除了大部分股票
+    assert len(candidates) < len(frames) * 0.6
+
+
+def test_prefilter_keeps_everything_without_predicates():
+    frames = universe()
+    codes = list(frames)
+    quotes = quotes_of(frames)
+    assert work_flow.prefilter(codes, [turtle_trade.check_enter], quotes=quotes) == codes
+    assert work_flow.prefilter(codes, [climax_limitdown.check, turtle_trade.check_enter], quotes=quotes) == codes
+
+
+def test_prefilter_keeps_codes_missing_from_snapshot():
+    frames = universe()
+    codes = list(frames)
+    quotes = quotes_of(frames).iloc[10:]
+    candidates = work_flow.prefilter(codes, [climax_limitdown.check], quotes=quotes)
+    assert codes[:10] == candidates[:10]
@@ -1,5 +1,9 @@
+import time
 import unittest
 
+import requests
+
+import push as push_module
 import settings
 from push import push
 from push import strategy
@@ -23,3 +27,43 @@ current_time = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
 log_filename = 'logs/test-push-{}.log'.format(current_time)
 logging.basicConfig(format='%(asctime)s %(message)s', filename=log_filename)
 logging.getLogger().setLevel(logging.INFO)
+
+
+def test_digest_groups_hits_by_strategy(monkeypatch):
+    sent = []
+    monkeypatch.setattr(push_module, 'send', lambda msg, title=push_module.TITLE: sent.append(msg) or True)
+    push_module.hits({'600000.SH': ['均线多头'], '000001.SZ': ['海龟交易法则', '均线多头']})
+    push_module.hits({'000002.SZ': ['均线多头']})
+    strategy("龙虎榜 <3 只>")
+    assert push_module.flush(missing=[2]).result(timeout=5)
+    text = sent[0]
+    assert '共选中 3 只' in text
+    # 命中多的策略在前，每个策略一段
+    assert text.index('均线多头 (3)') < text.index('海龟交易法则 (1)')
+    assert '000001.SZ、000002.SZ、600000.SH' in text
+    assert '龙虎榜 &lt;3 只&gt;' in text and '缺少分片 2' in text
+    # 已发送的内容清空
+    assert push_module.flush().result(timeout=5)
+    assert '今日无符合条件的股票' in sent[1]
+
+
+def test_push_is_asynchronous(monkeypatch):
+    monkeypatch.setattr(push_module, 'send', lambda msg, title=push_module.TITLE: time.sleep(0.5) or True)
+    started = time.perf_counter()
+    future = push_module.push('慢')
+    assert time.perf_counter() - started < 0.1
+    assert future.result(timeout=5)
+
+
+def test_send_retries_are_bounded(monkeypatch):
+    calls = []
+
+    def post(url, json=None, timeout=None):
+        calls.append(timeout)
+        raise requests.ConnectionError('down')
+
+    monkeypatch.setattr(settings, 'config', {'push': {'enable': True, 'pushplus_token': 'token'}}, raising=False)
+    monkeypatch.setattr(push_module.requests, 'post', post)
+    monkeypatch.setattr(push_module, 'BACKOFF', 0)
+    assert push_module.send('内容') is False
+    assert calls == [push_module.TIMEOUT] * push_module.RETRIES
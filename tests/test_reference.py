@@ -0,0 +1,59 @@
+import os
+import time
+
+import pandas as pd
+
+import reference
+
+
+def use_tmp(monkeypatch, tmp_path):
+    monkeypatch.setattr(reference, 'STOCK_CODES', str(tmp_path / 'stock_codes.txt'))
+    monkeypatch.setattr(reference, 'STOCK_INFO', str(tmp_path / 'stock_info.csv'))
+    monkeypatch.setattr(reference, 'TOP_LIST', str(tmp_path / 'data' / 'top_list.txt'))
+
+
+def test_universe_cached_until_expired(monkeypatch, tmp_path):
+    use_tmp(monkeypatch, tmp_path)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return pd.DataFrame({'code': ['600000.SH', '000001.SZ'], 'name': ['浦发银行', '平安银行'],
+                             'list_date': ['19991110', '19910403']})
+
+    monkeypatch.setattr(reference, '_fetch_universe', fetch)
+    assert reference.codes() == ['000001.SZ', '600000.SH']
+    assert reference.names()['000001.SZ'] == '平安银行'
+    assert reference.universe().set_index('code').loc['600000.SH', 'list_date'] == '19991110'
+    assert len(calls) == 1
+    # 与 stock_codes.txt 放在一起，代码列表同步更新
+    assert open(reference.STOCK_CODES).read().split() == ['000001.SZ', '600000.SH']
+
+    # 过期后重新拉取
+    old = time.time() - reference.UNIVERSE_TTL - 1
+    os.utime(reference.STOCK_INFO, (old, old))
+    reference.codes()
+    assert len(calls) == 2
+
+
+def test_stale_cache_used_when_offline(monkeypatch, tmp_path):
+    use_tmp(monkeypatch, tmp_path)
+    monkeypatch.setattr(reference, '_fetch_top_list', lambda: ['000001', '600000'])
+    assert reference.top_list() == {'000001', '600000'}
+
+    def offline():
+        raise ConnectionError('offline')
+
+    monkeypatch.setattr(reference, '_fetch_top_list', offline)
+    old = time.time() - reference.TOP_LIST_TTL - 1
+    os.utime(reference.TOP_LIST, (old, old))
+    top_list = reference.top_list()
+    assert isinstance(top_list, frozenset)
+    assert '000001' in top_list
+
+
+def test_legacy_code_list(monkeypatch, tmp_path):
+    use_tmp(monkeypatch, tmp_path)
+    (tmp_path / 'stock_codes.txt').write_text('600519.SH\n000858.SZ\n')
+    monkeypatch.setattr(reference, '_fetch_universe', lambda: None)
+    assert reference.codes() == ['000858.SZ', '600519.SH']
@@ -0,0 +1,114 @@
+import importlib
+
+import pytest
+
+import journal
+import metrics
+import registry
+import settings
+import snapshot
+import store
+import work_flow
+from fake_sources import installed
+from strategy import climax_limitdown, enter, turtle_trade
+from synthetic import make_history, make_universe
+
+MODULES = ['backtrace_ma250', 'breakthrough_platform', 'climax_limitdown', 'enter', 'high_tight_flag',
+           'keep_increasing', 'low_atr', 'low_backtrace_increase', 'parking_apron', 'turtle_trade']
+
+
+def declared():
+    for module in MODULES:
+        for name in importlib.import_module('strategy.' + module).REQUIREMENTS:
+            yield '{}.{}'.format(module, name)
+
+
+@pytest.mark.parametrize('name', list(declared()))
+def test_min_history_is_safe(monkeypatch, name):
+    # 短于声明的最少 K 线数时，检查函数必然不命中，注册表可以不调用
+    strategy = registry.Strategy.of(registry.resolve(name))
+    monkeypatch.setattr(settings, 'top_list', frozenset(['000001']), raising=False)
+    if strategy.min_history <= 1:
+        return
+    for seed in range(20):
+        data = make_history(seed, days=strategy.min_history - 1, limit_up_rate=0.3)
+        assert strategy.check(('000001', '测试'), data) is not True
+
+
+def test_schedule_cheapest_first_and_gates_short_circuit(monkeypatch):
+    monkeypatch.setattr(settings, 'top_list', frozenset(), raising=False)
+    strategies = registry.load({
+        'gates': {'listed_days': 120, 'turnover': 0},
+        'strategies': ['climax_limitdown.check', {'check': 'turtle_trade.check_enter', 'name': '新高'},
+                       'high_tight_flag.check'],
+    })
+    assert [s.key for s in strategies.strategies] == \
+        ['high_tight_flag.check', 'turtle_trade.check_enter', 'climax_limitdown.check']
+    assert [g.name for g in strategies.gates] == ['listed_days']
+
+    metrics.reset()
+    # 上市不足 120 天：门槛不通过，之后的策略一个都不调用
+    assert strategies.run('000001.SZ', make_history(0, days=100)) == []
+    calls = {item['labels']['strategy']: item['value'] for item in metrics.summary()[metrics.STRATEGY_CALLS]}
+    assert calls == {'gate.listed_days': 1}
+
+    # 比所有策略要求的都短：门槛也不检查
+    metrics.reset()
+    assert strategies.run('000001.SZ', make_history(0, days=10)) == []
+    assert metrics.STRATEGY_CALLS not in metrics.summary()
+
+
+def test_run_matches_checks(monkeypatch):
+    monkeypatch.setattr(settings, 'top_list', frozenset(), raising=False)
+    checks = [turtle_trade.check_enter, enter.check_volume, climax_limitdown.check, enter.check_breakthrough]
+    strategies = registry.Registry.of(checks)
+    names = {check: registry.declared(check)['name'] for check in checks}
+    hits = 0
+    for code, data in make_universe(80, days=200, seed=3).items():
+        expected = {names[check] for check in checks if check((code[:6], code), data) is True}
+        assert set(strategies.run(code, data)) == expected
+        hits += bool(expected)
+    assert hits
+
+
+def test_gate_prefilter_and_unknown_entries():
+    strategies = registry.load({'gates': {'turnover': 100000000, 'listed_days': 60}},
+                               default=[turtle_trade.check_enter])
+    assert [s.key for s in strategies.strategies] == ['turtle_trade.check_enter']
+    # 只有成交额门槛可以按快照预筛，且是必要条件
+    assert len(strategies.prefilters()) == 1
+    universe = make_universe(100, days=80, seed=7)
+    with installed(universe):
+        quotes = snapshot.fetch(list(universe))
+    candidates = set(work_flow.prefilter(list(universe), strategies.checks, quotes=quotes,
+                                         gates=strategies.prefilters()))
+    turnover = next(gate for gate in strategies.gates if gate.name == 'turnover')
+    passed = {code for code, data in universe.items() if turnover.run((code[:6], code), data)}
+    assert passed <= candidates < set(universe)
+    with pytest.raises(ValueError):
+        registry.load({'strategies': ['enter.check_nothing']})
+    with pytest.raises(ValueError):
+        registry.load({'gates': {'market_cap': 1}})
+
+
+def test_process_uses_config_registry(tmp_path, monkeypatch):
+    universe = make_universe(40, days=300, seed=5)
+    monkeypatch.setattr(store, 'ROOT', str(tmp_path))
+    monkeypatch.setattr(journal, 'ROOT', str(tmp_path / 'journal'))
+    monkeypatch.setattr(settings, 'top_list', frozenset(), raising=False)
+    monkeypatch.setattr(settings, 'config', {
+        'codes': sorted(universe), 'bulk_update': False,
+        'gates': {'listed_days': 60},
+        'strategies': ['turtle_trade.check_enter', 'keep_increasing.check'],
+    }, raising=False)
+    with installed(universe):
+        results = work_flow.process()
+    expected = {}
+    for code, data in universe.items():
+        hits = [name for name, check in (('海龟交易法则', turtle_trade.check_enter),
+                                          ('均线多头', registry.resolve('keep_increasing.check')))
+                if len(data) >= 60 and check((code[:6], code), data) is True]
+        if hits:
+            expected[code] = hits
+    assert results == expected
+    assert results
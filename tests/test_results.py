@@ -0,0 +1,79 @@
+import datetime
+import sqlite3
+
+import metrics
+import results
+import store
+from synthetic import make_history
+
+
+def test_features_of_last_bar():
+    data = make_history(0, days=30)
+    info = results.features(data)
+    close = float(data['close'].iloc[-1])
+    assert info['date'] == data['date'].iloc[-1].strftime('%Y-%m-%d')
+    assert info['close'] == close
+    assert abs(info['p_change'] - (close / float(data['close'].iloc[-2]) - 1) * 100) < 1e-3
+    ma5 = float(data['volume'].iloc[-6:-1].mean())
+    assert abs(info['vol_ratio'] - float(data['volume'].iloc[-1]) / ma5) < 1e-6
+    assert results.features(None) == {}
+
+
+def test_save_run_keeps_history_and_replaces_same_run(tmp_path, monkeypatch):
+    file = str(tmp_path / 'stock.db')
+    today = datetime.date.today()
+    monkeypatch.setattr(store, 'ROOT', str(tmp_path / 'history'))
+    data = make_history(1, days=40)
+    store.save('000001.SZ', data)
+
+    metrics.reset()
+    metrics.set_gauge(metrics.STAGE_SECONDS, 1.5, stage='scan')
+    metrics.inc(metrics.STRATEGY_CPU, 0.2, strategy='enter.check_volume')
+    metrics.inc(metrics.STRATEGY_CALLS, 10, strategy='enter.check_volume')
+    metrics.observe(metrics.FETCH_SECONDS, 0.3, source='akshare')
+    results.save_run('day1', {'000001.SZ': ['放量上涨', '海龟交易法则']}, codes=100, file=file)
+    # 没有本地历史的股票：指标为空，日期取本次运行的交易日
+    day2 = {'600000.SH': ['海龟交易法则']}
+    signals = {'600000.SH': {'date': today.strftime('%Y-%m-%d'), 'close': 9.5}}
+    results.save_run('day2', day2, codes=100, signals=signals, file=file)
+    results.save_run('day2', day2, codes=120, signals=signals, timings=[], file=file)
+
+    history = results.runs(file=file)
+    assert list(history['run_id']) == ['day2', 'day1']
+    assert list(history['codes']) == [120, 100]
+
+    signals = results.recent(days=3650, file=file)
+    assert sorted(zip(signals['code'], signals['strategy'])) == \
+        [('000001.SZ', '放量上涨'), ('000001.SZ', '海龟交易法则'), ('600000.SH', '海龟交易法则')]
+    first = signals[signals['code'] == '000001.SZ'].iloc[0]
+    assert first['date'] == data['date'].iloc[-1].strftime('%Y-%m-%d')
+    assert first['close'] == float(data['close'].iloc[-1])
+    assert list(results.recent(days=3650, strategy='放量上涨', file=file)['code']) == ['000001.SZ']
+
+    timings = results.timings('day1', file=file)
+    assert set(zip(timings['kind'], timings['name'])) == \
+        {('stage', 'scan'), ('strategy', 'enter.check_volume'), ('fetch', 'akshare')}
+    assert timings.set_index('name').loc['enter.check_volume', 'count'] == 10
+    assert results.timings(file=file).empty
+
+
+def test_recurrence(tmp_path):
+    file = str(tmp_path / 'stock.db')
+    today = datetime.date.today()
+    for offset in range(3):
+        date = (today - datetime.timedelta(days=offset)).strftime('%Y-%m-%d')
+        selected = {'000001.SZ': ['均线多头'], '000002.SZ': ['均线多头'] if offset == 0 else ['突破新高']}
+        results.save_run('run{}'.format(offset), selected, timings=[], file=file,
+                         signals={code: {'date': date} for code in selected})
+    recurring = results.recurrence(days=10, file=file)
+    assert list(zip(recurring['code'], recurring['strategy'], recurring['days'])) == \
+        [('000001.SZ', '均线多头', 3), ('000002.SZ', '突破新高', 2)]
+
+
+def test_legacy_text_file_is_kept(tmp_path):
+    file = tmp_path / 'stock.db'
+    file.write_text('000001.SZ\n600000.SH')
+    results.save_run('run', {}, timings=[], file=str(file))
+    assert (tmp_path / 'stock.db.txt').read_text() == '000001.SZ\n600000.SH'
+    with sqlite3.connect(str(file)) as conn:
+        assert conn.execute('SELECT selected FROM runs').fetchone() == (0,)
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+import health
+import metrics
+import results
+import settings
+import shard
+import work_flow
+from fake_sources import installed
+from synthetic import make_universe
+
+
+def test_partition_is_deterministic_and_complete():
+    codes = ['{:06d}.SZ'.format(i) for i in range(500)] + ['{:06d}.SH'.format(600000 + i) for i in range(500)]
+    parts = [shard.partition(codes, index, 4) for index in range(4)]
+    assert sorted(code for part in parts for code in part) == sorted(codes)
+    assert all(150 < len(part) < 350 for part in parts)
+    # 与名单顺序无关，保持原有顺序
+    assert shard.partition(codes[::-1], 1, 4) == parts[1][::-1]
+    assert shard.partition(codes, 0, 1) == codes
+
+
+def test_parse():
+    assert shard.parse('2/4') == (2, 4)
+    for text in ('4/4', '-1/4', '0/0', '1', 'a/b'):
+        with pytest.raises(ValueError):
+            shard.parse(text)
+
+
+def test_shards_merge_to_single_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    universe = make_universe(40, days=300, seed=11)
+    config = {'codes': sorted(universe), 'bulk_update': False, 'run_id': 'day',
+              'strategies': ['turtle_trade.check_enter', 'keep_increasing.check']}
+    monkeypatch.setattr(settings, 'top_list', frozenset(), raising=False)
+
+    with installed(universe):
+        monkeypatch.setattr(settings, 'config', dict(config, journal=False), raising=False)
+        expected = work_flow.process()
+        for index in range(3):
+            metrics.reset()
+            health.reset()
+            monkeypatch.setattr(settings, 'config', dict(config), raising=False)
+            work_flow.prepare_shard(index, 3)
+            assert settings.config['codes'] == shard.partition(sorted(universe), index, 3)
+            # 各片的扫描日志互不覆盖
+            assert os.path.exists(os.path.join('data', 'journal', 'day.{}-of-3.jsonl'.format(index)))
+
+    assert expected
+    metrics.reset()
+    monkeypatch.setattr(settings, 'config', dict(config), raising=False)
+    work_flow.merge(3)
+    run = results.runs().iloc[0]
+    assert (run['run_id'], run['codes'], run['selected']) == ('day', 40, len(expected))
+    signals = results.recent(days=3650)
+    assert sorted(zip(signals['code'], signals['strategy'])) == \
+        sorted((code, name) for code, hits in expected.items() for name in hits)
+    assert signals['close'].notna().all()
+    calls = sum(item['value'] for item in metrics.summary()[metrics.STRATEGY_CALLS])
+    assert calls >= 40
+
+    # 缺少一片时只汇总已完成的分片
+    os.remove(shard.path('day', 1, 3))
+    merged = shard.merge('day', 3)
+    assert merged['missing'] == [1]
+    assert set(merged['selected']) == {code for code in expected if shard.owner(code, 3) != 1}
+
@@ -0,0 +1,59 @@
+import pytest
+
+import settings
+from strategy import backtrace_ma250, breakthrough_platform, climax_limitdown, enter, high_tight_flag, \
+    keep_increasing, low_atr, low_backtrace_increase, parking_apron, turtle_trade
+from synthetic import make_backtrace_history, make_history
+
+CODE_NAME = ('000001', '测试')
+
+PAIRS = [
+    (turtle_trade.check_enter, turtle_trade.check_enter_signals),
+    (enter.check_breakthrough, enter.check_breakthrough_signals),
+    (enter.check_ma, enter.check_ma_signals),
+    (enter.check_new, enter.check_new_signals),
+    (enter.check_turnover, enter.check_turnover_signals),
+    (enter.check_volume, enter.check_volume_signals),
+    (enter.check_continuous_volume, enter.check_continuous_volume_signals),
+    (keep_increasing.check, keep_increasing.check_signals),
+    (climax_limitdown.check, climax_limitdown.check_signals),
+    (low_backtrace_increase.check, low_backtrace_increase.check_signals),
+    (high_tight_flag.check, high_tight_flag.check_signals),
+    (low_atr.check_low_increase, low_atr.check_low_increase_signals),
+    (parking_apron.check, parking_apron.check_signals),
+    (breakthrough_platform.check, breakthrough_platform.check_signals),
+    (backtrace_ma250.check, backtrace_ma250.check_signals),
+]
+
+
+def histories():
+    frames = [make_history(seed) for seed in range(8)]
+    frames += [make_history(seed, limit_up_rate=0.6) for seed in range(3)]
+    frames += [make_backtrace_history(seed) for seed in range(2)]
+    frames += [make_history(seed, days=days) for seed, days in enumerate((40, 70))]
+    # 日期为字符串的数据 (旧格式)
+    data = make_history(100)
+    data['date'] = data['date'].dt.strftime('%Y-%m-%d')
+    frames.append(data)
+    return frames
+
+
+def expected(check, data, end_date):
+    try:
+        return check(CODE_NAME, data, end_date=end_date) is True
+    except IndexError:
+        # keep_increasing 在截至日样本不足 threshold 时会越界，信号序列按不成立处理
+        return False
+
+
+@pytest.mark.parametrize('check, check_signals', PAIRS, ids=[s.__module__ + '.' + s.__name__ for _, s in PAIRS])
+def test_signals_match_check_on_every_date(monkeypatch, check, check_signals):
+    monkeypatch.setattr(settings, 'top_list', [CODE_NAME[0]], raising=False)
+    hits = 0
+    for data in histories():
+        signals = check_signals(CODE_NAME, data)
+        assert len(signals) == len(data)
+        for t, end_date in enumerate(data['date'].values):
+            assert signals[t] == expected(check, data, end_date), end_date
+        hits += signals.sum()
+    assert hits > 0
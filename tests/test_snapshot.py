@@ -0,0 +1,52 @@
+import pandas as pd
+
+import bars
+import health
+import snapshot
+
+
+def quote(symbol, name, open_, pre_close, price, volume, date='2023-01-04'):
+    fields = [name, open_, pre_close, price, price + 0.1, open_ - 0.1, price, price, volume, volume * price] \
+        + ['0'] * 20 + [date, '15:00:00', '00']
+    return 'var hq_str_{}="{}";\n'.format(symbol, ','.join(str(f) for f in fields))
+
+
+class FakeSession:
+
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        symbols = url[len(snapshot.URL):].split(',')
+        text = ''.join(quote(s, '测试', 10.0, 10.0, 10.0 + int(s[2:]) % 10 / 10, 100000) for s in symbols)
+        return type('Response', (), {'text': text, 'raise_for_status': lambda self: None})()
+
+
+def test_parse_in_bulk():
+    text = quote('sz000001', '平安银行', 10.0, 9.9, 10.5, 1234500) \
+        + quote('sh600000', '浦发银行', 0.0, 7.0, 0.0, 0) \
+        + 'var hq_str_sz999999="";\n'
+    data = snapshot.parse(text)
+    # 未知代码和停牌 (开盘价为 0) 不在结果中
+    assert list(data['code']) == ['000001.SZ']
+    row = data.iloc[0]
+    assert row['volume'] == 12345
+    assert row['date'] == pd.Timestamp('2023-01-04')
+    assert abs(row['p_change'] - (10.5 / 9.9 - 1) * 100) < 1e-9
+
+    result = bars.from_sina(data)
+    assert bars.is_canonical(result)
+    assert result['volume'].iloc[0] == 12345
+
+
+def test_fetch_batches_symbols(monkeypatch):
+    health.reset()
+    session = FakeSession()
+    monkeypatch.setattr(snapshot, 'session', lambda: session)
+    codes = ['{:06d}.SZ'.format(i) for i in range(1, 1201)] + ['600000.SH', 'BAD']
+
+    data = snapshot.fetch(codes, batch_size=500)
+    assert len(session.urls) == 3
+    assert len(data) == 1201
+    assert set(data['code']) == set(codes[:-1])
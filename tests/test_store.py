@@ -0,0 +1,172 @@
+import datetime
+
+import pandas as pd
+
+import store
+
+
+def make_bars(start, days, close=10.0):
+    dates = pd.bdate_range(start, periods=days)
+    closes = [close + i * 0.1 for i in range(days)]
+    return pd.DataFrame({
+        'date': dates,
+        'open': closes,
+        'high': [c + 0.2 for c in closes],
+        'low': [c - 0.2 for c in closes],
+        'close': closes,
+        'volume': [1000.0] * days,
+    })
+
+
+def test_save_and_append(tmp_path):
+    bars = make_bars('2023-01-02', 10)
+    store.save('000001.SZ', bars.head(6), root=tmp_path)
+    assert store.last_date('000001.SZ', root=tmp_path) == bars['date'].iloc[5]
+
+    # 重叠部分不会重复写入
+    appended = store.append('000001.SZ', bars.iloc[4:], root=tmp_path)
+    assert len(appended) == 4
+
+    data = store.load('000001.SZ', root=tmp_path)
+    assert len(data) == 10
+    assert list(data['close']) == list(bars['close'].astype('float32'))
+
+
+def test_update_fetches_only_tail(tmp_path):
+    bars = make_bars('2023-01-02', 10)
+    store.save('000001.SZ', bars.head(6), root=tmp_path)
+
+    calls = []
+
+    def fetch(start_date):
+        calls.append(start_date)
+        if start_date is None:
+            return bars
+        return bars.loc[bars['date'] >= start_date]
+
+    data = store.update('000001.SZ', fetch, root=tmp_path)
+    # 与库中最后 OVERLAP 根重叠，用于校验复权是否一致
+    assert calls == [bars['date'].iloc[max(0, 6 - store.OVERLAP)]]
+    assert len(data) == 10
+    assert len(store.load('000001.SZ', root=tmp_path)) == 10
+
+
+def test_update_rebuilds_on_adjustment_change(tmp_path):
+    bars = make_bars('2023-01-02', 10)
+    store.save('000001.SZ', bars.head(6), root=tmp_path)
+
+    # 除权后前复权价格整体变化
+    adjusted = bars.copy()
+    adjusted[['open', 'high', 'low', 'close']] *= 0.9
+    calls = []
+
+    def fetch(start_date):
+        calls.append(start_date)
+        if start_date is None:
+            return adjusted
+        return adjusted.loc[adjusted['date'] >= start_date]
+
+    data = store.update('000001.SZ', fetch, root=tmp_path)
+    assert calls[-1] is None
+    assert list(data['close']) == list(adjusted['close'].astype('float32'))
+
+
+def test_update_rebuilds_only_from_adjusted_source(tmp_path):
+    bars = make_bars('2023-01-02', 10)
+    store.save('000001.SZ', bars.head(6), root=tmp_path)
+
+    # 增量数据来自未复权的数据源，与库中前复权价格对不上
+    unadjusted = bars.copy()
+    unadjusted[['open', 'high', 'low', 'close']] *= 1.1
+    calls = []
+
+    def fetch(start_date):
+        calls.append(start_date)
+        return unadjusted.loc[unadjusted['date'] >= start_date] if start_date is not None else unadjusted
+
+    # 前复权的数据源不可用：不覆盖库中历史，下次再试
+    data = store.update('000001.SZ', fetch, root=tmp_path, rebuild=lambda: None)
+    assert None not in calls
+    assert list(data['close']) == list(bars.head(6)['close'].astype('float32'))
+    assert len(store.load('000001.SZ', root=tmp_path)) == 6
+
+    adjusted = bars.copy()
+    adjusted[['open', 'high', 'low', 'close']] *= 0.9
+    data = store.update('000001.SZ', fetch, root=tmp_path, rebuild=lambda: adjusted)
+    assert None not in calls
+    assert list(data['close']) == list(adjusted['close'].astype('float32'))
+
+
+def test_update_detects_unadjusted_tail_across_ex_dividend(tmp_path):
+    bars = make_bars('2023-01-02', 10)
+    store.save('000001.SZ', bars.head(6), root=tmp_path)
+
+    # 第 7 天除权：未复权的数据源补上的尾部在除权日之后价格整体下移，库中最后一根仍然一致
+    unadjusted = bars.copy()
+    unadjusted.loc[6:, ['open', 'high', 'low', 'close']] *= 0.9
+    store.update('000001.SZ', lambda start: unadjusted.loc[unadjusted['date'] >= start].head(8), root=tmp_path)
+    assert len(store.load('000001.SZ', root=tmp_path)) == 8
+
+    # 前复权的数据源：除权日之前的价格同比例调整，除权日之后与未复权相同
+    adjusted = bars.copy()
+    adjusted[['open', 'high', 'low', 'close']] *= 0.9
+    calls = []
+
+    def fetch(start_date):
+        calls.append(start_date)
+        return adjusted if start_date is None else adjusted.loc[adjusted['date'] >= start_date]
+
+    data = store.update('000001.SZ', fetch, root=tmp_path)
+    assert calls[-1] is None
+    assert list(data['close']) == list(adjusted['close'].astype('float32'))
+
+
+def test_update_first_save_only_from_adjusted_source(tmp_path):
+    bars = make_bars('2023-01-02', 10)
+    unadjusted = bars.tail(4)
+
+    def fetch(start_date):
+        return unadjusted if start_date is None else unadjusted.loc[unadjusted['date'] >= start_date]
+
+    # 前复权的数据源不可用：本次使用未复权的数据，不入库
+    data = store.update('000001.SZ', fetch, root=tmp_path, rebuild=lambda: None)
+    assert len(data) == 4
+    assert store.load('000001.SZ', root=tmp_path) is None
+
+    data = store.update('000001.SZ', fetch, root=tmp_path, rebuild=lambda: bars)
+    assert len(data) == 10
+    assert len(store.load('000001.SZ', root=tmp_path)) == 10
+
+
+def test_update_falls_back_to_store(tmp_path):
+    bars = make_bars('2023-01-02', 6)
+    store.save('000001.SZ', bars, root=tmp_path)
+
+    def fetch(start_date):
+        raise ConnectionError('offline')
+
+    data = store.update('000001.SZ', fetch, root=tmp_path)
+    assert len(data) == 6
+
+
+def test_update_skips_network_when_fresh(tmp_path):
+    bars = make_bars(datetime.date.today(), 1)
+    store.save('000001.SZ', bars, root=tmp_path)
+
+    def fetch(start_date):
+        raise AssertionError('should not hit the network')
+
+    assert len(store.update('000001.SZ', fetch, root=tmp_path)) == 1
+
+
+def test_append_migrates_float64_partition(tmp_path):
+    bars = make_bars('2023-01-02', 10)
+    # 旧版本按 float64 入库
+    file = store.path('000001.SZ', root=tmp_path)
+    bars.head(6).to_hdf(file, key=store.KEY, mode='w', format='table', index=False)
+
+    assert store.load('000001.SZ', root=tmp_path)['close'].dtype == 'float32'
+    store.append('000001.SZ', bars.iloc[4:], root=tmp_path)
+    data = store.load('000001.SZ', root=tmp_path)
+    assert len(data) == 10
+    assert list(data['volume']) == [1000] * 10
@@ -0,0 +1,81 @@
+import glob
+import os
+
+import pytest
+
+import legacy_strategy as legacy
+import store
+from strategy import backtrace_ma250, breakthrough_platform, enter, low_atr, low_backtrace_increase, \
+    parking_apron, turtle_trade
+from synthetic import make_backtrace_history, make_history, to_legacy
+
+CODE_NAME = ('000001', '测试')
+
+PAIRS = [
+    (turtle_trade.check_enter, legacy.turtle_trade_check_enter),
+    (enter.check_breakthrough, legacy.enter_check_breakthrough),
+    (enter.check_continuous_volume, legacy.enter_check_continuous_volume),
+    (backtrace_ma250.check, legacy.backtrace_ma250_check),
+    (breakthrough_platform.check, legacy.breakthrough_platform_check),
+    (low_atr.check_low_increase, legacy.low_atr_check_low_increase),
+    (parking_apron.check, legacy.parking_apron_check),
+    (low_backtrace_increase.check, legacy.low_backtrace_increase_check),
+]
+
+
+def synthetic_histories():
+    frames = [make_history(seed) for seed in range(20)]
+    frames += [make_history(seed, limit_up_rate=0.6) for seed in range(5)]
+    frames += [make_backtrace_history(seed) for seed in range(5)]
+    # 上市不久
+    frames += [make_history(seed, days=40) for seed in range(3)]
+    return frames
+
+
+def recorded_histories():
+    # 本地行情库中已有的真实数据
+    frames = []
+    for file in sorted(glob.glob(os.path.join(store.ROOT, '*.h5')))[:20]:
+        data = store.load(os.path.basename(file)[:-3])
+        if data is None or data.empty:
+            continue
+        frames.append(data)
+    return frames
+
+
+def assert_equivalent(vectorized, reference, frames):
+    hits = 0
+    for data in frames:
+        legacy_data = to_legacy(data)
+        for end_date in list(legacy_data['日期'].values[-100::5]) + [None]:
+            expected = reference(CODE_NAME, legacy_data.copy(), end_date)
+            assert vectorized(CODE_NAME, data.copy(), end_date) is expected, end_date
+            hits += expected is True
+    return hits
+
+
+@pytest.mark.parametrize('vectorized, reference', PAIRS, ids=[v.__module__ + '.' + v.__name__ for v, _ in PAIRS])
+def test_equivalent_on_synthetic_data(vectorized, reference):
+    # 样本中必须有命中，否则比较没有意义
+    assert assert_equivalent(vectorized, reference, synthetic_histories()) > 0
+
+
+@pytest.mark.parametrize('vectorized, reference', PAIRS, ids=[v.__module__ + '.' + v.__name__ for v, _ in PAIRS])
+def test_equivalent_on_recorded_data(vectorized, reference):
+    frames = recorded_histories()
+    if not frames:
+        pytest.skip('本地行情库为空')
+    assert_equivalent(vectorized, reference, frames)
+
+
+def test_no_nested_rescan(monkeypatch):
+    # 内层改为查预先算好的逐日序列，不再逐行回调整段历史的检查
+    def fail(*args, **kwargs):
+        raise AssertionError('nested full-history check')
+
+    monkeypatch.setattr(enter, 'check_volume', fail)
+    monkeypatch.setattr(turtle_trade, 'check_enter', fail)
+    data = make_history(3)
+    for end_date in data['date'].values[-100::5]:
+        breakthrough_platform.check(CODE_NAME, data, end_date)
+        parking_apron.check(CODE_NAME, data, end_date)
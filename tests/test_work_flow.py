@@ -0,0 +1,95 @@
+import multiprocessing
+import threading
+import time
+
+import pandas as pd
+
+import metrics
+import settings
+import work_flow
+
+
+def test_fetch_all_is_concurrent_and_bounded(monkeypatch):
+    lock = threading.Lock()
+    state = {'running': 0, 'peak': 0}
+
+    def fake_fetch(code):
+        with lock:
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+        time.sleep(0.01)
+        with lock:
+            state['running'] -= 1
+        return pd.DataFrame({'close': [float(code[:6])]})
+
+    monkeypatch.setattr(work_flow, 'fetch_data_robust', fake_fetch)
+    monkeypatch.setattr(work_flow, 'workers', lambda: {'akshare': 3, 'tushare': 1})
+
+    codes = ['{:06d}.SZ'.format(i) for i in range(40)]
+    results = dict(work_flow.fetch_all(codes))
+
+    assert sorted(results) == codes
+    assert all(results[code]['close'].iloc[0] == float(code[:6]) for code in codes)
+    assert 1 < state['peak'] <= 4
+
+
+def test_fetch_all_survives_fetch_errors(monkeypatch):
+    def fake_fetch(code):
+        if code.startswith('000001'):
+            raise ConnectionError('boom')
+        return pd.DataFrame({'close': [1.0]})
+
+    monkeypatch.setattr(work_flow, 'fetch_data_robust', fake_fetch)
+
+    results = dict(work_flow.fetch_all(['000001.SZ', '000002.SZ']))
+    assert results['000001.SZ'].empty
+    assert not results['000002.SZ'].empty
+
+
+def rising(code, df):
+    # 在子进程中执行：收到的是从共享内存还原的日线
+    return df['close'].iloc[-1] > df['close'].iloc[0]
+
+
+def test_evaluate_parallel_uses_shared_memory():
+    frames = []
+    for i in range(10):
+        closes = [10.0, 10.0 + (1 if i % 2 else -1)]
+        frames.append(('{:06d}.SZ'.format(i), pd.DataFrame({
+            'date': pd.to_datetime(['2023-01-02', '2023-01-03']),
+            'open': closes, 'high': closes, 'low': closes, 'close': closes, 'volume': [100.0, 100.0],
+        })))
+    frames.append(('000099.SZ', pd.DataFrame()))
+
+    hits = work_flow.evaluate_parallel(iter(frames), processes=2, check=rising, batch_size=3)
+    assert sorted(hits) == ['{:06d}.SZ'.format(i) for i in range(1, 10, 2)]
+
+
+
+def listed(code, df):
+    # 依赖主进程的 settings：spawn 启动的子进程只能经 initializer 拿到
+    if code == '000003.SZ':
+        raise ValueError('boom')
+    return code[:6] in settings.top_list and settings.config['flag']
+
+
+def test_evaluate_parallel_passes_settings_to_spawned_workers(monkeypatch):
+    monkeypatch.setattr(settings, 'config', {'flag': True}, raising=False)
+    monkeypatch.setattr(settings, 'top_list', frozenset(['000001', '000002']), raising=False)
+    metrics.reset()
+    frames = [('{:06d}.SZ'.format(i), pd.DataFrame({
+        'date': pd.to_datetime(['2023-01-02', '2023-01-03']),
+        'open': [10.0, 11.0], 'high': [10.0, 11.0], 'low': [10.0, 11.0], 'close': [10.0, 11.0],
+        'volume': [100.0, 100.0],
+    })) for i in range(5)]
+    hits = work_flow.evaluate_parallel(iter(frames), processes=2, check=listed, batch_size=2,
+                                       mp_context=multiprocessing.get_context('spawn'))
+    assert sorted(hits) == ['000001.SZ', '000002.SZ']
+    # 抛出异常的股票计数，不再静默丢弃
+    assert metrics.summary()[metrics.SCAN_ERRORS][0]['value'] == 1
+
+
+def test_fetch_from_sina_without_suffix():
+    # 不带 .SH / .SZ 后缀的代码无法取快照，与其它数据源一样返回空表
+    df = work_flow.fetch_from_sina('000001')
+    assert isinstance(df, pd.DataFrame) and df.empty
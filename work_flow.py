@@ -1,90 +1,158 @@
 import pandas as pd
-import akshare as ak
-import tushare as ts
 import settings
 import datetime
-import requests
+import logging
 import os
+import time
 import traceback
+import threading
+import itertools
+import concurrent.futures
+import sys
+import numpy as np
+import store
+import packed
+import bars
+import health
+import journal
+import metrics
+import registry
+import results
+import shard
+from strategy import climax_limitdown, enter, high_tight_flag, keep_increasing, turtle_trade
+import bulk
+import snapshot
 
 # ==========================================
 # 1. 核心：三级数据瀑布 (Data Waterfall)
 # ==========================================
 
+# 各数据源的最大并发数，可在 config.yaml 的 workers 中覆盖
+DEFAULT_WORKERS = {'akshare': 8, 'tushare': 2, 'sina': 4}
+_limits = {}
+_limits_lock = threading.Lock()
+
+def workers():
+    config = settings.config if isinstance(settings.config, dict) else {}
+    return {**DEFAULT_WORKERS, **(config.get('workers') or {})}
+
+def _limit(source):
+    """按数据源限流：同一数据源同时在途的请求数不超过配置值"""
+    with _limits_lock:
+        if source not in _limits:
+            _limits[source] = threading.BoundedSemaphore(workers()[source])
+        return _limits[source]
+
 def fetch_from_sina(code):
     """
     【通道 C】新浪财经 (急速快照)
     仅在 Akshare 和 Tushare 都挂了时使用，只返回当日最新数据
     """
-    try:
-        # 格式转换: 000001.SZ -> sz000001
-        if code.endswith('.SZ'): sina_code = 'sz' + code[:6]
-        elif code.endswith('.SH'): sina_code = 'sh' + code[:6]
-        else: return None
-
-        url = f"http://hq.sinajs.cn/list={sina_code}"
-        resp = requests.get(url, timeout=5)
-        text = resp.text
-        
-        if "," in text:
-            elements = text.split(',')
-            if len(elements) > 30:
-                data = {
-                    'date': [pd.to_datetime(datetime.date.today())],
-                    'open': [float(elements[1])],
-                    'high': [float(elements[4])],
-                    'low': [float(elements[5])],
-                    'close': [float(elements[3])],
-                    'volume': [float(elements[8])]
-                }
-                return pd.DataFrame(data)
-    except:
-        pass
-    return pd.DataFrame()
+    if snapshot.symbol(code) is None:
+        return pd.DataFrame()
+    with _limit('sina'):
+        quotes = snapshot.fetch([code])
+    if quotes.empty:
+        return pd.DataFrame()
+    return bars.from_sina(quotes)
 
-def fetch_data_robust(code):
+def fetch_akshare(code, start_date=None):
     """
-    数据获取总控：Akshare -> Tushare -> Sina
+    【通道 A】Akshare (东方财富源 - 数据最全)
+    start_date 为 None 时拉取全部历史
     """
-    # -----------------------------------
-    # 优先通道: Akshare (东方财富源 - 数据最全)
-    # -----------------------------------
-    try:
-        pure_code = code[:6] # 去掉 .SZ 后缀给 Akshare 用
-        # 获取日线 (前复权)
-        df = ak.stock_zh_a_hist(symbol=pure_code, period="daily", adjust="qfq")
-        
+    import akshare as ak # 按需导入，只用本地数据时不必加载
+    pure_code = code[:6] # 去掉 .SZ 后缀给 Akshare 用
+    kwargs = {'start_date': start_date.strftime('%Y%m%d')} if start_date is not None else {}
+    # 获取日线 (前复权)
+    with _limit('akshare'), metrics.timer(metrics.FETCH_SECONDS, source='akshare'):
+        df = ak.stock_zh_a_hist(symbol=pure_code, period="daily", adjust="qfq", **kwargs)
+    if df.empty:
+        return df
+    return bars.from_akshare(df)
+
+def fetch_tushare(code, start_date=None):
+    """
+    【通道 B】Tushare (官方源 - 极稳)
+    start_date 为 None 时拉取最近一年 (满足均线计算)
+    """
+    token = os.environ.get('TS_TOKEN')
+    if not token:
+        return pd.DataFrame()
+    import tushare as ts
+    ts.set_token(token)
+    pro = ts.pro_api()
+    if start_date is None:
+        start_date = datetime.datetime.now() - datetime.timedelta(days=365)
+    end_dt = datetime.datetime.now().strftime('%Y%m%d')
+
+    with _limit('tushare'), metrics.timer(metrics.FETCH_SECONDS, source='tushare'):
+        df = pro.daily(ts_code=code, start_date=start_date.strftime('%Y%m%d'), end_date=end_dt)
+    if df.empty:
+        return df
+    return bars.from_tushare(df)
+
+# 日线历史数据源，按优先级排列
+HISTORY_SOURCES = {'akshare': fetch_akshare, 'tushare': fetch_tushare}
+# 提供前复权全量历史的数据源：首次入库和复权数据变化时只用它们 (Tushare 只有一年的未复权日线)
+ADJUSTED_SOURCES = ('akshare',)
+
+def fetch_history(code, start_date=None, sources=None):
+    """
+    日线历史瀑布：Akshare -> Tushare，全部失败返回空表
+    熔断中的数据源直接跳过，首选熔断时下一级自动提升为首选；sources 限定使用的数据源
+    """
+    sources = [source for source in HISTORY_SOURCES if sources is None or source in sources]
+    ranked = health.rank(sources)
+    for source in sources:
+        if source not in ranked:
+            metrics.inc(metrics.FETCH_FALLBACKS, source=source, reason='open')
+    for source in ranked:
+        breaker = health.breaker(source)
+        if not breaker.allow():
+            metrics.inc(metrics.FETCH_FALLBACKS, source=source, reason='open')
+            continue
+        try:
+            df = HISTORY_SOURCES[source](code, start_date)
+        except Exception:
+            breaker.failure()
+            metrics.inc(metrics.FETCH_FAILURES, source=source)
+            metrics.inc(metrics.FETCH_FALLBACKS, source=source, reason='error')
+            continue # 失败则进入下一级
+        breaker.success()
         if not df.empty:
-            # 标准化列名
-            df.rename(columns={'日期':'date','开盘':'open','收盘':'close','最高':'high','最低':'low','成交量':'volume'}, inplace=True)
-            df['date'] = pd.to_datetime(df['date'])
             return df
-    except:
-        pass # 失败则静默进入下一级
+        metrics.inc(metrics.FETCH_FALLBACKS, source=source, reason='empty')
+    return pd.DataFrame()
 
-    # -----------------------------------
-    # 备用通道: Tushare (官方源 - 极稳)
-    # -----------------------------------
+def bulk_update(codes):
+    """
+    Tushare 按交易日批量更新本地行情库，返回已是最新的代码 (无需再逐只拉取)
+    未配置 Token 或批量更新失败时返回空集，全部走逐只更新
+    """
+    token = os.environ.get('TS_TOKEN')
+    if not token:
+        return set()
     try:
-        token = os.environ.get('TS_TOKEN')
-        if token:
-            ts.set_token(token)
-            pro = ts.pro_api()
-            # 获取最近 200 天 (满足均线计算)
-            end_dt = datetime.datetime.now().strftime('%Y%m%d')
-            start_dt = (datetime.datetime.now() - datetime.timedelta(days=365)).strftime('%Y%m%d')
-            
-            df = pro.daily(ts_code=code, start_date=start_dt, end_date=end_dt)
-            if not df.empty:
-                df = df.iloc[::-1].reset_index(drop=True) # 倒序
-                df.rename(columns={'trade_date': 'date', 'vol': 'volume'}, inplace=True)
-                df['date'] = pd.to_datetime(df['date'])
-                return df
-    except:
-        pass
+        import tushare as ts
+        ts.set_token(token)
+        return bulk.update(codes, ts.pro_api())
+    except Exception:
+        metrics.inc(metrics.FETCH_FAILURES, source='tushare_bulk')
+        traceback.print_exc()
+        return set()
+
+def fetch_data_robust(code):
+    """
+    数据获取总控：本地行情库 -> (Akshare -> Tushare 只补缺失的尾部) -> Sina
+    """
+    df = store.update(code, lambda start_date: fetch_history(code, start_date),
+                      rebuild=lambda: fetch_history(code, sources=ADJUSTED_SOURCES))
+    if df is not None and not df.empty:
+        return df
 
     # -----------------------------------
-    # 急救通道: 新浪 (仅当日数据)
+    # 急救通道: 新浪 (仅当日数据，不入库)
     # -----------------------------------
     # 如果策略只需要今日收盘价，这个可以救命；如果需要 MA20，这个会报错(行数不够)
     # 但总比空着好
@@ -92,58 +160,311 @@ def fetch_data_robust(code):
         df = fetch_from_sina(code)
         if not df.empty:
             return df
-    except:
-        pass
+    except Exception:
+        metrics.inc(metrics.FETCH_FAILURES, source='sina')
 
     return pd.DataFrame()
 
 # ==========================================
 # 2. 执行流程
 # ==========================================
-def process():
-    codes = settings.config['codes']
-    print(f"DEBUG: work_flow 开始处理 {len(codes)} 只股票")
-    
-    # 检查策略文件是否存在
+def fetch_all(codes, fetch=None):
+    """
+    生产者：线程池并发抓取，按完成顺序产出 (code, df)
+    在途任务数有上限，已抓取但未处理的数据不会无限堆积
+    """
+    fetch = fetch or fetch_data_robust
+    pool_size = sum(workers().values())
+    codes = iter(codes)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=pool_size) as executor:
+        pending = {}
+        for code in itertools.islice(codes, pool_size * 2):
+            pending[executor.submit(fetch, code)] = code
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                code = pending.pop(future)
+                for next_code in itertools.islice(codes, 1):
+                    pending[executor.submit(fetch, next_code)] = next_code
+                try:
+                    df = future.result()
+                except Exception:
+                    # 读写本地行情库出错等，数据源的失败已在 fetch_history 中计数
+                    metrics.inc(metrics.FETCH_FAILURES, source='store')
+                    df = pd.DataFrame()
+                yield code, df
+
+# 默认启用的策略 (config.yaml 中没有 strategies 时)，盘中重扫、离线扫描也使用这些策略
+CHECKS = [
+    enter.check_volume,
+    enter.check_breakthrough,
+    keep_increasing.check,
+    turtle_trade.check_enter,
+    high_tight_flag.check,
+    climax_limitdown.check,
+]
+
+def _prefilter_of(check):
+    # 策略模块中与检查函数同名、后缀为 _prefilter 的函数即其快照预筛条件
+    return getattr(sys.modules[check.__module__], check.__name__ + '_prefilter', None)
+
+def prefilter(codes, checks, quotes=None, gates=()):
+    """
+    快照预筛：取一次全市场行情快照，只保留至少满足一个启用策略最后一根 K 线必要条件的代码，
+    其余股票不再拉取历史。gates 为门槛的预筛条件，必须全部满足。
+    有策略未声明预筛条件 (且没有门槛)、或快照不可用时返回全部代码；快照中没有的股票 (停牌等) 无法判断，保留
+    """
+    predicates = [_prefilter_of(check) for check in checks]
+    unknown = not predicates or any(predicate is None for predicate in predicates)
+    if unknown and not gates:
+        return list(codes)
+    if quotes is None:
+        quotes = snapshot.fetch(codes)
+    if quotes.empty:
+        return list(codes)
+    passed = np.full(len(quotes), unknown)
+    if not unknown:
+        for predicate in predicates:
+            passed |= predicate(quotes)
+    for gate in gates:
+        passed &= gate(quotes)
+    keep = set(quotes['code'].values[passed])
+    quoted = set(quotes['code'].values)
+    return [code for code in codes if code in keep or code not in quoted]
+
+def _init_worker(config, top_list):
+    """进程池 worker 的初始化：spawn / forkserver 启动的子进程不继承主进程的 settings"""
+    settings.config = config
+    settings.top_list = top_list
+
+def _evaluate_shared(descriptor, check):
+    """
+    进程池 worker：挂载共享内存中的一批日线，逐只运行策略，
+    返回 ([(触发信号的代码, 策略结果)], 本批记录的指标)，指标由主进程合并
+    """
+    metrics.reset()
+    blocks, arrays = packed.attach(descriptor)
     try:
-        import statistics
-    except ImportError:
-        print("🚨 致命错误：找不到 statistics.py！")
-        return []
-
-    results = []
-    
-    for i, code in enumerate(codes):
-        # 进度显示 (每 100 只显示一次)
-        if i % 100 == 0:
-            print(f"   ... 进度 {i}/{len(codes)} (当前: {code})")
-            
-        # 1. 获取数据 (瀑布流)
-        df = fetch_data_robust(code)
-        
-        if df.empty:
-            continue
-            
-        # 2. 运行策略
+        hits = []
+        for code, start, stop in descriptor['index']:
+            try:
+                result = check(code, packed.unpack(arrays, start, stop))
+                if result:
+                    hits.append((code, result))
+            except Exception as e:
+                metrics.inc(metrics.SCAN_ERRORS)
+                logging.warning("{} 策略计算失败: {!r}".format(code, e))
+        return hits, metrics.snapshot()
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+# 进程池模式下每批放入同一组共享内存的股票数
+BATCH_SIZE = 64
+
+def evaluate_parallel(frames, processes, check, batch_size=BATCH_SIZE, done=None, mp_context=None):
+    """
+    进程池模式：frames 为 (code, df) 迭代器，按批打包进共享内存交给子进程计算，
+    子进程只收到共享内存名和索引，不再 pickle DataFrame。返回 {触发信号的代码: check 的结果}；
+    done(codes, hits) 在每批算完时调用 (codes 为该批全部代码，hits 为其中触发信号的部分)。
+    子进程启动时收到 settings.config 和 settings.top_list (不依赖 fork 继承)；mp_context 为启动方式，默认按平台
+    """
+    results = {}
+    pending = {}
+
+    def collect(return_when):
+        finished, _ = concurrent.futures.wait(pending, return_when=return_when)
+        for future in finished:
+            blocks, codes = pending.pop(future)
+            try:
+                hits, samples = future.result()
+                results.update(hits)
+                metrics.merge(samples)
+                if done is not None:
+                    done(codes, dict(hits))
+            except Exception:
+                traceback.print_exc()
+            finally:
+                for block in blocks:
+                    block.close()
+                    block.unlink()
+
+    def submit(batch):
+        blocks, descriptor = packed.share(batch)
+        pending[executor.submit(_evaluate_shared, descriptor, check)] = blocks, list(batch)
+        # 在途批次有上限，共享内存占用不会无限增长
+        if len(pending) >= processes * 2:
+            collect(concurrent.futures.FIRST_COMPLETED)
+
+    initargs = (getattr(settings, 'config', None), getattr(settings, 'top_list', None))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes, mp_context=mp_context,
+                                                initializer=_init_worker, initargs=initargs) as executor:
         try:
-            # 确保传递给策略的是标准 DataFrame
-            if statistics.run(df):
-                print(f"   🚀 🎯 触发信号: {code}")
-                results.append(code)
-        except Exception:
-            continue
-            
+            batch = {}
+            for code, df in frames:
+                if df.empty:
+                    continue
+                batch[code] = df
+                if len(batch) >= batch_size:
+                    submit(batch)
+                    batch = {}
+            if batch:
+                submit(batch)
+        finally:
+            if pending:
+                collect(concurrent.futures.ALL_COMPLETED)
     return results
 
+def _progress(frames, total):
+    for i, (code, df) in enumerate(frames):
+        # 进度显示 (每 100 只显示一次)
+        if i % 100 == 0:
+            print(f"   ... 进度 {i}/{total} (当前: {code})")
+        yield code, df
+
+def process(checks=None):
+    """
+    checks: 策略检查函数列表，为 None 时按 config.yaml 的 strategies / gates 建立策略注册表 (见 registry)。
+    先按快照预筛，只拉取候选股票的历史；返回 {触发信号的代码: 命中的策略名列表}
+    """
+    codes = settings.config['codes']
+    print(f"DEBUG: work_flow 开始处理 {len(codes)} 只股票")
+    metrics.set_gauge(metrics.CODES, len(codes), stage='universe')
+
+    strategies = registry.load(settings.config, CHECKS) if checks is None else registry.Registry.of(checks)
+    print("   启用策略: " + '、'.join(s.name for s in strategies.strategies))
+
+    # 扫描日志：中断后按同一运行 ID 续跑，跳过已拉取并计算过的股票 (config.yaml 中 journal: false 可关闭)
+    scan_log = None
+    selected = {}
+    if settings.config.get('journal', True):
+        scan_log = journal.Journal(journal.run_id(settings.config) + shard.suffix(settings.config), strategies.meta)
+        if scan_log.done:
+            selected.update(scan_log.hits)
+            codes = [code for code in codes if code not in scan_log.done]
+            print(f"   续跑 {scan_log.run_id}：跳过已完成的 {len(scan_log.done)} 只 (已命中 {len(selected)} 只)")
+    try:
+        _scan(codes, strategies, selected, scan_log)
+        if scan_log is not None:
+            scan_log.complete()
+    finally:
+        if scan_log is not None:
+            scan_log.close()
+    metrics.set_gauge(metrics.CODES, len(selected), stage='hits')
+    errors = sum(item['value'] for item in metrics.summary().get(metrics.SCAN_ERRORS, []))
+    if errors:
+        print(f"   ⚠️ {errors} 只股票策略计算抛出异常、已跳过 (见日志和 data/metrics.json)")
+    return selected
+
+def _scan(codes, strategies, selected, scan_log):
+    """预筛、拉取并计算 codes，命中的写入 selected，每只算完的股票记入扫描日志"""
+    def record(code, hits):
+        if hits:
+            print(f"   🚀 🎯 触发信号: {code} ({'、'.join(hits)})")
+            selected[code] = hits
+        if scan_log is not None:
+            scan_log.record(code, hits)
+
+    total = len(codes)
+    with metrics.stage('prefilter'):
+        candidates = prefilter(codes, strategies.checks, gates=strategies.prefilters())
+    metrics.set_gauge(metrics.CODES, len(candidates), stage='candidates')
+    if len(candidates) < total:
+        print(f"   快照预筛：{len(candidates)}/{total} 只需要拉取历史")
+    codes = candidates
+
+    # 先按交易日批量更新，已是最新的股票直接读库 (config.yaml 中 bulk_update: false 可关闭)
+    with metrics.stage('bulk_update'):
+        fresh = bulk_update(codes) if settings.config.get('bulk_update', True) else set()
+    metrics.set_gauge(metrics.CODES, len(fresh), stage='fresh')
+    if fresh:
+        print(f"   批量更新完成，{len(fresh)} 只无需逐只拉取")
+
+    def fetch(code):
+        if code in fresh:
+            df = store.load(code)
+            if df is not None and not df.empty:
+                return df
+        return fetch_data_robust(code)
+
+    frames = _progress(fetch_all(codes, fetch), len(codes))
+
+    # 可选：config.yaml 中 processes 大于 0 时，策略计算交给进程池
+    processes = settings.config.get('processes') or 0
+    if processes > 0:
+        def batch_done(batch, hits):
+            for code in batch:
+                record(code, hits.get(code))
+
+        with metrics.stage('scan'):
+            evaluate_parallel(frames, processes, strategies.run, done=batch_done)
+        return
+
+    # 消费者：数据到一只处理一只，策略计算与后续抓取并行
+    with metrics.stage('scan'):
+        for code, df in frames:
+            # 拉取失败的股票不记入扫描日志，续跑时重试
+            if df.empty:
+                continue
+
+            # 运行策略
+            try:
+                hits = strategies.run(code, df)
+            except Exception as e:
+                metrics.inc(metrics.SCAN_ERRORS)
+                logging.warning("{} 策略计算失败: {!r}".format(code, e))
+                hits = []
+            record(code, hits)
+
 def prepare():
+    started = time.strftime('%Y-%m-%d %H:%M:%S')
     selected = process()
-    
+    _health()
+    report(selected, len(settings.config['codes']), started)
+
+def prepare_shard(index, count):
+    """分片模式：只扫描 settings.config['codes'] 中属于第 index 片的股票，结果写入分片文件，由 merge 统一输出"""
+    settings.config['shard'] = [index, count]
+    settings.config['codes'] = shard.partition(settings.config['codes'], index, count)
+    print(f"   分片 {index}/{count}：{len(settings.config['codes'])} 只")
+    selected = process()
+    _health()
+    signals = {code: results.features(store.load(code)) for code in selected}
+    file = shard.write(journal.run_id(settings.config), index, count, len(settings.config['codes']), selected,
+                       signals)
+    print(f"✅ 分片 {index}/{count} 完成，选中 {len(selected)} 只，结果写入 {file}")
+
+def merge(count):
+    """汇总 count 片的结果，输出报告并推送；有分片缺失时仍按已完成的分片输出，并在报告中注明"""
+    started = time.strftime('%Y-%m-%d %H:%M:%S')
+    merged = shard.merge(journal.run_id(settings.config), count)
+    if merged['missing']:
+        print(f"⚠️ 缺少分片 {merged['missing']}，只汇总已完成的 {count - len(merged['missing'])} 片")
+    report(merged['selected'], merged['codes'], started, signals=merged['signals'], missing=merged['missing'])
+
+def _health():
+    for source, state in health.summary().items():
+        print(f"   数据源 {source}: {state['state']} (成功 {state['successes']} / 失败 {state['failures']})")
+
+def report(selected, codes, started=None, signals=None, missing=()):
+    """
+    selected: {代码: 命中的策略名列表}，codes: 扫描的股票数，signals: 命中股票信号当天的指标
+    (为 None 时按本地行情库计算)。写运行指标和结果库，按配置推送
+    """
+    # 各数据源耗时、降级次数和各策略 CPU 时间见 data/metrics.json (Prometheus 格式: data/metrics.prom)
+    metrics.write({'codes': codes, 'selected': len(selected), 'missing_shards': list(missing)})
+
+    # 选股结果追加到结果库 data/stock.db (SQLite，见 results)，历次运行的记录都保留
+    results.save_run(journal.run_id(settings.config), selected, codes=codes, started=started, signals=signals)
+
     if selected:
         print(f"✅ 选股完成！共选中 {len(selected)} 只。")
-        with open('data/stock.db', 'w') as f:
-            f.write('\n'.join(selected))
     else:
         print("⚠️ 扫描完成，今日无符合条件的股票。")
-        # 创建空文件防止报错
-        with open('data/stock.db', 'w') as f:
-            f.write("No stocks selected.")
+
+    if (settings.config.get('push') or {}).get('enable'):
+        # 按策略汇总成一条日报交给后台线程发送，不等待
+        import push  # 按需导入，不推送时不必加载推送客户端
+        push.hits(selected)
+        push.flush(missing)